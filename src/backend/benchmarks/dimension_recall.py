@@ -0,0 +1,167 @@
+"""
+Recall@k of reduced-dimension embeddings against full dimension.
+
+Takes the vectors of an existing full-dimension FAISS index (or a .npy file),
+uses a sample of them as queries, and measures how many of each query's
+full-dimension top-k neighbours are still found after reducing the vectors:
+
+- api: keep the first d components and re-normalize, which is what
+  text-embedding-3 returns for `dimensions=d`
+- pca: project onto the top d principal components (trained on the
+  non-query vectors), the same projection EMBEDDING_PCA_MATRIX applies
+
+Run from the `src` directory:
+
+    python -m backend.benchmarks.dimension_recall --index backend/retriever/debates.index
+    python -m backend.benchmarks.dimension_recall --dims 256 512 --output recall.json
+    python -m backend.benchmarks.dimension_recall --save-pca 256 pca_256.npz
+"""
+import argparse
+import json
+import os
+import time
+import numpy as np
+
+
+def load_vectors(index_path=None, vectors_path=None):
+    """Load full-dimension vectors from a FAISS index or a .npy file."""
+    if vectors_path:
+        return np.load(vectors_path).astype("float32")
+    import faiss # type: ignore
+    index = faiss.read_index(index_path)
+    return index.reconstruct_n(0, index.ntotal).astype("float32")
+
+
+def normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype("float32")
+
+
+def fit_pca(vectors, dims):
+    """Return (mean, components) with components of shape (dims, d)."""
+    mean = vectors.mean(axis=0)
+    _, _, vt = np.linalg.svd(vectors - mean, full_matrices=False)
+    return mean.astype("float32"), vt[:dims].astype("float32")
+
+
+def reduce_vectors(vectors, dims, method, pca=None):
+    if method == "api":
+        return normalize(vectors[:, :dims])
+    mean, components = pca
+    return normalize((vectors - mean) @ components.T)
+
+
+def top_k_neighbours(corpus, queries, query_ids, k, block=256):
+    """Exact L2 top-k for each query, excluding the query's own row."""
+    corpus_sq = (corpus * corpus).sum(axis=1)
+    results = []
+    for start in range(0, len(queries), block):
+        q = queries[start:start + block]
+        # ||x - q||^2 ranks the same as ||x||^2 - 2 x.q
+        scores = corpus_sq[None, :] - 2.0 * (q @ corpus.T)
+        for row, query_id in enumerate(query_ids[start:start + block]):
+            scores[row, query_id] = np.inf
+        top = np.argpartition(scores, k, axis=1)[:, :k]
+        results.extend(set(row) for row in top.tolist())
+    return results
+
+
+def run(vectors, dims_list, methods, k=10, num_queries=200, seed=0):
+    """
+    Measure recall@k and search cost for each (method, dims) pair.
+
+    Returns:
+        Dict report with one row per configuration
+    """
+    rng = np.random.default_rng(seed)
+    n, full_dims = vectors.shape
+    if n <= k + 1:
+        raise ValueError(f"Need more than {k + 1} vectors to measure recall@{k}, got {n}")
+    num_queries = min(num_queries, n)
+    query_ids = rng.choice(n, size=num_queries, replace=False)
+    training = np.delete(vectors, query_ids, axis=0)
+
+    start = time.perf_counter()
+    truth = top_k_neighbours(vectors, vectors[query_ids], query_ids, k)
+    full_ms = (time.perf_counter() - start) * 1000 / num_queries
+
+    rows = [{
+        "method": "full",
+        "dims": full_dims,
+        f"recall@{k}": 1.0,
+        "recall_loss": 0.0,
+        "index_mb": round(vectors.nbytes / 1e6, 2),
+        "search_ms_per_query": round(full_ms, 3),
+    }]
+    for method in methods:
+        for dims in dims_list:
+            if dims >= full_dims:
+                continue
+            if method == "pca" and dims > min(training.shape):
+                # Not enough training vectors for that many components
+                continue
+            pca = fit_pca(training, dims) if method == "pca" else None
+            reduced = reduce_vectors(vectors, dims, method, pca)
+            start = time.perf_counter()
+            found = top_k_neighbours(reduced, reduced[query_ids], query_ids, k)
+            ms = (time.perf_counter() - start) * 1000 / num_queries
+            recall = float(np.mean([len(a & b) / k for a, b in zip(truth, found)]))
+            rows.append({
+                "method": method,
+                "dims": dims,
+                f"recall@{k}": round(recall, 4),
+                "recall_loss": round(1.0 - recall, 4),
+                "index_mb": round(reduced.nbytes / 1e6, 2),
+                "search_ms_per_query": round(ms, 3),
+            })
+
+    return {
+        "vectors": n,
+        "full_dims": full_dims,
+        "queries": num_queries,
+        "k": k,
+        "results": rows,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k of reduced-dimension embeddings")
+    parser.add_argument("--index", default=os.getenv("EMBEDDING_OUTPUT_INDEX", "backend/retriever/debates.index"),
+                        help="Full-dimension FAISS index to read vectors from")
+    parser.add_argument("--vectors", help="Read vectors from a .npy file instead of an index")
+    parser.add_argument("--dims", type=int, nargs="+", default=[64, 128, 256, 512, 768, 1024])
+    parser.add_argument("--methods", nargs="+", choices=["api", "pca"], default=["api", "pca"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--save-pca", nargs=2, metavar=("DIMS", "PATH"),
+                        help="Train a PCA matrix on all vectors and save it for EMBEDDING_PCA_MATRIX")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args.index, args.vectors)
+
+    if args.save_pca:
+        from backend.embeddings_faiss.embedding_space import save_pca_matrix
+        dims, path = int(args.save_pca[0]), args.save_pca[1]
+        mean, components = fit_pca(vectors, dims)
+        save_pca_matrix(path, mean, components)
+        print(f"Saved {dims}-d PCA matrix trained on {len(vectors)} vectors to {path}")
+        return
+
+    report = run(vectors, args.dims, args.methods, args.k, args.queries)
+
+    print(f"{report['vectors']} vectors, {report['full_dims']}-d, {report['queries']} queries")
+    print(f"{'method':<8}{'dims':>6}{'recall@' + str(args.k):>12}{'loss':>8}{'index MB':>10}{'ms/query':>10}")
+    for row in report["results"]:
+        print(f"{row['method']:<8}{row['dims']:>6}{row[f'recall@{args.k}']:>12.3f}"
+              f"{row['recall_loss']:>8.3f}{row['index_mb']:>10.2f}{row['search_ms_per_query']:>10.3f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
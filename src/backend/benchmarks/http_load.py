@@ -0,0 +1,97 @@
+"""
+Closed-loop HTTP load generator.
+
+Each of `concurrency` clients sends a request, waits for the response, and
+sends the next one until `duration` runs out. Clients are spread over
+several processes so the generator itself isn't held back by the GIL.
+"""
+import os
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import requests
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _client_process(base_url, build_request, threads, duration, process_index):
+    """Run `threads` closed-loop clients; returns [(latency_seconds, status), ...]."""
+    results = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(client_index):
+        session = requests.Session()
+        n = 0
+        local = []
+        while time.perf_counter() < deadline:
+            method, path, kwargs = build_request(process_index * 1000 + client_index, n)
+            start = time.perf_counter()
+            try:
+                status = session.request(method, base_url + path, timeout=300, **kwargs).status_code
+            except requests.RequestException:
+                status = 0
+            local.append((time.perf_counter() - start, status))
+            n += 1
+        with lock:
+            results.extend(local)
+
+    workers = [threading.Thread(target=client, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return results
+
+
+def run_load(base_url, build_request, concurrency, duration, processes=None):
+    """
+    Drive base_url with `concurrency` closed-loop clients for `duration` seconds.
+
+    Args:
+        base_url: e.g. "http://127.0.0.1:3000"
+        build_request: Picklable (module-level) function (client, n) ->
+            (method, path, requests kwargs)
+        concurrency: Clients sending requests at the same time
+        duration: Seconds to run
+        processes: Client processes (default: up to 4, one per 8 clients)
+
+    Returns:
+        Dict with requests, throughput, latency percentiles (ms) and error rate
+    """
+    processes = processes or max(1, min(4, os.cpu_count() or 1, (concurrency + 7) // 8))
+    processes = min(processes, concurrency)
+    per_process = [concurrency // processes + (1 if i < concurrency % processes else 0) for i in range(processes)]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_client_process, base_url, build_request, threads, duration, i)
+                   for i, threads in enumerate(per_process)]
+        results = [r for future in futures for r in future.result()]
+    elapsed = time.perf_counter() - start
+
+    ok = [latency * 1000 for latency, status in results if 200 <= status < 300]
+    statuses = {}
+    for _, status in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "requests": len(results),
+        "throughput_rps": round(len(ok) / elapsed, 2),
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else None,
+        "statuses": statuses,
+        "latency_ms": {
+            "p50": round(percentile(ok, 50), 1) if ok else None,
+            "p90": round(percentile(ok, 90), 1) if ok else None,
+            "p99": round(percentile(ok, 99), 1) if ok else None,
+            "mean": round(sum(ok) / len(ok), 1) if ok else None,
+        },
+    }
@@ -0,0 +1,81 @@
+"""
+Import-time budget check for the backend.
+
+Imports `main` in a fresh interpreter and fails if it takes longer than the
+budget or drags in modules that should only load on first use (torch,
+transformers). Run from the `src` directory:
+
+    python -m backend.benchmarks.import_budget
+    python -m backend.benchmarks.import_budget --budget 2.5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[2]
+DEFAULT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "3.0"))
+
+# Modules that must never be imported just by importing the server
+FORBIDDEN_MODULES = ["torch", "transformers"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "seconds": elapsed,
+    "loaded": [m for m in %r if m in sys.modules],
+}))
+"""
+
+
+def measure_import(module_dir=SRC_DIR):
+    """
+    Import main in a subprocess and return its import time and heavy modules.
+
+    Returns:
+        Dict with seconds and loaded (forbidden modules present after import)
+    """
+    env = dict(os.environ)
+    # Make sure no API keys are needed just to import
+    env.pop("OPENAI_API_KEY", None)
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE % FORBIDDEN_MODULES],
+        cwd=module_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing main failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that `import main` stays within budget")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="Maximum import time in seconds")
+    args = parser.parse_args()
+
+    report = measure_import()
+    print(f"import main: {report['seconds']:.2f}s (budget {args.budget:.2f}s)")
+
+    failures = []
+    if report["seconds"] > args.budget:
+        failures.append(f"import took {report['seconds']:.2f}s, over the {args.budget:.2f}s budget")
+    if report["loaded"]:
+        failures.append(f"heavy modules imported eagerly: {', '.join(report['loaded'])}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+"""
+HTTP load test of the whole server against stubbed upstreams.
+
+Starts local stand-ins for OpenAI, Wikipedia and NewsAPI (stub_upstreams)
+and MongoDB (stub_mongo), each with its own artificial latency. Then it
+starts the production server (gunicorn.conf.py) against them and drives the
+Q&A, fact-check, upload and summary endpoints with closed-loop clients at
+each concurrency level. For every run it reports throughput, latency
+percentiles, error rate, status codes, peak RSS of the server processes and
+the upstream calls the server made.
+
+Run from the `src` directory:
+
+    python -m backend.benchmarks.load_test
+    python -m backend.benchmarks.load_test --endpoints fact-check summarize --concurrency 4 16 64 \\
+        --openai-chat-ms 600 --wikipedia-ms 150 --workers 2 --output load.json
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from backend.benchmarks.http_load import run_load
+from backend.benchmarks.server_scaling import build_synthetic_index, start_server, stop_server, QUERIES, CLAIMS
+from backend.benchmarks.stub_mongo import StubMongo
+from backend.benchmarks.stub_upstreams import StubUpstreams
+from backend.benchmarks.synthetic import generate_turns, transcript_text
+
+TRANSCRIPT = transcript_text(generate_turns(60, num_debates=1, seed=7)).encode("utf-8")
+SUMMARY_SECTIONS = [{"content": " ".join(turn["text"] for turn in generate_turns(12, num_debates=1, seed=i))}
+                    for i in range(50)]
+
+
+def qa_request(client, n):
+    return "POST", "/api/retrieve-response", {"data": {"user_query": QUERIES[(client * 7 + n) % len(QUERIES)]}}
+
+
+def fact_check_request(client, n):
+    return "POST", "/api/fact-check", {"data": {"user_query": CLAIMS[(client + n) % len(CLAIMS)]}}
+
+
+def upload_request(client, n):
+    # Distinct names: the server prefixes uploads with a seconds timestamp only
+    return "POST", "/api/upload-debate", {
+        "data": {"debate_name": f"Load Test Debate {client}-{n}", "debate_date": "2024-06-27"},
+        "files": {"file": (f"load_{client}_{n}.txt", TRANSCRIPT, "text/plain")},
+    }
+
+
+def summarize_request(client, n):
+    # Five transcripts per request; about half repeat earlier ones (cache hits)
+    transcripts = [{"id": f"t{client}-{n}-{i}", "title": f"Debate {(client + n + i) % 40}",
+                    "sections": [SUMMARY_SECTIONS[(client + n + i) % len(SUMMARY_SECTIONS)]]}
+                   for i in range(5)]
+    return "POST", "/api/summarize-transcripts-batch", {"json": {"transcripts": transcripts}}
+
+
+ENDPOINTS = {
+    "qa": qa_request,
+    "fact-check": fact_check_request,
+    "upload": upload_request,
+    "summarize": summarize_request,
+}
+
+
+# ============================================================================
+# SERVER MEMORY
+# ============================================================================
+
+def _proc_status(pid):
+    """{field: kB} for the VmRSS/VmHWM lines of /proc/<pid>/status (Linux only)."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    name, value = line.split(":", 1)
+                    fields[name] = int(value.split()[0])
+    except OSError:
+        pass
+    return fields
+
+
+def _process_tree(root_pid):
+    """root_pid and all its descendants."""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "r") as f:
+                # The command name may contain spaces; the ppid follows the closing paren
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+class RSSSampler:
+    """Samples the summed RSS of a process tree in the background and keeps the peak."""
+
+    def __init__(self, root_pid, interval=0.25):
+        self.root_pid = root_pid
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            total = sum(_proc_status(pid).get("VmRSS", 0) for pid in _process_tree(self.root_pid))
+            self.peak_kb = max(self.peak_kb, total)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def peak_rss_per_process(root_pid):
+    """Kernel-recorded peak RSS (VmHWM) of each live server process, in MB."""
+    return {pid: round(_proc_status(pid).get("VmHWM", 0) / 1024, 1) for pid in _process_tree(root_pid)}
+
+
+# ============================================================================
+# SERVER METRICS
+# ============================================================================
+
+METRIC_LINE = re.compile(r'^(upstream_calls_total|upstream_errors_total|admission_rejected_total)\{(.*)\} (\S+)$')
+
+
+def scrape_counters(url):
+    """Upstream call/error and admission rejection counters from /metrics."""
+    counters = {}
+    try:
+        text = requests.get(f"{url}/metrics", timeout=10).text
+    except requests.RequestException:
+        return counters
+    for line in text.splitlines():
+        match = METRIC_LINE.match(line)
+        if match:
+            name, labels, value = match.groups()
+            counters[f"{name}{{{labels}}}"] = float(value)
+    return counters
+
+
+def counter_delta(before, after):
+    return {key: int(value - before.get(key, 0)) for key, value in after.items() if value - before.get(key, 0)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the server's endpoints against stubbed upstreams")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="Concurrency levels to run")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load per endpoint and level")
+    parser.add_argument("--workers", type=int, default=2, help="Server worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker")
+    parser.add_argument("--latency-ms", type=int, default=100, help="Default artificial latency of each upstream call")
+    parser.add_argument("--openai-chat-ms", type=int, help="Latency of chat completions (default: --latency-ms)")
+    parser.add_argument("--openai-embeddings-ms", type=int, help="Latency of embeddings (default: --latency-ms)")
+    parser.add_argument("--wikipedia-ms", type=int, help="Latency of Wikipedia calls (default: --latency-ms)")
+    parser.add_argument("--newsapi-ms", type=int, help="Latency of NewsAPI calls (default: --latency-ms)")
+    parser.add_argument("--mongo-latency-ms", type=int, default=2, help="Latency of every MongoDB command")
+    parser.add_argument("--chunks", type=int, default=20000, help="Synthetic index size")
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--env", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="Extra server environment, e.g. FACT_CHECK_CONCURRENCY=8")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    latency = {
+        "openai_chat": args.openai_chat_ms,
+        "openai_embeddings": args.openai_embeddings_ms,
+        "wikipedia": args.wikipedia_ms,
+        "newsapi": args.newsapi_ms,
+    }
+    latency = {name: args.latency_ms if ms is None else ms for name, ms in latency.items()}
+    stub = StubUpstreams(latency_ms=latency, embedding_dimensions=args.dimensions).start()
+    mongo = StubMongo(latency_ms=args.mongo_latency_ms).start()
+
+    report = {
+        "benchmark": "load_test",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "cpus": os.cpu_count(),
+        "workers": args.workers,
+        "threads_per_worker": args.threads,
+        "upstream_latency_ms": dict(latency, mongodb=args.mongo_latency_ms),
+        "server_env": args.env,
+        "results": {endpoint: [] for endpoint in args.endpoints},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="load_test_") as workdir:
+        print(f"Building {args.chunks}-chunk synthetic index...")
+        index_path, metadata_path = build_synthetic_index(workdir, args.chunks, args.dimensions)
+        env = dict(stub.env(), **mongo.env(),
+                   EMBEDDING_OUTPUT_INDEX=index_path, EMBEDDING_OUTPUT_METADATA=metadata_path,
+                   UPLOAD_FOLDER=os.path.join(workdir, "uploads"), METRICS_DIR=os.path.join(workdir, "metrics"),
+                   TRACE_LOG="0")
+        env.update(item.split("=", 1) for item in args.env)
+
+        print(f"Starting server with {args.workers} worker(s) x {args.threads} threads...")
+        process, url, log = start_server(workdir, args.workers, args.threads, env)
+        try:
+            for endpoint in args.endpoints:
+                for concurrency in args.concurrency:
+                    before = scrape_counters(url)
+                    with RSSSampler(process.pid) as rss:
+                        result = run_load(url, ENDPOINTS[endpoint], concurrency, args.duration)
+                    result["peak_rss_mb"] = round(rss.peak_kb / 1024, 1)
+                    result["upstream"] = counter_delta(before, scrape_counters(url))
+                    report["results"][endpoint].append(result)
+                    print(f"  {endpoint} x{concurrency}: {result['throughput_rps']} req/s, "
+                          f"p50 {result['latency_ms']['p50']} ms, p99 {result['latency_ms']['p99']} ms, "
+                          f"errors {result['error_rate']:.1%}, peak RSS {result['peak_rss_mb']} MB")
+            report["peak_rss_per_process_mb"] = peak_rss_per_process(process.pid)
+            report["mongo_commands"] = dict(mongo.commands)
+        finally:
+            stop_server(process, log)
+    stub.stop()
+    mongo.stop()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"Report written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
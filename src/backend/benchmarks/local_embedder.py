@@ -0,0 +1,27 @@
+"""
+Deterministic local embedder for offline benchmarks.
+
+Thin callable around the local provider's feature-hashing embeddings
+(backend/providers/local.py): texts that share words get similar vectors,
+so retrieval behaves plausibly, and the same text always gets the same
+vector with no network access.
+"""
+from backend.embeddings_faiss.embedding_space import EmbeddingSpace
+from backend.providers.local import hash_embed
+
+
+class HashEmbedder:
+    """Callable drop-in for an embeddings API: list of texts -> (n, dimensions) float32."""
+
+    model = "local-hash-v1"
+
+    def __init__(self, dimensions=256):
+        self.dimensions = dimensions
+
+    @property
+    def space(self):
+        """EmbeddingSpace recorded in the manifest of indexes built with this embedder."""
+        return EmbeddingSpace(model=self.model, dimensions=self.dimensions, method="native")
+
+    def __call__(self, texts):
+        return hash_embed(texts, self.dimensions)
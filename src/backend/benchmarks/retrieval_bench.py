@@ -0,0 +1,210 @@
+"""
+Offline retrieval benchmark.
+
+Builds a FAISS index from a synthetic corpus with the deterministic local
+embedder (no OpenAI, no MongoDB), extends it through the incremental path,
+then loads it with DebateRetriever and times queries. Each corpus size runs
+in its own subprocess so RSS numbers don't bleed between sizes.
+
+Run from the `src` directory:
+
+    python -m backend.benchmarks.retrieval_bench
+    python -m backend.benchmarks.retrieval_bench --sizes 10000 100000 1000000 --output retrieval.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parents[2]
+
+
+def current_rss_mb():
+    """Resident set size of this process in MB (Linux), or None."""
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KB on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@contextlib.contextmanager
+def quiet():
+    # The pipelines print progress for every batch; keep the report readable
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def run_size(num_chunks, num_queries=200, dimensions=256, incremental_fraction=0.1, top_k=10, workdir=None):
+    """
+    Benchmark one corpus size in this process.
+
+    Returns:
+        Dict of measurements for the report
+    """
+    from backend.benchmarks.local_embedder import HashEmbedder
+    from backend.benchmarks.synthetic import generate_turns, turns_to_utterances, sample_queries
+    from backend.embeddings_faiss.build_index import build_index
+    from backend.embeddings_faiss.incremental_index import IncrementalFAISS
+    from backend.retriever.retriever import DebateRetriever
+
+    workdir = Path(workdir or tempfile.mkdtemp(prefix="retrieval_bench_"))
+    index_path = str(workdir / "bench.index")
+    metadata_path = str(workdir / "bench_metadata.json")
+    embedder = HashEmbedder(dimensions)
+
+    # Synthetic turns are shorter than EMBEDDING_CHUNK_SIZE, so one turn = one chunk
+    num_incremental = int(num_chunks * incremental_fraction)
+    num_base = num_chunks - num_incremental
+    base_turns = generate_turns(num_base, seed=0)
+    first_new_debate = len({t["source"] for t in base_turns}) + 1
+    new_turns = generate_turns(num_incremental, seed=1, first_debate=first_new_debate)
+    base = turns_to_utterances(base_turns)
+    new = turns_to_utterances(new_turns)
+
+    result = {"chunks": num_chunks, "dimensions": dimensions}
+
+    start = time.perf_counter()
+    with quiet():
+        build_index(utterances=base, space=embedder.space, embed_fn=embedder,
+                    index_path=index_path, metadata_path=metadata_path)
+    elapsed = time.perf_counter() - start
+    result["build"] = {
+        "chunks": num_base,
+        "seconds": round(elapsed, 3),
+        "chunks_per_second": round(num_base / elapsed, 1),
+    }
+
+    if new:
+        start = time.perf_counter()
+        with quiet():
+            incremental = IncrementalFAISS(index_path, metadata_path, space=embedder.space, embed_fn=embedder)
+            added = incremental.update_index_incrementally(new_utterances=new)
+            incremental.close()
+        elapsed = time.perf_counter() - start
+        result["incremental"] = {
+            "chunks": added,
+            "seconds": round(elapsed, 3),
+            "chunks_per_second": round(added / elapsed, 1) if elapsed else None,
+        }
+
+    result["index_size_mb"] = {
+        "index": round(os.path.getsize(index_path) / 1e6, 2),
+        "metadata": round(os.path.getsize(metadata_path) / 1e6, 2),
+    }
+
+    rss_before_load = current_rss_mb()
+    start = time.perf_counter()
+    with quiet():
+        retriever = DebateRetriever(index_path, metadata_path, embed_fn=embedder)
+    result["load_seconds"] = round(time.perf_counter() - start, 3)
+    rss_after_load = current_rss_mb()
+
+    queries = sample_queries(num_queries)
+    for query in queries[:5]:
+        retriever.retrieve(query, top_k)  # warm-up
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        retriever.retrieve(query, top_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    result["query_ms"] = {
+        "queries": len(latencies),
+        "top_k": top_k,
+        "p50": round(percentile(latencies, 50), 3),
+        "p99": round(percentile(latencies, 99), 3),
+        "mean": round(sum(latencies) / len(latencies), 3),
+    }
+    result["rss_mb"] = {
+        "before_load": round(rss_before_load, 1) if rss_before_load else None,
+        "after_load": round(rss_after_load, 1) if rss_after_load else None,
+        "peak": round(peak_rss_mb(), 1),
+    }
+    return result
+
+
+def run_in_subprocess(num_chunks, args):
+    with tempfile.TemporaryDirectory(prefix="retrieval_bench_") as workdir:
+        env = dict(os.environ)
+        env["EMBEDDING_CHECKPOINT_DIR"] = os.path.join(workdir, "checkpoints")
+        command = [
+            sys.executable, "-m", "backend.benchmarks.retrieval_bench",
+            "--single", str(num_chunks),
+            "--queries", str(args.queries),
+            "--dimensions", str(args.dimensions),
+            "--workdir", workdir,
+        ]
+        result = subprocess.run(command, cwd=SRC_DIR, env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"Benchmark for {num_chunks} chunks failed:\n{result.stderr}")
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline build/load/query benchmark for the retriever")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Corpus sizes in chunks")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dimensions", type=int, default=256, help="Local embedder dimension")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        # Child process: one size, JSON on the last line of stdout
+        print(json.dumps(run_size(args.single, args.queries, args.dimensions, workdir=args.workdir)))
+        return
+
+    report = {
+        "benchmark": "retrieval",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "embedder": f"local-hash-v1 ({args.dimensions}-d)",
+        "results": [],
+    }
+    for size in args.sizes:
+        print(f"Benchmarking {size} chunks...")
+        result = run_in_subprocess(size, args)
+        report["results"].append(result)
+        print(f"  build {result['build']['chunks_per_second']} chunks/s, "
+              f"index {result['index_size_mb']['index']} MB + {result['index_size_mb']['metadata']} MB metadata, "
+              f"load {result['load_seconds']}s, "
+              f"query p50 {result['query_ms']['p50']} ms / p99 {result['query_ms']['p99']} ms, "
+              f"peak RSS {result['rss_mb']['peak']} MB")
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"Report written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
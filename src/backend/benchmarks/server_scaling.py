@@ -0,0 +1,179 @@
+"""
+Pre-fork server scaling benchmark.
+
+Starts the production server (gunicorn.conf.py) with 1, 2, 4, ... workers
+against stub upstreams and a synthetic FAISS index, drives the Q&A and
+fact-check endpoints with closed-loop clients, and reports throughput and
+latency per worker count, plus speedup over one worker.
+
+Run from the `src` directory:
+
+    python -m backend.benchmarks.server_scaling
+    python -m backend.benchmarks.server_scaling --workers 1 2 4 8 --duration 30 --output scaling.json
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+import requests
+
+from backend.benchmarks.http_load import run_load
+from backend.benchmarks.retrieval_bench import quiet
+from backend.benchmarks.stub_upstreams import StubUpstreams
+from backend.benchmarks.synthetic import TOPICS, sample_queries
+
+SRC_DIR = Path(__file__).resolve().parents[2]
+
+QUERIES = sample_queries(500)
+CLAIMS = [f"{words[0].capitalize()} went up under the last administration." for words in TOPICS.values()]
+
+
+def qa_request(client, n):
+    return "POST", "/api/retrieve-response", {"data": {"user_query": QUERIES[(client * 7 + n) % len(QUERIES)]}}
+
+
+def fact_check_request(client, n):
+    return "POST", "/api/fact-check", {"data": {"user_query": CLAIMS[(client + n) % len(CLAIMS)]}}
+
+
+ENDPOINTS = {
+    "qa": qa_request,
+    "fact-check": fact_check_request,
+}
+
+
+def build_synthetic_index(workdir, num_chunks, dimensions):
+    """Build a FAISS index (+ manifest) the stub embedder can query."""
+    os.environ["EMBEDDING_CHECKPOINT_DIR"] = os.path.join(workdir, "checkpoints")
+    from backend.benchmarks.local_embedder import HashEmbedder
+    from backend.benchmarks.synthetic import generate_turns, turns_to_utterances
+    from backend.embeddings_faiss.build_index import build_index
+
+    index_path = os.path.join(workdir, "debates.index")
+    metadata_path = os.path.join(workdir, "debate_metadata.json")
+    embedder = HashEmbedder(dimensions)
+    with quiet():
+        build_index(utterances=turns_to_utterances(generate_turns(num_chunks)), space=embedder.space,
+                    embed_fn=embedder, index_path=index_path, metadata_path=metadata_path)
+    return index_path, metadata_path
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workdir, workers, threads, env, ready_timeout=300):
+    port = free_port()
+    server_env = dict(os.environ, **env)
+    server_env.update({
+        "WEB_WORKERS": str(workers),
+        "WEB_THREADS": str(threads),
+        "WEB_BIND": f"127.0.0.1:{port}",
+        "WEB_ACCESS_LOG": os.devnull,
+        "JOBS_DIR": os.path.join(workdir, "jobs"),
+    })
+    log = open(os.path.join(workdir, f"server_{workers}w.log"), "w")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", str(SRC_DIR / "gunicorn.conf.py"),
+         "--pythonpath", str(SRC_DIR), "main:app"],
+        cwd=workdir, env=server_env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + ready_timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}; see {log.name}")
+        try:
+            if requests.get(f"{url}/api/ready", timeout=2).status_code == 200:
+                return process, url, log
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"Server not ready after {ready_timeout}s; see {log.name}")
+
+
+def stop_server(process, log):
+    process.terminate()
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        process.kill()
+    log.close()
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1))) or [1]
+
+    parser = argparse.ArgumentParser(description="Throughput scaling of the pre-fork server across workers")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers, help="Worker counts to compare")
+    parser.add_argument("--threads", type=int, default=4, help="Threads per worker")
+    parser.add_argument("--concurrency", type=int, help="Concurrent clients (default: 2 x max workers x threads)")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load per endpoint and worker count")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--latency-ms", type=int, default=50, help="Artificial latency of each stub upstream call")
+    parser.add_argument("--chunks", type=int, default=20000, help="Synthetic index size")
+    parser.add_argument("--dimensions", type=int, default=256)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+    concurrency = args.concurrency or 2 * max(args.workers) * args.threads
+
+    stub = StubUpstreams(latency_ms=args.latency_ms, embedding_dimensions=args.dimensions).start()
+    report = {
+        "benchmark": "server_scaling",
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "cpus": cpus,
+        "threads_per_worker": args.threads,
+        "concurrency": concurrency,
+        "stub_latency_ms": args.latency_ms,
+        "results": {endpoint: [] for endpoint in args.endpoints},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="server_scaling_") as workdir:
+        print(f"Building {args.chunks}-chunk synthetic index...")
+        index_path, metadata_path = build_synthetic_index(workdir, args.chunks, args.dimensions)
+        env = dict(stub.env(), EMBEDDING_OUTPUT_INDEX=index_path, EMBEDDING_OUTPUT_METADATA=metadata_path)
+
+        for workers in args.workers:
+            print(f"\nStarting server with {workers} worker(s) x {args.threads} threads...")
+            process, url, log = start_server(workdir, workers, args.threads, env)
+            try:
+                for endpoint in args.endpoints:
+                    result = run_load(url, ENDPOINTS[endpoint], concurrency, args.duration)
+                    result["workers"] = workers
+                    report["results"][endpoint].append(result)
+                    print(f"  {endpoint}: {result['throughput_rps']} req/s, "
+                          f"p50 {result['latency_ms']['p50']} ms, p99 {result['latency_ms']['p99']} ms, "
+                          f"errors {result['error_rate']:.1%}")
+            finally:
+                stop_server(process, log)
+    stub.stop()
+
+    for endpoint, results in report["results"].items():
+        base = results[0]["throughput_rps"] / results[0]["workers"] if results and results[0]["throughput_rps"] else None
+        for result in results:
+            if base:
+                result["speedup"] = round(result["throughput_rps"] / (base * results[0]["workers"]), 2)
+                result["efficiency"] = round(result["throughput_rps"] / (base * result["workers"]), 2)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+        print(f"Report written to {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
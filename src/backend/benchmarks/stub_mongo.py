@@ -0,0 +1,888 @@
+"""
+In-memory MongoDB stand-in that speaks the wire protocol.
+
+Enough of the server side of MongoDB for pymongo to connect and run the
+commands this backend uses: insert, find (with getMore), update (incl.
+upserts and $set/$setOnInsert/$inc/$push/$addToSet), delete, count and
+simple aggregation pipelines, distinct and index management (unique
+indexes are enforced). Data lives in memory and disappears on stop().
+Every command can be delayed by an artificial latency to mimic a remote
+cluster.
+
+It is a load-test tool, not a database: no transactions, no
+authentication, no TLS, and only the query operators listed in `_matches`.
+
+Run from the `src` directory:
+
+    python -m backend.benchmarks.stub_mongo --port 27099 --latency-ms 2
+"""
+import argparse
+import copy
+import itertools
+import re
+import socketserver
+import struct
+import threading
+import time
+from datetime import datetime
+
+import bson
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+
+OP_REPLY = 1
+OP_QUERY = 2004
+OP_MSG = 2013
+OP_COMPRESSED = 2012
+
+_CODEC = CodecOptions(tz_aware=False)
+_MISSING = object()
+# Field values the equality lookups hash (others always fall back to a full match)
+LOOKUP_TYPES = (str, int, float, datetime, ObjectId, type(None))
+
+
+# ============================================================================
+# QUERY MATCHING
+# ============================================================================
+
+def _get_path(doc, path):
+    """Values at a dotted path; arrays along the way fan out."""
+    values = [doc]
+    for part in path.split("."):
+        next_values = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    next_values.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit() and int(part) < len(value):
+                    next_values.append(value[int(part)])
+                else:
+                    next_values.extend(v[part] for v in value if isinstance(v, dict) and part in v)
+        values = next_values
+    return values
+
+
+def _comparable(a, b):
+    return a is not None and b is not None and (
+        type(a) == type(b) or (isinstance(a, (int, float)) and isinstance(b, (int, float))))
+
+
+def _match_value(value, condition):
+    """Does one field value satisfy a condition (literal or {$op: ...})?"""
+    if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+        for op, arg in condition.items():
+            if not _match_operator(value, op, arg, condition):
+                return False
+        return True
+    if value is _MISSING:
+        return condition is None
+    if isinstance(value, list) and not isinstance(condition, list):
+        return condition in value
+    return value == condition
+
+
+def _match_operator(value, op, arg, condition):
+    candidates = value if isinstance(value, list) else [value]
+    if op == "$exists":
+        return (value is not _MISSING) == bool(arg)
+    if op == "$eq":
+        return _match_value(value, arg)
+    if op == "$ne":
+        return not _match_value(value, arg)
+    if op == "$in":
+        if value is _MISSING:
+            return None in arg
+        return any(c in arg for c in candidates) or value in arg
+    if op == "$nin":
+        return not _match_operator(value, "$in", arg, condition)
+    if op in ("$gt", "$gte", "$lt", "$lte"):
+        compare = {"$gt": lambda a: a > arg, "$gte": lambda a: a >= arg,
+                   "$lt": lambda a: a < arg, "$lte": lambda a: a <= arg}[op]
+        return any(_comparable(c, arg) and compare(c) for c in candidates if c is not _MISSING)
+    if op == "$regex":
+        flags = re.IGNORECASE if "i" in condition.get("$options", "") else 0
+        pattern = arg.pattern if hasattr(arg, "pattern") else arg
+        return any(isinstance(c, str) and re.search(pattern, c, flags) for c in candidates)
+    if op == "$options":
+        return True
+    if op == "$size":
+        return isinstance(value, list) and len(value) == arg
+    if op == "$all":
+        return isinstance(value, list) and all(a in value for a in arg)
+    if op == "$elemMatch":
+        return isinstance(value, list) and any(
+            _matches(v, arg) if isinstance(v, dict) else _match_value(v, arg) for v in value)
+    if op == "$not":
+        return not _match_value(value, arg)
+    raise ValueError(f"stub_mongo does not support {op}")
+
+
+def _matches(doc, query):
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(_matches(doc, q) for q in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+        elif key == "$nor":
+            if any(_matches(doc, q) for q in condition):
+                return False
+        else:
+            values = _get_path(doc, key)
+            if not values:
+                values = [_MISSING]
+            if not any(_match_value(v, condition) for v in values):
+                return False
+    return True
+
+
+# ============================================================================
+# UPDATES
+# ============================================================================
+
+def _set_path(doc, path, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _get_single(doc, path, default=None):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return default
+        doc = doc[part]
+    return doc
+
+
+def _unset_path(doc, path):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def _apply_update(doc, update, inserting=False):
+    if not any(k.startswith("$") for k in update):
+        # Replacement document
+        replacement = copy.deepcopy(update)
+        replacement["_id"] = doc.get("_id", replacement.get("_id"))
+        doc.clear()
+        doc.update(replacement)
+        return
+    for op, fields in update.items():
+        for path, arg in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                _set_path(doc, path, copy.deepcopy(arg))
+            elif op == "$setOnInsert":
+                continue
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$inc":
+                _set_path(doc, path, _get_single(doc, path, 0) + arg)
+            elif op == "$max":
+                current = _get_single(doc, path, _MISSING)
+                if current is _MISSING or arg > current:
+                    _set_path(doc, path, arg)
+            elif op == "$min":
+                current = _get_single(doc, path, _MISSING)
+                if current is _MISSING or arg < current:
+                    _set_path(doc, path, arg)
+            elif op in ("$push", "$addToSet"):
+                items = arg["$each"] if isinstance(arg, dict) and "$each" in arg else [arg]
+                array = _get_single(doc, path, None)
+                if array is None:
+                    array = []
+                    _set_path(doc, path, array)
+                for item in items:
+                    if op == "$push" or item not in array:
+                        array.append(copy.deepcopy(item))
+            elif op == "$currentDate":
+                _set_path(doc, path, datetime.utcnow())
+            else:
+                raise ValueError(f"stub_mongo does not support update operator {op}")
+
+
+def _upsert_seed(query):
+    """Fields an upsert copies from its equality filter."""
+    doc = {}
+    for key, condition in (query or {}).items():
+        if key.startswith("$"):
+            continue
+        if isinstance(condition, dict) and any(k.startswith("$") for k in condition):
+            if "$eq" in condition:
+                _set_path(doc, key, copy.deepcopy(condition["$eq"]))
+            continue
+        _set_path(doc, key, copy.deepcopy(condition))
+    return doc
+
+
+# ============================================================================
+# AGGREGATION
+# ============================================================================
+
+def _expr(doc, expression):
+    if isinstance(expression, str) and expression.startswith("$"):
+        return _get_single(doc, expression[1:])
+    if isinstance(expression, dict):
+        if len(expression) == 1 and next(iter(expression)).startswith("$"):
+            op, arg = next(iter(expression.items()))
+            args = [_expr(doc, a) for a in arg] if isinstance(arg, list) else [_expr(doc, arg)]
+            if op == "$size":
+                return len(args[0] or [])
+            if op == "$add":
+                return sum(a or 0 for a in args)
+            if op == "$subtract":
+                return (args[0] or 0) - (args[1] or 0)
+            if op == "$multiply":
+                result = 1
+                for a in args:
+                    result *= a or 0
+                return result
+            if op == "$divide":
+                return (args[0] or 0) / args[1] if args[1] else None
+            if op == "$ifNull":
+                return args[0] if args[0] is not None else args[1]
+            if op == "$toLower":
+                return (args[0] or "").lower()
+            if op == "$literal":
+                return arg
+            raise ValueError(f"stub_mongo does not support expression {op}")
+        return {k: _expr(doc, v) for k, v in expression.items()}
+    return expression
+
+
+def _group(docs, spec):
+    groups = {}
+    order = []
+    for doc in docs:
+        key = _expr(doc, spec["_id"])
+        hashable = bson.encode({"k": key}) if isinstance(key, (dict, list)) else key
+        if hashable not in groups:
+            groups[hashable] = {"_id": key, "_acc": {}}
+            order.append(hashable)
+        acc = groups[hashable]["_acc"]
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            op, arg = next(iter(accumulator.items()))
+            value = _expr(doc, arg)
+            if op == "$sum":
+                acc[field] = acc.get(field, 0) + (value if isinstance(value, (int, float)) else 0)
+            elif op == "$avg":
+                total, count = acc.get(field, (0, 0))
+                acc[field] = (total + (value or 0), count + (value is not None))
+            elif op == "$min":
+                acc[field] = value if field not in acc or (value is not None and value < acc[field]) else acc[field]
+            elif op == "$max":
+                acc[field] = value if field not in acc or (value is not None and value > acc[field]) else acc[field]
+            elif op == "$first":
+                acc.setdefault(field, value)
+            elif op == "$last":
+                acc[field] = value
+            elif op == "$push":
+                acc.setdefault(field, []).append(value)
+            elif op == "$addToSet":
+                items = acc.setdefault(field, [])
+                if value not in items:
+                    items.append(value)
+            else:
+                raise ValueError(f"stub_mongo does not support accumulator {op}")
+    results = []
+    for hashable in order:
+        group = groups[hashable]
+        result = {"_id": group["_id"]}
+        for field, value in group["_acc"].items():
+            op = next(iter(spec[field]))
+            result[field] = (value[0] / value[1] if value[1] else None) if op == "$avg" else value
+        results.append(result)
+    return results
+
+
+def _sort(docs, spec):
+    def key_for(field):
+        def key(doc):
+            value = _get_single(doc, field)
+            # None sorts first, then numbers, strings, everything else
+            rank = 0 if value is None else 1 if isinstance(value, (int, float)) else 2 if isinstance(value, str) else 3
+            return (rank, value if rank in (1, 2) else str(value))
+        return key
+    for field, direction in reversed(list(spec.items())):
+        docs.sort(key=key_for(field), reverse=direction < 0)
+    return docs
+
+
+def _project(doc, projection):
+    if not projection:
+        return doc
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    if include:
+        result = {}
+        for field in include:
+            value = _get_single(doc, field, _MISSING)
+            if value is not _MISSING:
+                _set_path(result, field, value)
+        if projection.get("_id", 1) and "_id" in doc:
+            result["_id"] = doc["_id"]
+        return result
+    result = copy.deepcopy(doc)
+    for field, value in projection.items():
+        if not value:
+            _unset_path(result, field)
+    return result
+
+
+def _aggregate(docs, pipeline):
+    docs = [copy.deepcopy(d) for d in docs]
+    for stage in pipeline:
+        op, spec = next(iter(stage.items()))
+        if op == "$match":
+            docs = [d for d in docs if _matches(d, spec)]
+        elif op == "$group":
+            docs = _group(docs, spec)
+        elif op == "$sort":
+            docs = _sort(docs, spec)
+        elif op == "$skip":
+            docs = docs[spec:]
+        elif op == "$limit":
+            docs = docs[:spec]
+        elif op == "$count":
+            docs = [{spec: len(docs)}] if docs else []
+        elif op == "$project":
+            computed = {k: v for k, v in spec.items() if not isinstance(v, (int, bool))}
+            plain = {k: v for k, v in spec.items() if isinstance(v, (int, bool))}
+            docs = [dict(_project(d, plain) if plain else ({"_id": d.get("_id")} if computed else d),
+                         **{k: _expr(d, v) for k, v in computed.items()}) for d in docs]
+        elif op in ("$set", "$addFields"):
+            for d in docs:
+                for field, expression in spec.items():
+                    _set_path(d, field, _expr(d, expression))
+        elif op == "$unwind":
+            path = (spec["path"] if isinstance(spec, dict) else spec)[1:]
+            unwound = []
+            for d in docs:
+                for item in _get_single(d, path) or []:
+                    copy_doc = copy.deepcopy(d)
+                    _set_path(copy_doc, path, item)
+                    unwound.append(copy_doc)
+            docs = unwound
+        else:
+            raise ValueError(f"stub_mongo does not support pipeline stage {op}")
+    return docs
+
+
+# ============================================================================
+# STORAGE
+# ============================================================================
+
+class DuplicateKey(Exception):
+    pass
+
+
+def _lookup_values(value):
+    """Hashable keys a field value is found under (array fields: each element)."""
+    values = value if isinstance(value, list) else [value]
+    return [v for v in values if isinstance(v, LOOKUP_TYPES)]
+
+
+def _is_lookup_literal(condition):
+    return isinstance(condition, LOOKUP_TYPES)
+
+
+class Collection:
+    def __init__(self):
+        self.docs = {}  # _id (as bson bytes) -> document, in insertion order
+        self.indexes = {"_id_": {"key": {"_id": 1}, "unique": True}}
+        # Each indexed field -> value -> doc keys, so equality queries and
+        # unique checks on indexed fields don't scan the whole collection
+        self.lookups = {}
+        self._rebuild_lookups()
+
+    @staticmethod
+    def _id_key(value):
+        return bson.encode({"_id": value})
+
+    def set_index(self, name, index):
+        self.indexes[name] = index
+        self._rebuild_lookups()
+
+    def drop_index(self, name):
+        if name == "*":
+            self.indexes = {"_id_": self.indexes["_id_"]}
+        else:
+            self.indexes.pop(name, None)
+        self._rebuild_lookups()
+
+    def _rebuild_lookups(self):
+        # Dotted paths can reach into arrays of sub-documents, so only top-level fields get a lookup
+        fields = {field for index in self.indexes.values() for field in index["key"]}
+        self.lookups = {field: {"values": {}, "other": {}} for field in fields if "." not in field}
+        for key, doc in self.docs.items():
+            self._add_lookups(key, doc)
+
+    def _add_lookups(self, key, doc):
+        for field, lookup in self.lookups.items():
+            value = _get_single(doc, field)
+            values = _lookup_values(value)
+            for v in values:
+                lookup["values"].setdefault(v, {})[key] = None
+            if isinstance(value, list) or not values:
+                # Embedded documents, whole-array matches etc. are always re-checked
+                lookup["other"][key] = None
+
+    def _remove_lookups(self, key, doc):
+        for field, lookup in self.lookups.items():
+            for v in _lookup_values(_get_single(doc, field)):
+                lookup["values"].get(v, {}).pop(key, None)
+            lookup["other"].pop(key, None)
+
+    def _candidates(self, field, value):
+        lookup = self.lookups[field]
+        keys = dict(lookup["values"].get(value, {}))
+        keys.update(lookup["other"])
+        return [(k, self.docs[k]) for k in keys if k in self.docs]
+
+    def _check_unique(self, doc, ignore=None):
+        for name, index in self.indexes.items():
+            if not index.get("unique") or name == "_id_":
+                continue
+            fields = list(index["key"])
+            key = [_get_single(doc, f) for f in fields]
+            if fields[0] in self.lookups and _is_lookup_literal(key[0]):
+                others = self._candidates(fields[0], key[0])
+            else:
+                others = self.docs.items()
+            for other_key, other in others:
+                if other_key != ignore and [_get_single(other, f) for f in fields] == key:
+                    raise DuplicateKey(f"E11000 duplicate key error index: {name} dup key: {dict(zip(fields, key))}")
+
+    def insert(self, doc):
+        doc.setdefault("_id", ObjectId())
+        key = self._id_key(doc["_id"])
+        if key in self.docs:
+            raise DuplicateKey(f"E11000 duplicate key error index: _id_ dup key: {doc['_id']}")
+        self._check_unique(doc)
+        self.docs[key] = doc
+        self._add_lookups(key, doc)
+
+    def find(self, query):
+        # Narrow to the most selective indexed equality match, then apply the full query
+        best = None
+        for field, condition in (query or {}).items():
+            if field in self.lookups and _is_lookup_literal(condition):
+                candidates = self._candidates(field, condition)
+                if best is None or len(candidates) < len(best):
+                    best = candidates
+        if best is None:
+            return [doc for doc in self.docs.values() if _matches(doc, query)]
+        return [doc for _, doc in best if _matches(doc, query)]
+
+    def replace(self, doc):
+        key = self._id_key(doc["_id"])
+        self._check_unique(doc, ignore=key)
+        if key in self.docs:
+            self._remove_lookups(key, self.docs[key])
+        self.docs[key] = doc
+        self._add_lookups(key, doc)
+
+    def delete(self, doc):
+        key = self._id_key(doc["_id"])
+        old = self.docs.pop(key, None)
+        if old is not None:
+            self._remove_lookups(key, old)
+
+
+class StubMongo:
+    """Threaded TCP server answering MongoDB wire-protocol commands from memory."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=0):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            latency_ms: Artificial delay added to every command except the handshake
+        """
+        self.latency_ms = latency_ms
+        self.databases = {}
+        self.commands = {}
+        self._lock = threading.RLock()
+        self._cursors = {}
+        self._cursor_ids = itertools.count(1)
+        self._connection_ids = itertools.count(1)
+        stub = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                stub._serve_connection(self.request)
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler, bind_and_activate=False)
+        self.server.allow_reuse_address = True
+        self.server.daemon_threads = True
+        self.server.server_bind()
+        self.server.server_activate()
+        self._thread = None
+
+    @property
+    def uri(self):
+        host, port = self.server.server_address[:2]
+        return f"mongodb://{host}:{port}/?directConnection=true&tls=false"
+
+    def env(self, db_name="debate_ai"):
+        """Environment variables that point the app's MongoDB clients here."""
+        return {"MONGODB_URI": self.uri, "DB_NAME": db_name}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-mongo", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def collection(self, db, name):
+        return self.databases.setdefault(db, {}).setdefault(name, Collection())
+
+    # Wire protocol --------------------------------------------------------
+
+    def _serve_connection(self, sock):
+        connection_id = next(self._connection_ids)
+        while True:
+            header = _recv_exact(sock, 16)
+            if header is None:
+                return
+            length, request_id, _, opcode = struct.unpack("<iiii", header)
+            body = _recv_exact(sock, length - 16)
+            if body is None:
+                return
+            if opcode == OP_QUERY:
+                command, db = self._parse_op_query(body)
+                reply = self._run(command, db, connection_id)
+                sock.sendall(_op_reply(request_id, reply))
+            elif opcode == OP_MSG:
+                command = self._parse_op_msg(body)
+                db = command.pop("$db", "admin")
+                reply = self._run(command, db, connection_id)
+                sock.sendall(_op_msg(request_id, reply))
+            else:
+                return
+
+    @staticmethod
+    def _parse_op_query(body):
+        offset = 4
+        end = body.index(b"\x00", offset)
+        namespace = body[offset:end].decode()
+        offset = end + 1 + 8
+        size = struct.unpack_from("<i", body, offset)[0]
+        command = bson.decode(body[offset:offset + size], codec_options=_CODEC)
+        if "$query" in command:
+            command = command["$query"]
+        return command, namespace.split(".")[0]
+
+    @staticmethod
+    def _parse_op_msg(body):
+        flags = struct.unpack_from("<I", body, 0)[0]
+        end = len(body) - (4 if flags & 1 else 0)
+        offset = 4
+        command = None
+        sequences = {}
+        while offset < end:
+            kind = body[offset]
+            offset += 1
+            if kind == 0:
+                size = struct.unpack_from("<i", body, offset)[0]
+                command = bson.decode(body[offset:offset + size], codec_options=_CODEC)
+                offset += size
+            else:
+                size = struct.unpack_from("<i", body, offset)[0]
+                section_end = offset + size
+                name_end = body.index(b"\x00", offset + 4)
+                identifier = body[offset + 4:name_end].decode()
+                offset = name_end + 1
+                docs = []
+                while offset < section_end:
+                    doc_size = struct.unpack_from("<i", body, offset)[0]
+                    docs.append(bson.decode(body[offset:offset + doc_size], codec_options=_CODEC))
+                    offset += doc_size
+                sequences[identifier] = docs
+        command.update(sequences)
+        return command
+
+    # Commands -------------------------------------------------------------
+
+    def _run(self, command, db, connection_id):
+        name = next(iter(command))
+        handshake = name.lower() in ("hello", "ismaster")
+        if not handshake and self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        handler = getattr(self, f"_cmd_{name.lower()}", None)
+        with self._lock:
+            self.commands[name] = self.commands.get(name, 0) + 1
+            if handler is None:
+                return {"ok": 0, "errmsg": f"stub_mongo: no such command '{name}'", "code": 59}
+            try:
+                reply = handler(command, db)
+            except ValueError as e:
+                return {"ok": 0, "errmsg": str(e), "code": 2}
+        if handshake:
+            reply["connectionId"] = connection_id
+        reply.setdefault("ok", 1)
+        return reply
+
+    def _cmd_hello(self, command, db):
+        return {
+            "helloOk": True, "isWritablePrimary": True, "ismaster": True,
+            "maxBsonObjectSize": 16 * 1024 * 1024, "maxMessageSizeBytes": 48000000,
+            "maxWriteBatchSize": 100000, "localTime": datetime.utcnow(),
+            "logicalSessionTimeoutMinutes": 30, "minWireVersion": 0, "maxWireVersion": 17,
+            "readOnly": False,
+        }
+
+    _cmd_ismaster = _cmd_hello
+
+    def _cmd_ping(self, command, db):
+        return {}
+
+    def _cmd_buildinfo(self, command, db):
+        return {"version": "6.0.0-stub", "versionArray": [6, 0, 0, 0]}
+
+    def _cmd_endsessions(self, command, db):
+        return {}
+
+    def _cmd_killcursors(self, command, db):
+        for cursor_id in command.get("cursors", []):
+            self._cursors.pop(cursor_id, None)
+        return {"cursorsKilled": command.get("cursors", [])}
+
+    def _cmd_listdatabases(self, command, db):
+        return {"databases": [{"name": name, "sizeOnDisk": 0, "empty": False} for name in self.databases]}
+
+    def _cmd_listcollections(self, command, db):
+        batch = [{"name": name, "type": "collection", "options": {}, "info": {"readOnly": False}}
+                 for name in self.databases.get(db, {})]
+        return {"cursor": {"id": 0, "ns": f"{db}.$cmd.listCollections", "firstBatch": batch}}
+
+    def _cmd_create(self, command, db):
+        self.collection(db, command["create"])
+        return {}
+
+    def _cmd_drop(self, command, db):
+        self.databases.get(db, {}).pop(command["drop"], None)
+        return {}
+
+    def _cmd_dropdatabase(self, command, db):
+        self.databases.pop(db, None)
+        return {}
+
+    def _cmd_createindexes(self, command, db):
+        collection = self.collection(db, command["createIndexes"])
+        before = len(collection.indexes)
+        for index in command["indexes"]:
+            if index.get("unique"):
+                probe = Collection()
+                probe.set_index(index["name"], dict(index))
+                for doc in collection.docs.values():
+                    try:
+                        probe.insert(dict(doc))
+                    except DuplicateKey as e:
+                        return {"ok": 0, "errmsg": str(e), "code": 11000}
+            collection.set_index(index["name"], dict(index))
+        return {"numIndexesBefore": before, "numIndexesAfter": len(collection.indexes), "createdCollectionAutomatically": False}
+
+    def _cmd_listindexes(self, command, db):
+        collection = self.collection(db, command["listIndexes"])
+        batch = [dict(index, name=name, v=2) for name, index in collection.indexes.items()]
+        return {"cursor": {"id": 0, "ns": f"{db}.{command['listIndexes']}", "firstBatch": batch}}
+
+    def _cmd_dropindexes(self, command, db):
+        collection = self.collection(db, command["dropIndexes"])
+        target = command["index"]
+        collection.drop_index(target)
+        return {}
+
+    def _cmd_insert(self, command, db):
+        collection = self.collection(db, command["insert"])
+        n = 0
+        errors = []
+        for i, doc in enumerate(command.get("documents", [])):
+            try:
+                collection.insert(doc)
+                n += 1
+            except DuplicateKey as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if command.get("ordered", True):
+                    break
+        reply = {"n": n}
+        if errors:
+            reply["writeErrors"] = errors
+        return reply
+
+    def _cmd_update(self, command, db):
+        collection = self.collection(db, command["update"])
+        matched = modified = 0
+        upserted = []
+        errors = []
+        for i, update in enumerate(command.get("updates", [])):
+            try:
+                docs = collection.find(update.get("q"))
+                if not update.get("multi"):
+                    docs = docs[:1]
+                if docs:
+                    for doc in docs:
+                        before = bson.encode(doc)
+                        new_doc = copy.deepcopy(doc)
+                        _apply_update(new_doc, update["u"])
+                        matched += 1
+                        if bson.encode(new_doc) != before:
+                            collection.replace(new_doc)
+                            modified += 1
+                elif update.get("upsert"):
+                    new_doc = _upsert_seed(update.get("q"))
+                    _apply_update(new_doc, update["u"], inserting=True)
+                    collection.insert(new_doc)
+                    upserted.append({"index": i, "_id": new_doc["_id"]})
+            except DuplicateKey as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if command.get("ordered", True):
+                    break
+        reply = {"n": matched + len(upserted), "nModified": modified}
+        if upserted:
+            reply["upserted"] = upserted
+        if errors:
+            reply["writeErrors"] = errors
+        return reply
+
+    def _cmd_delete(self, command, db):
+        collection = self.collection(db, command["delete"])
+        n = 0
+        for delete in command.get("deletes", []):
+            docs = collection.find(delete.get("q"))
+            if delete.get("limit", 0) == 1:
+                docs = docs[:1]
+            for doc in docs:
+                collection.delete(doc)
+                n += 1
+        return {"n": n}
+
+    def _cmd_findandmodify(self, command, db):
+        collection = self.collection(db, command["findAndModify"])
+        docs = collection.find(command.get("query"))
+        if command.get("sort"):
+            docs = _sort(docs, command["sort"])
+        doc = docs[0] if docs else None
+        if command.get("remove"):
+            if doc is not None:
+                collection.delete(doc)
+            return {"value": doc, "lastErrorObject": {"n": int(doc is not None)}}
+        if doc is None:
+            if not command.get("upsert"):
+                return {"value": None, "lastErrorObject": {"n": 0, "updatedExisting": False}}
+            new_doc = _upsert_seed(command.get("query"))
+            _apply_update(new_doc, command["update"], inserting=True)
+            collection.insert(new_doc)
+            return {"value": new_doc if command.get("new") else None,
+                    "lastErrorObject": {"n": 1, "updatedExisting": False, "upserted": new_doc["_id"]}}
+        new_doc = copy.deepcopy(doc)
+        _apply_update(new_doc, command["update"])
+        collection.replace(new_doc)
+        return {"value": new_doc if command.get("new") else doc,
+                "lastErrorObject": {"n": 1, "updatedExisting": True}}
+
+    def _cursor_reply(self, db, name, docs, batch_size, first=True):
+        batch_size = batch_size or 101
+        batch, rest = docs[:batch_size], docs[batch_size:]
+        cursor_id = 0
+        if rest:
+            cursor_id = next(self._cursor_ids)
+            self._cursors[cursor_id] = rest
+        return {"cursor": {"id": bson.int64.Int64(cursor_id), "ns": f"{db}.{name}",
+                           "firstBatch" if first else "nextBatch": batch}}
+
+    def _cmd_find(self, command, db):
+        collection = self.collection(db, command["find"])
+        docs = collection.find(command.get("filter"))
+        if command.get("sort"):
+            docs = _sort(docs, command["sort"])
+        docs = docs[command.get("skip", 0):]
+        if command.get("limit"):
+            docs = docs[:abs(command["limit"])]
+        docs = [_project(copy.deepcopy(d), command.get("projection")) for d in docs]
+        batch_size = 1 if command.get("singleBatch") else command.get("batchSize")
+        if command.get("singleBatch"):
+            docs = docs[:1]
+        return self._cursor_reply(db, command["find"], docs, batch_size)
+
+    def _cmd_getmore(self, command, db):
+        cursor_id = command["getMore"]
+        docs = self._cursors.pop(cursor_id, [])
+        batch_size = command.get("batchSize") or 1000
+        batch, rest = docs[:batch_size], docs[batch_size:]
+        if rest:
+            self._cursors[cursor_id] = rest
+        return {"cursor": {"id": bson.int64.Int64(cursor_id if rest else 0),
+                           "ns": f"{db}.{command['collection']}", "nextBatch": batch}}
+
+    def _cmd_count(self, command, db):
+        docs = self.collection(db, command["count"]).find(command.get("query"))
+        return {"n": len(docs)}
+
+    def _cmd_distinct(self, command, db):
+        docs = self.collection(db, command["distinct"]).find(command.get("query"))
+        values = []
+        for doc in docs:
+            for value in _get_path(doc, command["key"]):
+                for item in value if isinstance(value, list) else [value]:
+                    if item not in values:
+                        values.append(item)
+        return {"values": values}
+
+    def _cmd_aggregate(self, command, db):
+        name = command["aggregate"]
+        docs = self.collection(db, name).find({}) if isinstance(name, str) else []
+        results = _aggregate(docs, command.get("pipeline", []))
+        return self._cursor_reply(db, name, results, (command.get("cursor") or {}).get("batchSize"))
+
+
+def _recv_exact(sock, n):
+    data = bytearray()
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            return None
+        data.extend(chunk)
+    return bytes(data)
+
+
+def _op_msg(response_to, reply):
+    payload = struct.pack("<I", 0) + b"\x00" + bson.encode(reply)
+    return struct.pack("<iiii", 16 + len(payload), 0, response_to, OP_MSG) + payload
+
+
+def _op_reply(response_to, reply):
+    payload = struct.pack("<iqii", 0, 0, 0, 1) + bson.encode(reply)
+    return struct.pack("<iiii", 16 + len(payload), 0, response_to, OP_REPLY) + payload
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-memory MongoDB stand-in for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=27099)
+    parser.add_argument("--latency-ms", type=int, default=0, help="Artificial latency for every command")
+    args = parser.parse_args()
+
+    stub = StubMongo(args.host, args.port, args.latency_ms)
+    print(f"Stub MongoDB listening on {stub.uri}")
+    for key, value in stub.env().items():
+        print(f"  export {key}={value}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
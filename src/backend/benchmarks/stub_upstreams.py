@@ -0,0 +1,253 @@
+"""
+Local stand-ins for the external APIs the server calls.
+
+One HTTP server answers OpenAI (embeddings + chat completions), Wikipedia
+and NewsAPI requests with deterministic, correctly shaped responses after a configurable
+artificial latency, so the server can be load-tested without API keys, spend
+or rate limits. Point the app at it with the variables from `env()`.
+
+Run from the `src` directory:
+
+    python -m backend.benchmarks.stub_upstreams --port 8900 --latency-ms 150
+"""
+import argparse
+import base64
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from backend.benchmarks.local_embedder import HashEmbedder
+from backend.benchmarks.synthetic import TOPICS
+
+FACT_CHECK_VERDICT = {
+    "verdict": "PARTIALLY SUPPORTED",
+    "confidence": 62,
+    "explanation": "Stubbed verdict: the evidence touches the claim but does not settle it.",
+    "supporting_evidence": ["Stub evidence in favour of the claim."],
+    "contradicting_evidence": [],
+}
+
+
+UPSTREAMS = ("openai_chat", "openai_embeddings", "wikipedia", "newsapi")
+
+
+def _count_tokens(text):
+    # Rough token count for the usage block (~4 chars per token)
+    return max(1, len(text) // 4)
+
+
+def _article_text(title):
+    words = title.lower().split()
+    related = [w for topic in TOPICS.values() for w in topic if any(x in w for x in words)] or TOPICS["economy"]
+    return (f"{title} is a subject of public debate. Discussion commonly covers "
+            f"{', '.join(related[:4])}. Sources disagree on figures and outcomes.")
+
+
+class StubUpstreams:
+    """Threaded HTTP server faking OpenAI, Wikipedia and NewsAPI."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency_ms=None, embedding_dimensions=256):
+        """
+        Args:
+            host: Interface to bind
+            port: Port to bind (0 picks a free one)
+            latency_ms: Artificial latency per upstream, e.g.
+                {"openai_chat": 400, "openai_embeddings": 60, "wikipedia": 120, "newsapi": 150};
+                an int applies to all of them
+            embedding_dimensions: Vector size when a request doesn't pass `dimensions`
+        """
+        if not isinstance(latency_ms, dict):
+            latency_ms = {name: latency_ms or 0 for name in UPSTREAMS}
+        self.latency_ms = latency_ms
+        self.embedder = HashEmbedder(embedding_dimensions)
+        self.counts = {}
+        self._counts_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self):
+        """Environment variables that route the app's upstream calls here."""
+        return {
+            "OPENAI_BASE_URL": f"{self.url}/v1",
+            "OPENAI_API_KEY": "sk-stub",
+            "WIKI_API_URL": f"{self.url}/w/api.php",
+            "NEWSAPI_URL": f"{self.url}/newsapi/v2",
+            "NEWSAPI_KEY": "stub",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="stub-upstreams", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _record(self, upstream):
+        with self._counts_lock:
+            self.counts[upstream] = self.counts.get(upstream, 0) + 1
+        delay = self.latency_ms.get(upstream, 0)
+        if delay:
+            time.sleep(delay / 1000)
+
+    # Responses ------------------------------------------------------------
+
+    def embeddings(self, body):
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs]
+        texts = [text if isinstance(text, str) else " ".join(map(str, text)) for text in inputs]
+        dimensions = body.get("dimensions") or self.embedder.dimensions
+        embedder = self.embedder if dimensions == self.embedder.dimensions else HashEmbedder(dimensions)
+        vectors = embedder(texts)
+        data = []
+        for i, vector in enumerate(vectors):
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(_count_tokens(text) for text in texts)
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def chat(self, body):
+        messages = body.get("messages", [])
+        prompt = " ".join(str(m.get("content", "")) for m in messages)
+        topic_request = re.search(r"Analyze these (\d+) turns", prompt)
+        if topic_request:
+            # Preprocessing's batched topic classification
+            topics = list(TOPICS)
+            count = int(topic_request.group(1))
+            content = json.dumps({"results": [[topics[i % len(topics)], topics[(i + 1) % len(topics)]]
+                                              for i in range(count)]})
+        elif (body.get("response_format") or {}).get("type") == "json_object":
+            content = json.dumps(FACT_CHECK_VERDICT)
+        else:
+            content = ("Stubbed answer: the candidates disagreed on the economy and healthcare. "
+                       "(Debate: Synthetic Debate 1, Timestamp: 00:01:30)")
+        prompt_tokens = _count_tokens(prompt)
+        completion_tokens = _count_tokens(content)
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def wikipedia(self, params):
+        if params.get("list") == "search":
+            query = params.get("srsearch", "")
+            limit = int(params.get("srlimit", 3))
+            words = [w for w in query.split() if len(w) > 3] or ["Debate"]
+            return {"query": {"search": [
+                {"title": f"{words[i % len(words)].strip('?.,').title()} ({i + 1})",
+                 "snippet": f"Overview of {query[:80]}"}
+                for i in range(limit)
+            ]}}
+        title = params.get("titles", "")
+        return {"query": {"pages": {"1": {"title": title, "extract": _article_text(title)}}}}
+
+    def news(self, params):
+        query = params.get("q", "")
+        size = int(params.get("pageSize", 18))
+        sources = ["Reuters", "Associated Press", "BBC News", "Local Gazette"]
+        return {"status": "ok", "totalResults": size, "articles": [
+            {"source": {"id": None, "name": sources[i % len(sources)]},
+             "title": f"Report {i + 1}: {query[:60]}",
+             "description": f"Coverage of {query[:80]} and reactions from both campaigns.",
+             "content": _article_text(query[:40]),
+             "url": f"https://news.example/{i + 1}"}
+            for i in range(size)
+        ]}
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path.endswith("/w/api.php"):
+                    stub._record("wikipedia")
+                    params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                    return self._send(200, stub.wikipedia(params))
+                if parsed.path.endswith("/v2/everything"):
+                    stub._record("newsapi")
+                    params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                    return self._send(200, stub.news(params))
+                self._send(404, {"error": f"stub has no route {parsed.path}"})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                path = urlparse(self.path).path
+                if path.endswith("/embeddings"):
+                    stub._record("openai_embeddings")
+                    return self._send(200, stub.embeddings(body))
+                if path.endswith("/chat/completions"):
+                    stub._record("openai_chat")
+                    return self._send(200, stub.chat(body))
+                self._send(404, {"error": f"stub has no route {path}"})
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub OpenAI, Wikipedia and NewsAPI for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=int, default=0, help="Artificial latency for every upstream call")
+    parser.add_argument("--dimensions", type=int, default=256, help="Default embedding size")
+    args = parser.parse_args()
+
+    stub = StubUpstreams(args.host, args.port, args.latency_ms, args.dimensions)
+    print(f"Stub upstreams listening on {stub.url}")
+    for key, value in stub.env().items():
+        print(f"  export {key}={value}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
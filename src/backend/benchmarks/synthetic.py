@@ -0,0 +1,120 @@
+"""
+Synthetic debate corpus for offline benchmarks.
+
+Generates speaker turns shaped like `extract_speaker_turns()` output (plus
+topics, as after classification) and converts them to the joined utterance
+records `fetch_utterances()` returns, so index builds and retrieval can be
+measured without MongoDB.
+"""
+import random
+import zlib
+from datetime import datetime, timedelta
+
+TOPICS = {
+    "economy": ["inflation", "jobs", "wages", "tariffs", "prices", "growth", "middle class", "manufacturing"],
+    "healthcare": ["insurance", "medicare", "premiums", "hospitals", "prescription drugs", "coverage"],
+    "immigration": ["border", "asylum", "visas", "deportation", "border patrol", "migrants"],
+    "foreign_policy": ["ukraine", "china", "nato", "israel", "russia", "alliances", "sanctions"],
+    "climate": ["emissions", "clean energy", "fracking", "solar", "oil production", "wildfires"],
+    "education": ["schools", "teachers", "student loans", "tuition", "college", "classrooms"],
+    "crime": ["police", "violent crime", "prisons", "law enforcement", "fentanyl", "safety"],
+    "taxes": ["tax cuts", "deductions", "corporate taxes", "child tax credit", "the wealthy"],
+    "abortion": ["roe v wade", "reproductive rights", "ivf", "the states", "women's health"],
+    "guns": ["second amendment", "background checks", "assault weapons", "gun violence"],
+    "elections": ["voting", "ballots", "democracy", "the 2020 election", "fraud", "january 6"],
+    "social_security": ["retirement", "seniors", "benefits", "the trust fund", "pensions"],
+}
+
+FILLER = [
+    "I think", "the American people", "we have to", "let me be clear", "under my plan",
+    "for four years", "what we saw", "the fact is", "my opponent", "every single day",
+    "we will", "they never", "look at the record", "that's why", "across this country",
+]
+
+FIRST_NAMES = ["Alex", "Jordan", "Morgan", "Taylor", "Casey", "Riley", "Jamie", "Avery", "Quinn", "Drew"]
+LAST_NAMES = ["Harper", "Lopez", "Nguyen", "Patel", "Reed", "Brooks", "Kim", "Foster", "Hayes", "Ward"]
+
+
+def _sentence(rng, topic):
+    words = rng.sample(TOPICS[topic], 2)
+    return (f"{rng.choice(FILLER).capitalize()} {words[0]} matters, "
+            f"{rng.choice(FILLER)} {words[1]} and {rng.choice(FILLER)}.")
+
+
+def generate_turns(num_turns, num_debates=None, speakers_per_debate=4, seed=0, first_debate=1):
+    """
+    Generate speaker turns across several debates.
+
+    Args:
+        num_turns: Total number of turns
+        num_debates: Number of debates (default: one per ~200 turns)
+        speakers_per_debate: Distinct speakers in each debate
+        seed: Random seed; the same arguments always give the same corpus
+        first_debate: Number of the first debate (use distinct ranges for
+            corpora that must not share debates, e.g. incremental batches)
+
+    Returns:
+        List of dicts with speaker, timestamp, text, source, date and topics
+    """
+    rng = random.Random(seed)
+    num_debates = num_debates or max(1, num_turns // 200)
+    topic_names = list(TOPICS)
+    base_date = datetime(2000, 1, 1)
+
+    turns = []
+    for i in range(num_turns):
+        debate = i % num_debates
+        seconds = (i // num_debates) * 45
+        speaker = (f"{FIRST_NAMES[(debate + i) % speakers_per_debate % len(FIRST_NAMES)]} "
+                   f"{LAST_NAMES[debate % len(LAST_NAMES)]}")
+        topics = rng.sample(topic_names, rng.randint(1, 3))
+        text = " ".join(_sentence(rng, rng.choice(topics)) for _ in range(rng.randint(2, 6)))
+        turns.append({
+            "speaker": speaker,
+            "timestamp": f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}",
+            "text": text,
+            "source": f"Synthetic Debate {first_debate + debate}",
+            "date": (base_date + timedelta(days=7 * (first_debate + debate))).strftime("%Y-%m-%d"),
+            "topics": topics,
+        })
+    return turns
+
+
+def transcript_text(turns):
+    """Raw transcript text ("Speaker Name (hh:mm:ss): text" lines) for upload tests."""
+    return "\n\n".join(f"{turn['speaker']} ({turn['timestamp']}): {turn['text']}" for turn in turns) + "\n"
+
+
+def turns_to_utterances(turns):
+    """
+    Convert turns to the joined records `fetch_utterances()` returns.
+
+    Ids are derived from the turn's position, speaker and debate, so they are
+    stable across runs.
+    """
+    utterances = []
+    for i, turn in enumerate(turns):
+        debate_key = f"{turn['source']}|{turn['date']}"
+        utterances.append({
+            "utterance_id": f"synthetic_{i:08d}",
+            "debate_id": f"debate_{zlib.crc32(debate_key.encode('utf-8')):08x}",
+            "speaker_id": f"speaker_{zlib.crc32(turn['speaker'].encode('utf-8')):08x}",
+            "text": turn["text"],
+            "speaker_name": turn["speaker"],
+            "speaker_role": "Candidate",
+            "debate_name": turn["source"],
+            "debate_date": datetime.strptime(turn["date"], "%Y-%m-%d"),
+            "timestamp": turn["timestamp"],
+            "topics": turn["topics"],
+        })
+    return utterances
+
+
+def sample_queries(num_queries, seed=1):
+    """Short questions mentioning corpus vocabulary, for query latency runs."""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(num_queries):
+        topic = rng.choice(list(TOPICS))
+        queries.append(f"What did the candidates say about {rng.choice(TOPICS[topic])}?")
+    return queries
@@ -0,0 +1,131 @@
+"""
+CPU benchmark of the zero-shot topic fallback.
+
+Times the old per-text path (one pipeline call per turn on text[:512])
+against the batched ZeroShotClassifier on the turns of a sample transcript,
+and reports turns per second and how often both agree on the top labels.
+The topic cache is not involved. Needs torch and transformers, and the
+model (downloaded on first run).
+
+Run from the `src` directory:
+
+    python -m backend.benchmarks.topic_fallback_bench
+    python -m backend.benchmarks.topic_fallback_bench --model typeform/distilbert-base-uncased-mnli \
+        --batch-sizes 16 32 64 --max-tokens 128 256 --output topics.json
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+from backend.benchmarks.retrieval_bench import quiet
+from backend.preprocessing.preprocess_script import (
+    TOPIC_FALLBACK_LABELS, TOPIC_FALLBACK_MODEL, clean_transcript, extract_speaker_turns,
+)
+from backend.preprocessing.zero_shot import TOPIC_FALLBACK_BATCH_SIZE, TOPIC_FALLBACK_MAX_TOKENS, ZeroShotClassifier
+
+SAMPLE_TRANSCRIPT = Path(__file__).resolve().parents[1] / "preprocessing" / "debate_raw_transcript.txt"
+
+# Same threshold as classify_topics_batch_fallback
+THRESHOLD = 0.3
+
+
+def load_texts(transcript_path, repeat=1):
+    """Turn texts of a raw transcript, repeated `repeat` times."""
+    with open(transcript_path, "r", encoding="utf-8") as f:
+        turns = extract_speaker_turns(clean_transcript(f.read()), "benchmark", "2024-01-01")
+    return [turn["text"] for turn in turns] * repeat
+
+
+def top_labels(scores):
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [label for label, score in ranked if score > THRESHOLD][:3]
+
+
+def per_text(pipeline, texts):
+    """The old fallback loop: one pipeline call per text."""
+    results = []
+    for text in texts:
+        result = pipeline(text[:512], TOPIC_FALLBACK_LABELS, multi_label=True)
+        results.append(dict(zip(result["labels"], result["scores"])))
+    return results
+
+
+def timed(fn, texts):
+    start = time.perf_counter()
+    results = fn(texts)
+    seconds = time.perf_counter() - start
+    return results, {"seconds": round(seconds, 3), "turns_per_second": round(len(texts) / seconds, 2)}
+
+
+def agreement(baseline, results):
+    """Share of texts whose top labels match the baseline exactly."""
+    same = sum(1 for a, b in zip(baseline, results) if top_labels(a) == top_labels(b))
+    return round(same / len(baseline), 3) if baseline else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the zero-shot topic fallback on CPU")
+    parser.add_argument("--model", default=TOPIC_FALLBACK_MODEL, help="Zero-shot model name")
+    parser.add_argument("--transcript", default=str(SAMPLE_TRANSCRIPT), help="Raw transcript to take turns from")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat the transcript's turns this many times")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[TOPIC_FALLBACK_BATCH_SIZE],
+                        help="Premise/hypothesis pairs per forward pass")
+    parser.add_argument("--max-tokens", type=int, nargs="+", default=[TOPIC_FALLBACK_MAX_TOKENS],
+                        help="Premise token budgets")
+    parser.add_argument("--threads", type=int, default=None, help="torch CPU threads (default: torch's choice)")
+    parser.add_argument("--output", help="Write the JSON report here")
+    args = parser.parse_args()
+
+    import torch # type: ignore
+    from transformers import pipeline # type: ignore
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    texts = load_texts(args.transcript, args.repeat)
+    print(f"{len(texts)} turns, {len(TOPIC_FALLBACK_LABELS)} labels, model {args.model}, "
+          f"{torch.get_num_threads()} CPU threads")
+
+    with quiet():
+        classifier_pipeline = pipeline("zero-shot-classification", model=args.model, device=-1)
+    # Warm-up so neither side pays for first-call setup
+    per_text(classifier_pipeline, texts[:1])
+
+    baseline, before = timed(lambda batch: per_text(classifier_pipeline, batch), texts)
+    print(f"  before (per text, text[:512]): {before['turns_per_second']} turns/s ({before['seconds']}s)")
+
+    runs = []
+    for max_tokens in args.max_tokens:
+        for batch_size in args.batch_sizes:
+            classifier = ZeroShotClassifier(classifier_pipeline, max_tokens=max_tokens, batch_size=batch_size)
+            classifier(texts[:1], TOPIC_FALLBACK_LABELS)
+            results, after = timed(lambda batch: classifier(batch, TOPIC_FALLBACK_LABELS), texts)
+            after.update({
+                "max_tokens": max_tokens,
+                "batch_size": batch_size,
+                "speedup": round(before["seconds"] / after["seconds"], 2),
+                "top_label_agreement": agreement(baseline, results),
+            })
+            runs.append(after)
+            print(f"  after (batched, {max_tokens} tokens, {batch_size} pairs/pass): "
+                  f"{after['turns_per_second']} turns/s, {after['speedup']}x, "
+                  f"top labels agree on {after['top_label_agreement']:.0%} of turns")
+
+    report = {
+        "model": args.model,
+        "transcript": args.transcript,
+        "turns": len(texts),
+        "labels": len(TOPIC_FALLBACK_LABELS),
+        "threads": torch.get_num_threads(),
+        "before": before,
+        "after": runs,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -2,27 +2,30 @@
 LLM Client for OpenAI GPT-5 Nano
 Handles interactions with the OpenAI API for RAG applications
 """
-from openai import OpenAI
 from typing import List, Dict, Optional
-import os
+
+from backend.providers import Provider, get_provider
+from backend.providers.openai_provider import OpenAIProvider
 
 
 class LLMClient:
     """Client for interacting with OpenAI's GPT-5 Nano model"""
 
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-5-nano"):
+    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-5-nano", provider: Optional[Provider] = None):
         """
         Initialize the LLM client
 
         Args:
-            api_key: OpenAI API key (defaults to OPENAI_API_KEY env variable)
+            api_key: OpenAI API key (defaults to the configured provider)
             model: Model name to use (default: gpt-5-nano)
+            provider: Provider to send requests to (defaults to LLM_PROVIDER, or OpenAI with api_key if given)
         """
-        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
-        if not self.api_key:
+        if provider is None:
+            provider = OpenAIProvider(api_key) if api_key else get_provider()
+        if not provider.available:
             raise ValueError("OpenAI API key must be provided or set as OPENAI_API_KEY environment variable")
 
-        self.client = OpenAI(api_key=self.api_key)
+        self.provider = provider
         self.model = model
 
     def generate_response(
@@ -51,22 +54,22 @@ class LLMClient:
         messages.append({"role": "user", "content": augmented_query})
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
+            response = self.provider.chat(
+                messages,
+                self.model,
                 max_tokens=max_completion_tokens
                 # changed from max_completion_tokens to max_tokens for API compatibility
             )
             result = {
                 "success": True,
-                "response": response.choices[0].message.content,
+                "response": response.content,
                 "model": response.model,
                 "usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
+                    "prompt_tokens": response.usage.get("prompt_tokens"),
+                    "completion_tokens": response.usage.get("completion_tokens"),
+                    "total_tokens": response.usage.get("total_tokens")
                 },
-                "finish_reason": response.choices[0].finish_reason
+                "finish_reason": response.finish_reason
             }
             return result
         except Exception as e:
@@ -110,18 +113,13 @@ class LLMClient:
             messages.append({"role": "user", "content": user_query})
 
         try:
-            # Call OpenAI API with streaming
+            # Call the provider with streaming
             # Note: GPT-5 Nano only supports default temperature (1.0)
-            stream = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                max_completion_tokens=max_completion_tokens,
-                stream=True
+            yield from self.provider.stream_chat(
+                messages,
+                self.model,
+                max_completion_tokens=max_completion_tokens
             )
 
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
-
         except Exception as e:
             yield f"Error: {str(e)}"
\ No newline at end of file
@@ -0,0 +1,239 @@
+"""
+Async data access for the debate database.
+
+The same operations as the blocking code (DataInserter's bulk load,
+build_index.fetch_utterances and IncrementalFAISS's new-debate lookup) on
+pymongo's AsyncMongoClient, so an async serving path never stalls its event
+loop on MongoDB. Independent queries run concurrently, bulk_write batches
+are in flight together, and iter_utterances() hands out cursor batches so
+callers can embed one batch while the next is being read. The blocking
+classes stay as they are for scripts.
+
+    async def main():
+        repo = AsyncDebateRepository()
+        stats = await repo.load_csv("backend/data/sample_data.csv")
+        utterances = await repo.fetch_utterances()
+"""
+import asyncio
+import csv
+import os
+import time
+
+from dotenv import load_dotenv
+from pymongo.errors import BulkWriteError
+
+from backend.database.client import get_async_client
+from backend.database.config import DatabaseConfig
+from backend.database.insert import (
+    LAST_SEQ, MONGO_BULK_BATCH_SIZE, debate_upsert, debates_query, next_seq, parse_date, speaker_upsert,
+    upserted_despite_duplicates, utterance_documents, utterance_upserts,
+)
+from backend.database.stats import STATS_COLLECTION, debate_stats_updates
+
+load_dotenv()
+
+# bulk_write batches in flight at once during a load
+MONGO_ASYNC_WRITE_CONCURRENCY = int(os.getenv("MONGO_ASYNC_WRITE_CONCURRENCY", "4"))
+# Utterances per batch handed out by iter_utterances()
+MONGO_CURSOR_BATCH_SIZE = int(os.getenv("MONGO_CURSOR_BATCH_SIZE", "1000"))
+
+
+def join_utterance(u, speaker, debate):
+    """Utterance with its speaker and debate fields, as the FAISS index builders expect."""
+    return {
+        "utterance_id": u["utterance_id"],
+        "debate_id": u["debate_id"],
+        "speaker_id": u["speaker_id"],
+        "text": u["text"],
+        "speaker_name": speaker.get("name", "Unknown"),
+        "speaker_role": speaker.get("role", "Unknown"),
+        "debate_name": debate.get("name", "Unknown"),
+        "debate_date": debate.get("date"),
+        "timestamp": u.get("timestamp", None),
+        "topics": u.get("topics")
+    }
+
+
+class AsyncDebateRepository:
+    def __init__(self, db=None, db_name=None):
+        """
+        Args:
+            db: AsyncDatabase to use; the running event loop's shared client if None
+            db_name: Database name when db is None (DatabaseConfig.DATABASE_NAME by default)
+        """
+        self._db = db
+        self.db_name = db_name or DatabaseConfig.DATABASE_NAME
+
+    @property
+    def db(self):
+        # Bound on first use, inside the event loop that will run the queries
+        if self._db is None:
+            self._db = get_async_client()[self.db_name]
+        return self._db
+
+    async def ping(self):
+        await self.db.client.admin.command("ping")
+        return True
+
+    # ------------------------------------------------------------------
+    # Loading (DataInserter)
+    # ------------------------------------------------------------------
+    async def upsert_missing(self, collection, operations):
+        """Unordered bulk_write of speaker/debate upserts; a concurrent load inserting the same one first is fine."""
+        try:
+            await collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Re-raises anything but duplicate-key errors on the unique name indexes
+            upserted_despite_duplicates(e)
+
+    async def resolve_speakers(self, names):
+        """Dict of name -> speaker_id, creating speakers that don't exist yet."""
+        speakers = self.db["speakers"]
+        speakers_dict = {s["name"]: s["speaker_id"]
+                         async for s in speakers.find({"name": {"$in": list(names)}})}
+        missing = [name for name in names if name not in speakers_dict]
+        if missing:
+            await self.upsert_missing(speakers, [speaker_upsert(name) for name in missing])
+            speakers_dict.update([(s["name"], s["speaker_id"])
+                                  async for s in speakers.find({"name": {"$in": missing}})])
+        return speakers_dict
+
+    async def resolve_debates(self, keys):
+        """Dict of (source, date string) -> debate_id, creating debates that don't exist yet."""
+        debates = self.db["debates"]
+        date_objs = {key: parse_date(key[1]) for key in keys}
+
+        async def lookup(wanted):
+            found = {(d["name"], d["date"]): d["debate_id"] async for d in debates.find(debates_query(wanted, date_objs))}
+            return {key: found[(key[0], date_objs[key])] for key in wanted if (key[0], date_objs[key]) in found}
+
+        debates_dict = await lookup(keys) if keys else {}
+        missing = [key for key in keys if key not in debates_dict]
+        if missing:
+            await self.upsert_missing(debates, [debate_upsert(key[0], date_objs[key]) for key in missing])
+            debates_dict.update(await lookup(missing))
+        return debates_dict
+
+    async def next_seqs(self, debate_ids):
+        """First free seq of each debate, all lookups at once."""
+        debate_ids = list(debate_ids)
+        lasts = await asyncio.gather(*[
+            self.db["utterances"].find_one({"debate_id": debate_id}, {"seq": 1}, sort=LAST_SEQ)
+            for debate_id in debate_ids])
+        return {debate_id: next_seq(last) for debate_id, last in zip(debate_ids, lasts)}
+
+    async def upsert_utterances(self, operations, batch_size=MONGO_BULK_BATCH_SIZE,
+                                concurrency=MONGO_ASYNC_WRITE_CONCURRENCY):
+        """
+        Send utterance upserts in batches, up to `concurrency` batches at once.
+
+        Returns:
+            Positions (in `operations`) of the upserts that inserted
+        """
+        utterances = self.db["utterances"]
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def write(start):
+            async with semaphore:
+                try:
+                    result = await utterances.bulk_write(operations[start:start + batch_size], ordered=False)
+                    positions = list(result.upserted_ids)
+                except BulkWriteError as e:
+                    positions = upserted_despite_duplicates(e)
+                return [start + position for position in positions]
+
+        batches = await asyncio.gather(*[write(i) for i in range(0, len(operations), batch_size)])
+        return [position for batch in batches for position in batch]
+
+    async def load_rows(self, rows, batch_size=MONGO_BULK_BATCH_SIZE):
+        """
+        Async DataInserter.load_rows().
+
+        Args:
+            rows: Speaker turns from preprocess() or CSV rows
+            batch_size: Utterance upserts per bulk_write call
+
+        Returns:
+            Dict with rows, inserted, existing, seconds and rows_per_second
+        """
+        start = time.perf_counter()
+        speakers_dict, debates_dict = await asyncio.gather(
+            self.resolve_speakers({row["speaker"] for row in rows}),
+            self.resolve_debates({(row["source"], row["date"]) for row in rows}),
+        )
+        documents = utterance_documents(rows, speakers_dict, debates_dict,
+                                        await self.next_seqs(set(debates_dict.values())))
+        operations = utterance_upserts(documents)
+        inserted_ids = {documents[i]["utterance_id"] for i in await self.upsert_utterances(operations, batch_size)}
+        inserted = len(inserted_ids)
+
+        stats_updates = debate_stats_updates(documents, inserted_ids,
+                                             {sid: name for name, sid in speakers_dict.items()},
+                                             {did: (source, parse_date(date)) for (source, date), did in debates_dict.items()})
+        if stats_updates:
+            await self.db[STATS_COLLECTION].bulk_write(stats_updates, ordered=False)
+
+        seconds = time.perf_counter() - start
+        stats = {
+            "rows": len(rows),
+            "inserted": inserted,
+            "existing": len(operations) - inserted,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(len(rows) / seconds, 1) if seconds > 0 else None,
+        }
+        print(f"Done: {len(speakers_dict)} speakers, {len(debates_dict)} debates, "
+              f"{inserted} new utterances ({stats['existing']} already present)")
+        return stats
+
+    async def load_csv(self, csv_file_path, batch_size=MONGO_BULK_BATCH_SIZE):
+        """load_rows() for a clean transcript CSV (read in a worker thread)."""
+        def read():
+            with open(csv_file_path, "r", encoding="utf-8") as file:
+                return list(csv.DictReader(file))
+        return await self.load_rows(await asyncio.to_thread(read), batch_size)
+
+    # ------------------------------------------------------------------
+    # Reading (fetch_utterances / IncrementalFAISS)
+    # ------------------------------------------------------------------
+    async def speakers_and_debates(self, debate_ids=None):
+        """(speaker_id -> speaker, debate_id -> debate), both queries at once."""
+        debate_query = {"debate_id": {"$in": list(debate_ids)}} if debate_ids is not None else {}
+        speakers, debates = await asyncio.gather(
+            self.db["speakers"].find({}).to_list(None),
+            self.db["debates"].find(debate_query).to_list(None),
+        )
+        return {s["speaker_id"]: s for s in speakers}, {d["debate_id"]: d for d in debates}
+
+    async def fetch_utterances(self, debate_ids=None):
+        """
+        Joined utterances (as build_index.fetch_utterances()), optionally only
+        for some debates. Utterances, speakers and debates are read concurrently.
+        """
+        query = {"debate_id": {"$in": list(debate_ids)}} if debate_ids is not None else {}
+        utterances, (speakers, debates) = await asyncio.gather(
+            self.db["utterances"].find(query).sort("_id", 1).to_list(None),
+            self.speakers_and_debates(debate_ids),
+        )
+        return [join_utterance(u, speakers.get(u["speaker_id"], {}), debates.get(u["debate_id"], {}))
+                for u in utterances]
+
+    async def iter_utterances(self, debate_ids=None, batch_size=MONGO_CURSOR_BATCH_SIZE):
+        """
+        Yield joined utterances in lists of up to batch_size as the cursor
+        returns them, so a consumer can process one batch while the next is read.
+        """
+        speakers, debates = await self.speakers_and_debates(debate_ids)
+        query = {"debate_id": {"$in": list(debate_ids)}} if debate_ids is not None else {}
+        batch = []
+        async for u in self.db["utterances"].find(query).batch_size(batch_size):
+            batch.append(join_utterance(u, speakers.get(u["speaker_id"], {}), debates.get(u["debate_id"], {})))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def new_debate_ids(self, indexed_debate_ids):
+        """Ids of debates in the database that aren't in `indexed_debate_ids`."""
+        return [d["debate_id"] async for d in self.db["debates"].find(
+            {"debate_id": {"$nin": list(indexed_debate_ids)}}, {"debate_id": 1})]
@@ -0,0 +1,102 @@
+"""
+Process-wide MongoDB client.
+
+MongoClient is thread-safe and keeps its own connection pool, so every
+module borrows the one client from get_client() instead of opening its own
+(each new client is another TLS handshake and another pool). Pool sizes and
+timeouts come from MONGO_* environment variables.
+
+The client is created on first use. pymongo clients are not fork-safe, so a
+forked child (gunicorn workers) drops the inherited one and builds its own.
+
+Async code uses get_async_client() instead: an AsyncMongoClient with the
+same settings, one per event loop (an async client is tied to its loop).
+"""
+import asyncio
+import os
+import weakref
+
+from dotenv import load_dotenv
+from pymongo import AsyncMongoClient, MongoClient
+
+from backend.database.config import DatabaseConfig, mongo_tls_kwargs
+from backend.utils import LazyResource
+from backend.utils.metrics import MONGO_LISTENER
+
+load_dotenv()
+
+# Connections per server in the pool; requests wait for a free one above this
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+# Idle pooled connections are closed after this long (0 = never)
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "10000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "10000"))
+# How long to wait for a free pooled connection (0 = forever)
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "10000"))
+# Per-operation socket timeout (0 = none; bulk loads and full scans can be slow)
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "0"))
+
+
+def client_kwargs(uri):
+    """Keyword arguments for MongoClient: pool, timeouts, TLS and the metrics listener."""
+    return {
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS or None,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS or None,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS or None,
+        "event_listeners": [MONGO_LISTENER],
+        **mongo_tls_kwargs(uri),
+    }
+
+
+def _create_client():
+    uri = DatabaseConfig.MONGODB_URI
+    return MongoClient(uri, **client_kwargs(uri))
+
+
+_client = LazyResource(_create_client, "mongo")
+
+
+def get_client():
+    """The shared MongoClient. Don't close it; use close_client() at shutdown."""
+    return _client.get()
+
+
+def get_database(name=None):
+    """Database `name` on the shared client (DatabaseConfig.DATABASE_NAME by default)."""
+    return get_client()[name or DatabaseConfig.DATABASE_NAME]
+
+
+def close_client():
+    """Close the shared client; the next get_client() opens a new one."""
+    _client.reset(close=lambda client: client.close())
+
+
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    """The AsyncMongoClient for the running event loop (call from a coroutine)."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        uri = DatabaseConfig.MONGODB_URI
+        client = _async_clients[loop] = AsyncMongoClient(uri, **client_kwargs(uri))
+    return client
+
+
+async def close_async_client():
+    """Close the running event loop's async client, if it has one."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+
+
+# The parent's sockets and monitor threads are unusable after fork; start fresh
+# without closing them (that would also disconnect the parent)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=lambda: _client.reset())
@@ -1,4 +1,5 @@
 import os
+import certifi
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -6,4 +7,14 @@ load_dotenv()
 class DatabaseConfig:
     MONGODB_URI = os.getenv("MONGODB_URI")
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-    DATABASE_NAME = "debate_ai"
\ No newline at end of file
+    DATABASE_NAME = "debate_ai"
+
+def mongo_tls_kwargs(uri):
+    """
+    TLS options for MongoClient: Atlas needs certifi's CA bundle, but a
+    URI that explicitly says tls=false (local test servers) gets none.
+    """
+    query = (uri or "").split("?", 1)[1].lower() if "?" in (uri or "") else ""
+    if "tls=false" in query or "ssl=false" in query:
+        return {}
+    return {"tlsCAFile": certifi.where()}
@@ -1,15 +1,10 @@
-from pymongo import MongoClient
+from .client import get_client
 from .config import DatabaseConfig
-import certifi
 
 class DebateDatabase:
     def __init__(self):
-        # Connection
-        # self.client = MongoClient(DatabaseConfig.MONGODB_URI) < - more secure but broken for me :(
-        self.client = MongoClient(
-        DatabaseConfig.MONGODB_URI,
-        tlsCAFile=certifi.where()
-        )
+        # Connection (borrowed from the process-wide pool, see client.py)
+        self.client = get_client()
         self.db = self.client[DatabaseConfig.DATABASE_NAME]
         
         # Tables
@@ -17,14 +12,10 @@ class DebateDatabase:
         self.debates = self.db["debates"] 
         self.utterances = self.db["utterances"]
 
-        self.indexes()
-
     def indexes(self):
-        self.speakers.create_index("speaker_id", unique=True)
-        self.debates.create_index("debate_id", unique=True)
-        self.utterances.create_index("utterance_id", unique=True)
-        self.utterances.create_index("debate_id")
-        self.utterances.create_index("speaker_id")
+        # Index creation is a one-time migration now (python -m backend.database.migrations ensure-indexes)
+        from .migrations import ensure_indexes
+        ensure_indexes(self.db)
     
     def test_connection(self):
         try:
@@ -37,5 +28,6 @@ class DebateDatabase:
             return False
     
     def close_connection(self):
-        self.client.close()
-        print("Connection closed.\n")
\ No newline at end of file
+        # The client is shared with the rest of the process, so it stays open
+        # (backend.database.client.close_client() closes it for good)
+        print("Connection released.\n")
\ No newline at end of file
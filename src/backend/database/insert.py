@@ -1,39 +1,230 @@
 # This file will contain data insertion functions :D
 import csv
+import hashlib
+import os
+import re
+import time
+import unicodedata
 import uuid
 from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from .connection import DebateDatabase
+from .stats import STATS_COLLECTION, debate_stats_updates
+from backend.utils.tracing import traced
+
+# Utterance upserts sent per bulk_write call
+MONGO_BULK_BATCH_SIZE = int(os.getenv("MONGO_BULK_BATCH_SIZE", "1000"))
+
+UTTERANCE_ID_PREFIX = "utt_"
+DUPLICATE_KEY = 11000
+
+def normalize_text(text):
+    # Unicode NFC with whitespace runs collapsed, so re-extracted transcripts hash the same
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+def make_utterance_id(debate_id, speaker_id, timestamp, text):
+    """
+    Deterministic utterance id: SHA-256 of (debate_id, speaker_id, timestamp,
+    normalized text), 128 bits in hex. The same utterance always gets the
+    same id, so the unique index on utterance_id does the dedup.
+    """
+    key = "\x1f".join([str(debate_id), str(speaker_id), str(timestamp or ""), normalize_text(text)])
+    return UTTERANCE_ID_PREFIX + hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+TIMESTAMP_PATTERN = re.compile(r"^[\[(]?\s*(?:(\d+):)?(\d{1,2}):(\d{1,2})\s*[\])]?$")
+
+def parse_offset(timestamp):
+    """
+    Seconds from the start of the debate for a transcript timestamp.
+
+    Accepts "HH:MM:SS" and "MM:SS", optionally in brackets or parentheses.
+
+    Returns:
+        int, or None for "N/A" and anything else that isn't a timestamp
+    """
+    match = TIMESTAMP_PATTERN.match((timestamp or "").strip())
+    if not match:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours or 0) * 3600 + int(minutes) * 60 + int(seconds)
+
+def generate_unique_id():
+    return f"chunk_{uuid.uuid4().hex[:8]}"
+
+def parse_date(date):
+    # Parse date string to datetime object with error handling
+    try:
+        return datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        print(f"⚠️  Warning: Invalid date format '{date}', using current date")
+        # Whole seconds, so the stored date (millisecond precision) matches on lookup
+        return datetime.now().replace(microsecond=0)
+
+def speaker_upsert(name):
+    # Upsert by name; the unique name index makes a concurrent loader's
+    # duplicate insert fail with a duplicate-key error instead
+    return UpdateOne({"name": name},
+                     {"$setOnInsert": {"speaker_id": generate_unique_id(),
+                                       "role": "Candidate"}}, # Will update the CSV file later
+                     upsert=True)
+
+def debate_upsert(source, date_obj):
+    # Unique on (name, date) like speaker_upsert
+    return UpdateOne({"name": source, "date": date_obj},
+                     {"$setOnInsert": {"debate_id": generate_unique_id()}},
+                     upsert=True)
+
+def debates_query(keys, date_objs):
+    # Match any of the (source, date) pairs; date_objs maps each pair to its parsed date
+    return {"$or": [{"name": source, "date": date_objs[(source, date)]} for source, date in keys]}
+
+def upserted_despite_duplicates(error):
+    """
+    Positions of the operations that inserted a document in an unordered
+    bulk_write that raised BulkWriteError.
+
+    A concurrent loader can insert the same id between our match and our
+    insert; those duplicate-key errors just mean the document exists. Any
+    other write error is re-raised.
+    """
+    if any(e["code"] != DUPLICATE_KEY for e in error.details["writeErrors"]):
+        raise error
+    return [upsert["index"] for upsert in error.details.get("upserted", [])]
+
+def parse_topics(topics):
+    # Preprocessed turns carry a list; CSV rows a comma-separated string
+    if isinstance(topics, (list, tuple)):
+        return list(topics) or ["general_political_commentary"]
+    return topics.split(',') if topics else ["general_political_commentary"]
+
+# Sort for the utterance with the highest seq in a debate (index debate_id, seq)
+LAST_SEQ = [("seq", -1)]
+
+def next_seq(last):
+    """seq that follows `last`, the debate's highest-seq utterance (None if it has none)."""
+    return last["seq"] + 1 if last and last.get("seq") is not None else 0
+
+def utterance_documents(rows, speakers_dict, debates_dict, seq_starts=None):
+    """
+    One utterance document per distinct utterance in loader rows; repeats
+    within the rows are dropped.
+
+    seq is the utterance's position in its debate's transcript (speaking
+    order), counted from the debate's seq_starts entry so a second file or a
+    corrected re-upload for the same debate goes after what is already
+    stored instead of reusing its seq values.
+
+    Args:
+        rows: Dicts with speaker, timestamp, text, source, date and topics
+            (a list, or a comma-separated string as in the CSVs)
+        speakers_dict: Speaker name -> speaker_id
+        debates_dict: (source, date) -> debate_id
+        seq_starts: debate_id -> first free seq (0 for debates not listed)
+
+    Returns:
+        List of utterance documents, in row order
+    """
+    documents = {}
+    seqs = dict(seq_starts or {})
+    for row in rows:
+        debate_id = debates_dict[(row["source"], row["date"])]
+        speaker_id = speakers_dict[row["speaker"]]
+        utterance_id = make_utterance_id(debate_id, speaker_id, row["timestamp"], row["text"])
+        if utterance_id in documents:
+            continue
+
+        seq = seqs.get(debate_id, 0)
+        seqs[debate_id] = seq + 1
+
+        documents[utterance_id] = {
+            "utterance_id": utterance_id, "debate_id": debate_id, "speaker_id": speaker_id,
+            "text": row["text"], "timestamp": row["timestamp"], "offset_seconds": parse_offset(row["timestamp"]),
+            "seq": seq, "topics": parse_topics(row.get("topics")),
+        }
+    return list(documents.values())
+
+def utterance_upserts(documents):
+    """$setOnInsert upserts keyed on utterance_id, so existing utterances are left as they are."""
+    return [
+        UpdateOne({"utterance_id": doc["utterance_id"]},
+                  {"$setOnInsert": {k: v for k, v in doc.items() if k != "utterance_id"}},
+                  upsert=True)
+        for doc in documents
+    ]
 
 class DataInserter(DebateDatabase):
     def __init__(self):
         super().__init__() # Initialize DebateDatabase in order to use self.speakers, self.debates, and self.utterances
 
-    def process_transcript_file(self, csv_file_path):
-        speakers_dict = {}  # speaker_id = name
-        debates_dict = {}   # debate_id = (source, date)
+    @traced("mongo_insert")
+    def load_rows(self, rows, batch_size=MONGO_BULK_BATCH_SIZE):
+        """
+        Load transcript rows with batched upserts.
 
-        # Load clean CSV file
-        try:
-            with open(csv_file_path, "r", encoding="utf-8") as file:
-                csv_reader = csv.DictReader(file)
+        Speakers and debates are resolved with one query each; utterances
+        are written with unordered bulk_write upserts on their content-hash
+        utterance_id (see make_utterance_id), so rows already in the
+        database are skipped through the unique index.
 
-                for row in csv_reader:
-                    # Insert speaker
-                    speaker_id = self.insert_speaker(row["speaker"], speakers_dict)
-                    
-                    # Insert debate with date
-                    debate_id = self.insert_debate(row["source"], row["date"], debates_dict)
-                    
-                    # Parse topics from CSV (comma-separated string)
-                    topics_str = row.get("topics", "general_political_commentary")
-                    topics = topics_str.split(',') if topics_str else ["general_political_commentary"]
+        Args:
+            rows: Speaker turns straight from preprocess() (topics as a list),
+                or CSV rows (topics comma-separated)
+            batch_size: Utterance upserts per bulk_write call
 
-                    # Insert utterance
-                    self.insert_utterance(debate_id, speaker_id, row["text"], row["timestamp"], topics)
+        Returns:
+            Dict with rows, inserted, existing, seconds and rows_per_second
+        """
+        start = time.perf_counter()
 
-                    print(f"Added: {row['speaker']} - {row['timestamp']} (Topics: {', '.join(topics[:2])})")
+        speakers_dict = self.resolve_speakers({row["speaker"] for row in rows})
+        debates_dict = self.resolve_debates({(row["source"], row["date"]) for row in rows})
 
-            print(f"Done: {len(speakers_dict)} speakers, {len(debates_dict)} debates")
+        documents = utterance_documents(rows, speakers_dict, debates_dict,
+                                        self.next_seqs(set(debates_dict.values())))
+        operations = utterance_upserts(documents)
+        inserted_ids = set()
+        for i in range(0, len(operations), batch_size):
+            for index in self.bulk_upsert(self.utterances, operations[i:i + batch_size]):
+                inserted_ids.add(documents[i + index]["utterance_id"])
+        inserted = len(inserted_ids)
+
+        # Only utterances this load inserted count towards the debate statistics
+        stats_updates = debate_stats_updates(documents, inserted_ids,
+                                             {sid: name for name, sid in speakers_dict.items()},
+                                             {did: (source, parse_date(date)) for (source, date), did in debates_dict.items()})
+        if stats_updates:
+            self.db[STATS_COLLECTION].bulk_write(stats_updates, ordered=False)
+
+        seconds = time.perf_counter() - start
+        stats = {
+            "rows": len(rows),
+            "inserted": inserted,
+            "existing": len(operations) - inserted,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(len(rows) / seconds, 1) if seconds > 0 else None,
+        }
+        print(f"Done: {len(speakers_dict)} speakers, {len(debates_dict)} debates, "
+              f"{inserted} new utterances ({stats['existing']} already present)")
+        print(f"Loaded {len(rows)} rows in {seconds:.2f}s ({stats['rows_per_second']} rows/s)")
+        return stats
+
+    def process_transcript_file(self, csv_file_path, batch_size=MONGO_BULK_BATCH_SIZE):
+        """
+        Load a clean transcript CSV (see load_rows()).
+
+        Args:
+            csv_file_path: CSV from preprocessing (speaker, timestamp, text, source, date, topics)
+            batch_size: Utterance upserts per bulk_write call
+
+        Returns:
+            Dict with rows, inserted, existing, seconds and rows_per_second (None on error)
+        """
+        # Load clean CSV file
+        try:
+            with open(csv_file_path, "r", encoding="utf-8") as file:
+                rows = list(csv.DictReader(file))
+            return self.load_rows(rows, batch_size)
 
         except FileNotFoundError:
             print(f"CSV file not found: {csv_file_path}")
@@ -46,6 +237,56 @@ class DataInserter(DebateDatabase):
         except Exception as e:
             print(f"Error loading CSV: {e}")
 
+    def next_seqs(self, debate_ids):
+        """First free seq of each debate (one indexed lookup per debate)."""
+        return {debate_id: next_seq(self.utterances.find_one({"debate_id": debate_id}, {"seq": 1}, sort=LAST_SEQ))
+                for debate_id in debate_ids}
+
+    def bulk_upsert(self, collection, operations):
+        """Unordered bulk_write of upserts; returns the positions of the operations that inserted."""
+        try:
+            return list(collection.bulk_write(operations, ordered=False).upserted_ids)
+        except BulkWriteError as e:
+            return upserted_despite_duplicates(e)
+
+    def resolve_speakers(self, names):
+        """
+        Speaker ids for a set of names, creating speakers that don't exist yet.
+
+        Returns:
+            Dict of name -> speaker_id
+        """
+        speakers_dict = {s["name"]: s["speaker_id"] for s in self.speakers.find({"name": {"$in": list(names)}})}
+        missing = [name for name in names if name not in speakers_dict]
+        if missing:
+            # A loader that created one of them first wins; the re-read picks up its id
+            self.bulk_upsert(self.speakers, [speaker_upsert(name) for name in missing])
+            speakers_dict.update((s["name"], s["speaker_id"]) for s in self.speakers.find({"name": {"$in": missing}}))
+        return speakers_dict
+
+    def resolve_debates(self, keys):
+        """
+        Debate ids for a set of (source, date) pairs, creating debates that don't exist yet.
+
+        Returns:
+            Dict of (source, date string) -> debate_id
+        """
+        date_objs = {key: parse_date(key[1]) for key in keys}
+
+        def lookup(wanted):
+            found = {(d["name"], d["date"]): d["debate_id"] for d in self.debates.find(debates_query(wanted, date_objs))}
+            return {key: found[(key[0], date_objs[key])] for key in wanted if (key[0], date_objs[key]) in found}
+
+        debates_dict = lookup(keys) if keys else {}
+        missing = [key for key in keys if key not in debates_dict]
+        if missing:
+            self.bulk_upsert(self.debates, [debate_upsert(key[0], date_objs[key]) for key in missing])
+            debates_dict.update(lookup(missing))
+        return debates_dict
+
+    def parse_date(self, date):
+        return parse_date(date)
+
     def insert_speaker(self, speaker, speakers_dict):
         # Check duplicate in the file
         if speaker in speakers_dict:
@@ -78,12 +319,7 @@ class DataInserter(DebateDatabase):
         if key in debates_dict:
             return debates_dict[key]
         
-        # Parse date string to datetime object with error handling
-        try:
-            date_obj = datetime.strptime(date, "%Y-%m-%d")
-        except ValueError:
-            print(f"⚠️  Warning: Invalid date format '{date}', using current date")
-            date_obj = datetime.now()
+        date_obj = self.parse_date(date)
         
         # Check duplicate in the database
         existing_debate = self.debates.find_one({
@@ -106,28 +342,28 @@ class DataInserter(DebateDatabase):
         debates_dict[key] = debate_id
         return debate_id
     
-    def insert_utterance(self, debate_id, speaker_id, text, timestamp, topics):
-        # Check duplicate in the database
-        existing_utterance = self.utterances.find_one({
-            "debate_id": debate_id,
-            "speaker_id": speaker_id, 
-            "text": text,
-            "timestamp": timestamp
-        })
-
-        if existing_utterance:
-            return
-
-        # Insert
-        utterance_id = self.generate_unique_id()
-        self.utterances.insert_one({
-            "utterance_id": utterance_id,
+    def insert_utterance(self, debate_id, speaker_id, text, timestamp, topics, seq=None):
+        # Upsert on the content-hash id; an existing utterance is left as is.
+        # Without a seq the utterance goes after the debate's current last one
+        if seq is None:
+            seq = self.next_seqs([debate_id])[debate_id]
+        document = {
+            "utterance_id": make_utterance_id(debate_id, speaker_id, timestamp, text),
             "debate_id": debate_id,
             "speaker_id": speaker_id,
             "text": text,
             "timestamp": timestamp,
+            "offset_seconds": parse_offset(timestamp),
+            "seq": seq,
             "topics": topics
-        })
+        }
+        result = self.utterances.bulk_write(utterance_upserts([document]))
+        if result.upserted_count:
+            speaker = self.speakers.find_one({"speaker_id": speaker_id}, {"name": 1}) or {}
+            debate = self.debates.find_one({"debate_id": debate_id}, {"name": 1, "date": 1}) or {}
+            self.db[STATS_COLLECTION].bulk_write(debate_stats_updates(
+                [document], {document["utterance_id"]},
+                {speaker_id: speaker.get("name")}, {debate_id: (debate.get("name"), debate.get("date"))}))
 
     def generate_unique_id(self):
-        return f"chunk_{uuid.uuid4().hex[:8]}"
\ No newline at end of file
+        return generate_unique_id()
\ No newline at end of file
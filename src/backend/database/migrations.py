@@ -0,0 +1,298 @@
+"""
+One-off database migrations.
+
+Run from the `src` directory:
+
+    python -m backend.database.migrations ensure-indexes
+    python -m backend.database.migrations rehash-ids [--dry-run]
+    python -m backend.database.migrations backfill-timeline [--dry-run]
+    python -m backend.database.migrations rebuild-stats
+
+Run `ensure-indexes` once when setting up a database (and after INDEXES
+changes); connections no longer create indexes every time they open. It
+merges duplicate speakers and debates first, since their unique indexes
+can't be built over them; `ensure-indexes --dry-run` only reports them.
+"""
+import argparse
+
+from pymongo import ASCENDING, DeleteOne, IndexModel, UpdateOne
+
+from backend.database.client import close_client, get_database
+from backend.database.insert import (
+    LAST_SEQ, MONGO_BULK_BATCH_SIZE, UTTERANCE_ID_PREFIX, make_utterance_id, next_seq, parse_offset,
+)
+from backend.database.stats import STATS_COLLECTION, rebuild_debate_stats
+
+# Indexes per collection
+INDEXES = {
+    "speakers": [
+        IndexModel("speaker_id", unique=True),
+        # Bulk loader upserts speakers by name; unique, so concurrent loaders share one
+        IndexModel("name", unique=True),
+    ],
+    "debates": [
+        IndexModel("debate_id", unique=True),
+        # Bulk loader upserts debates by (name, date); unique for the same reason
+        IndexModel([("name", ASCENDING), ("date", ASCENDING)], unique=True),
+    ],
+    "utterances": [
+        # Content-hash id: utterance dedup goes through this index
+        IndexModel("utterance_id", unique=True),
+        IndexModel("debate_id"),
+        IndexModel("speaker_id"),
+        # Timelines (see timeline.py): a debate, one speaker in a debate, or
+        # one topic in a debate, all read in seq order straight off the index.
+        # seq ends the topic index too, so topic timelines don't sort in memory
+        IndexModel([("debate_id", ASCENDING), ("seq", ASCENDING)]),
+        IndexModel([("speaker_id", ASCENDING), ("debate_id", ASCENDING), ("seq", ASCENDING)]),
+        IndexModel([("topics", ASCENDING), ("debate_id", ASCENDING), ("seq", ASCENDING)]),
+    ],
+    # One statistics document per debate (see stats.py)
+    STATS_COLLECTION: [
+        IndexModel("debate_id", unique=True),
+    ],
+}
+
+
+def find_duplicates(collection, fields, id_field):
+    """
+    Documents that share the values of `fields`.
+
+    Returns:
+        List of (key, ids) with the ids of each group oldest first
+    """
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": {field: f"${field}" for field in fields},
+                    "ids": {"$push": f"${id_field}"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    return [(group["_id"], group["ids"]) for group in collection.aggregate(pipeline, allowDiskUse=True)]
+
+
+def _repoint_utterances(utterances, field, old_ids, keep_id, batch_size, renumber=False):
+    """
+    Move utterances from old_ids to keep_id (field is speaker_id or debate_id).
+
+    Their content-hash ids change with the field, so they are re-hashed;
+    the ones that then collide with an utterance already under keep_id are
+    duplicates and deleted. With renumber, moved utterances get seqs after
+    keep_id's last one, in their old order.
+
+    Returns:
+        Dict with moved and duplicates counts
+    """
+    taken = {doc["utterance_id"] for doc in utterances.find({field: keep_id}, {"utterance_id": 1})}
+    seq = next_seq(utterances.find_one({field: keep_id}, {"seq": 1}, sort=LAST_SEQ)) if renumber else None
+    counts = {"moved": 0, "duplicates": 0}
+    operations = []
+    for old_id in old_ids:
+        docs = utterances.find({field: old_id}, {"debate_id": 1, "speaker_id": 1, "timestamp": 1, "text": 1}
+                               ).sort([("seq", ASCENDING), ("_id", ASCENDING)])
+        for doc in docs:
+            doc[field] = keep_id
+            new_id = make_utterance_id(doc["debate_id"], doc["speaker_id"], doc.get("timestamp"), doc["text"])
+            if new_id in taken:
+                counts["duplicates"] += 1
+                operations.append(DeleteOne({"_id": doc["_id"]}))
+                continue
+            taken.add(new_id)
+            changes = {field: keep_id, "utterance_id": new_id}
+            if renumber:
+                changes["seq"] = seq
+                seq += 1
+            counts["moved"] += 1
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": changes}))
+    for i in range(0, len(operations), batch_size):
+        utterances.bulk_write(operations[i:i + batch_size], ordered=False)
+    return counts
+
+
+def merge_duplicates(db, dry_run=False, batch_size=MONGO_BULK_BATCH_SIZE):
+    """
+    Merge speakers with the same name and debates with the same (name, date).
+
+    Older databases (and loaders racing before the indexes were unique) can
+    hold several of each. The oldest document of each group is kept, the
+    others' utterances are moved to it (see _repoint_utterances) and the
+    others are deleted. Statistics are rebuilt afterwards; rebuild the FAISS
+    index too, since its metadata carries the old ids.
+
+    Args:
+        db: pymongo Database
+        dry_run: Report duplicates without writing
+
+    Returns:
+        Dict with speakers, debates (documents to remove), utterances_moved and duplicates counts
+    """
+    groups = {
+        "speakers": find_duplicates(db["speakers"], ["name"], "speaker_id"),
+        "debates": find_duplicates(db["debates"], ["name", "date"], "debate_id"),
+    }
+    counts = {"speakers": 0, "debates": 0, "utterances_moved": 0, "duplicates": 0}
+    for name, found in groups.items():
+        for key, ids in found:
+            counts[name] += len(ids) - 1
+            print(f"  - {name}: {len(ids)} documents for {key} ({', '.join(map(str, ids))})")
+    if dry_run or not (counts["speakers"] or counts["debates"]):
+        if counts["speakers"] or counts["debates"]:
+            print(f"Would merge {counts['speakers']} duplicate speakers and {counts['debates']} duplicate debates")
+        return counts
+
+    for name, field in (("speakers", "speaker_id"), ("debates", "debate_id")):
+        for _, ids in groups[name]:
+            keep_id, old_ids = ids[0], ids[1:]
+            moved = _repoint_utterances(db["utterances"], field, old_ids, keep_id, batch_size,
+                                        renumber=(field == "debate_id"))
+            counts["utterances_moved"] += moved["moved"]
+            counts["duplicates"] += moved["duplicates"]
+            db[name].delete_many({field: {"$in": old_ids}})
+            if field == "debate_id":
+                db[STATS_COLLECTION].delete_many({"debate_id": {"$in": old_ids}})
+    print(f"Merged {counts['speakers']} duplicate speakers and {counts['debates']} duplicate debates: "
+          f"{counts['utterances_moved']} utterances moved, {counts['duplicates']} duplicate utterances removed")
+    rebuild_debate_stats(db)
+    print("Rebuild the FAISS index (python -m backend.embeddings_faiss.build_index --fresh) so it carries the new ids")
+    return counts
+
+
+def ensure_indexes(db, dry_run=False):
+    """
+    Create every index in INDEXES, one createIndexes command per collection.
+
+    Duplicate speakers and debates are merged first (see merge_duplicates),
+    and an existing index whose uniqueness differs from INDEXES is dropped
+    and rebuilt. Indexes that already match are left alone, so this is safe
+    to run again.
+
+    Args:
+        db: pymongo Database
+        dry_run: Only report the duplicates that would be merged
+
+    Returns:
+        Dict of collection name -> index names (empty on a dry run)
+    """
+    merge_duplicates(db, dry_run=dry_run)
+    if dry_run:
+        return {}
+    created = {}
+    for name, indexes in INDEXES.items():
+        existing = db[name].index_information()
+        for index in indexes:
+            spec = index.document
+            info = existing.get(spec["name"])
+            if info is not None and bool(info.get("unique")) != bool(spec.get("unique")):
+                print(f"  - {name}: rebuilding {spec['name']} (unique={bool(spec.get('unique'))})")
+                db[name].drop_index(spec["name"])
+        created[name] = db[name].create_indexes(indexes)
+        print(f"  - {name}: {', '.join(created[name])}")
+    return created
+
+
+def rehash_utterance_ids(db, dry_run=False, batch_size=MONGO_BULK_BATCH_SIZE):
+    """
+    Replace random utterance ids (chunk_xxxxxxxx) with content-hash ids.
+
+    Utterances that hash to an id already taken are duplicates of that
+    utterance and are deleted. Run it before re-ingesting old transcripts,
+    and rebuild the FAISS index afterwards so its metadata carries the new ids.
+
+    Args:
+        db: pymongo Database
+        dry_run: Count what would change without writing
+
+    Returns:
+        Dict with scanned, rehashed and duplicates counts
+    """
+    utterances = db["utterances"]
+    # Ids already in use; first come wins, like the unique index would decide
+    taken = {doc["utterance_id"] for doc in utterances.find(
+        {"utterance_id": {"$regex": f"^{UTTERANCE_ID_PREFIX}"}}, {"utterance_id": 1})}
+
+    counts = {"scanned": 0, "rehashed": 0, "duplicates": 0}
+    operations = []
+    legacy = utterances.find({"utterance_id": {"$not": {"$regex": f"^{UTTERANCE_ID_PREFIX}"}}},
+                             {"utterance_id": 1, "debate_id": 1, "speaker_id": 1, "timestamp": 1, "text": 1})
+    for doc in legacy:
+        counts["scanned"] += 1
+        new_id = make_utterance_id(doc["debate_id"], doc["speaker_id"], doc.get("timestamp"), doc["text"])
+        if new_id in taken:
+            counts["duplicates"] += 1
+            operations.append(DeleteOne({"_id": doc["_id"]}))
+        else:
+            taken.add(new_id)
+            counts["rehashed"] += 1
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"utterance_id": new_id}}))
+
+    if not dry_run:
+        for i in range(0, len(operations), batch_size):
+            utterances.bulk_write(operations[i:i + batch_size], ordered=False)
+
+    prefix = "Would rehash" if dry_run else "Rehashed"
+    print(f"{prefix} {counts['rehashed']} utterance ids, "
+          f"{counts['duplicates']} duplicates {'found' if dry_run else 'removed'} "
+          f"({counts['scanned']} legacy ids scanned)")
+    return counts
+
+
+def backfill_timeline(db, dry_run=False, batch_size=MONGO_BULK_BATCH_SIZE):
+    """
+    Give utterances loaded before timelines existed a `seq` and `offset_seconds`.
+
+    Within each debate, utterances without a seq are numbered after the
+    debate's current last seq in insertion (_id) order, which is the order
+    the loader read them from the transcript.
+
+    Args:
+        db: pymongo Database
+        dry_run: Count what would change without writing
+
+    Returns:
+        Dict with debates and utterances counts
+    """
+    utterances = db["utterances"]
+    counts = {"debates": 0, "utterances": 0}
+    operations = []
+    for debate_id in utterances.distinct("debate_id", {"seq": {"$exists": False}}):
+        last = utterances.find_one({"debate_id": debate_id, "seq": {"$exists": True}}, {"seq": 1}, sort=[("seq", -1)])
+        seq = last["seq"] + 1 if last else 0
+        counts["debates"] += 1
+        for doc in utterances.find({"debate_id": debate_id, "seq": {"$exists": False}},
+                                   {"timestamp": 1}).sort("_id", 1):
+            operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": {
+                "seq": seq, "offset_seconds": parse_offset(doc.get("timestamp"))}}))
+            seq += 1
+            counts["utterances"] += 1
+
+    if not dry_run:
+        for i in range(0, len(operations), batch_size):
+            utterances.bulk_write(operations[i:i + batch_size], ordered=False)
+
+    print(f"{'Would number' if dry_run else 'Numbered'} {counts['utterances']} utterances "
+          f"in {counts['debates']} debates")
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Debate database migrations")
+    parser.add_argument("migration", choices=["ensure-indexes", "rehash-ids", "backfill-timeline", "rebuild-stats"], help="Migration to run")
+    parser.add_argument("--dry-run", action="store_true", help="Report changes without writing")
+    args = parser.parse_args()
+
+    db = get_database()
+    try:
+        if args.migration == "ensure-indexes":
+            print("Ensuring indexes...")
+            ensure_indexes(db, dry_run=args.dry_run)
+        elif args.migration == "rehash-ids":
+            rehash_utterance_ids(db, dry_run=args.dry_run)
+        elif args.migration == "backfill-timeline":
+            backfill_timeline(db, dry_run=args.dry_run)
+        elif args.migration == "rebuild-stats":
+            rebuild_debate_stats(db)
+    finally:
+        close_client()
+
+
+if __name__ == "__main__":
+    main()
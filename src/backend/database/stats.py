@@ -0,0 +1,142 @@
+"""
+Materialized per-debate statistics.
+
+The `debate_stats` collection holds one document per debate, kept up to
+date by the loaders: every load adds (`$inc`) the counts of the utterances
+it actually inserted, so re-ingesting a transcript changes nothing.
+Reading a debate's statistics is then a single indexed lookup instead of a
+scan of its utterances.
+
+    {
+        "debate_id": "...", "name": "...", "date": ...,
+        "turns": 212, "words": 18234,
+        "first_offset_seconds": 0, "last_offset_seconds": 5460,
+        "topics": {"economy": 41, "immigration": 17, ...},
+        "speakers": {
+            "<speaker_id>": {"name": "...", "turns": 70, "words": 6120,
+                             "speaking_seconds": 1830,
+                             "first_offset_seconds": 12, "last_offset_seconds": 5400},
+            ...
+        },
+        "updated_at": ...
+    }
+
+A turn's speaking time runs until the next turn with a timestamp;
+turns without one (N/A) count turns and words but no time.
+"""
+from collections import defaultdict
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+STATS_COLLECTION = "debate_stats"
+# Collections whose sizes /api/stats reports
+COUNTED_COLLECTIONS = ["speakers", "debates", "utterances", STATS_COLLECTION]
+
+
+def stat_key(label):
+    # Topic labels become field names: no dots or leading $
+    return str(label).replace(".", "_").lstrip("$") or "unknown"
+
+
+def debate_stats_updates(documents, inserted_ids, speaker_names, debate_info):
+    """
+    One upsert per debate adding the statistics of newly inserted utterances.
+
+    Args:
+        documents: Utterance documents from one load, all of them (later turns
+            bound the speaking time of earlier ones)
+        inserted_ids: utterance_ids the load actually inserted; only these are counted
+        speaker_names: speaker_id -> name
+        debate_info: debate_id -> (name, date)
+
+    Returns:
+        List of UpdateOne for the debate_stats collection
+    """
+    by_debate = defaultdict(list)
+    for doc in documents:
+        by_debate[doc["debate_id"]].append(doc)
+
+    updates = []
+    for debate_id, docs in by_debate.items():
+        docs.sort(key=lambda doc: doc.get("seq") or 0)
+
+        # Offset of the next timestamped turn after each turn
+        next_offsets = [None] * len(docs)
+        upcoming = None
+        for i in range(len(docs) - 1, -1, -1):
+            next_offsets[i] = upcoming
+            if docs[i].get("offset_seconds") is not None:
+                upcoming = docs[i]["offset_seconds"]
+
+        inc = defaultdict(int)
+        mins, maxs, names = {}, {}, {}
+        for doc, next_offset in zip(docs, next_offsets):
+            if doc["utterance_id"] not in inserted_ids:
+                continue
+            speaker = f"speakers.{doc['speaker_id']}"
+            words = len(doc["text"].split())
+            inc["turns"] += 1
+            inc["words"] += words
+            inc[f"{speaker}.turns"] += 1
+            inc[f"{speaker}.words"] += words
+            for topic in set(doc.get("topics") or []):
+                inc[f"topics.{stat_key(topic)}"] += 1
+            names[f"{speaker}.name"] = speaker_names.get(doc["speaker_id"])
+
+            offset = doc.get("offset_seconds")
+            if offset is None:
+                continue
+            for prefix in ("", f"{speaker}."):
+                first, last = f"{prefix}first_offset_seconds", f"{prefix}last_offset_seconds"
+                mins[first] = min(mins.get(first, offset), offset)
+                maxs[last] = max(maxs.get(last, offset), offset)
+            if next_offset is not None and next_offset >= offset:
+                inc[f"{speaker}.speaking_seconds"] += next_offset - offset
+
+        if not inc:
+            continue
+        name, date = debate_info.get(debate_id, (None, None))
+        update = {"$inc": dict(inc),
+                  "$set": {"name": name, "date": date, "updated_at": datetime.now(), **names}}
+        if mins:
+            update["$min"] = mins
+            update["$max"] = maxs
+        updates.append(UpdateOne({"debate_id": debate_id}, update, upsert=True))
+    return updates
+
+
+def get_debate_stats(db, debate_id):
+    """A debate's statistics document (one indexed lookup), or None."""
+    stats = db[STATS_COLLECTION].find_one({"debate_id": debate_id}, {"_id": 0})
+    if stats and stats.get("first_offset_seconds") is not None:
+        stats["duration_seconds"] = stats["last_offset_seconds"] - stats["first_offset_seconds"]
+    return stats
+
+
+def collection_counts(db):
+    """Document count per collection from collection metadata (no scan)."""
+    return {name: db[name].estimated_document_count() for name in COUNTED_COLLECTIONS}
+
+
+def rebuild_debate_stats(db):
+    """
+    Recompute every debate's statistics from its utterances (a full scan;
+    for data loaded before debate_stats existed, or after manual edits).
+
+    Returns:
+        Number of debates rebuilt
+    """
+    speaker_names = {s["speaker_id"]: s.get("name") for s in db["speakers"].find({}, {"speaker_id": 1, "name": 1})}
+    debates = list(db["debates"].find({}, {"debate_id": 1, "name": 1, "date": 1}))
+    for debate in debates:
+        docs = list(db["utterances"].find(
+            {"debate_id": debate["debate_id"]},
+            {"utterance_id": 1, "debate_id": 1, "speaker_id": 1, "text": 1, "offset_seconds": 1, "seq": 1, "topics": 1}))
+        db[STATS_COLLECTION].delete_one({"debate_id": debate["debate_id"]})
+        updates = debate_stats_updates(docs, {doc["utterance_id"] for doc in docs}, speaker_names,
+                                       {debate["debate_id"]: (debate.get("name"), debate.get("date"))})
+        if updates:
+            db[STATS_COLLECTION].bulk_write(updates)
+    print(f"Rebuilt statistics for {len(debates)} debates")
+    return len(debates)
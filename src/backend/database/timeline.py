@@ -0,0 +1,66 @@
+"""
+Per-debate timelines: a debate's utterances in speaking order, one page at a time.
+
+Every query is an equality match on the leading fields of a compound index
+ending in `seq` (see migrations.INDEXES), so MongoDB walks the index in
+order and stops after one page: no in-memory sort, no skip. Pages are keyed
+on the last `seq` returned (`after`) rather than an offset, so page 100
+costs the same as page 1.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TIMELINE_PAGE_SIZE = int(os.getenv("TIMELINE_PAGE_SIZE", "50"))
+TIMELINE_MAX_PAGE_SIZE = int(os.getenv("TIMELINE_MAX_PAGE_SIZE", "500"))
+
+UTTERANCE_FIELDS = {"_id": 0, "utterance_id": 1, "speaker_id": 1, "text": 1, "timestamp": 1,
+                    "offset_seconds": 1, "seq": 1, "topics": 1}
+
+
+def get_timeline(db, debate_id, speaker_id=None, topic=None, after=None, limit=TIMELINE_PAGE_SIZE):
+    """
+    One page of a debate's utterances in speaking order.
+
+    Args:
+        db: pymongo Database
+        debate_id: Debate to read
+        speaker_id: Only this speaker's turns (index speaker_id, debate_id, seq)
+        topic: Only utterances tagged with this topic (index topics, debate_id, seq)
+        after: `seq` of the last utterance on the previous page; None for the first page
+        limit: Page size, capped at TIMELINE_MAX_PAGE_SIZE
+
+    Returns:
+        Dict with debate_id, utterances (each with speaker name and role)
+        and next_after (pass as `after` for the next page; None on the last page)
+    """
+    limit = max(1, min(int(limit), TIMELINE_MAX_PAGE_SIZE))
+    query = {"debate_id": debate_id}
+    if speaker_id:
+        query["speaker_id"] = speaker_id
+    if topic:
+        query["topics"] = topic
+    if after is not None:
+        query["seq"] = {"$gt": int(after)}
+
+    # One extra document tells us whether there is another page
+    utterances = list(db.utterances.find(query, UTTERANCE_FIELDS).sort("seq", 1).limit(limit + 1))
+    has_more = len(utterances) > limit
+    utterances = utterances[:limit]
+
+    # Names and roles for the speakers on this page (unique speaker_id index)
+    speaker_ids = list({u["speaker_id"] for u in utterances})
+    speakers = {s["speaker_id"]: s for s in db.speakers.find(
+        {"speaker_id": {"$in": speaker_ids}}, {"_id": 0, "speaker_id": 1, "name": 1, "role": 1})} if speaker_ids else {}
+    for u in utterances:
+        speaker = speakers.get(u["speaker_id"], {})
+        u["speaker"] = speaker.get("name")
+        u["role"] = speaker.get("role")
+
+    return {
+        "debate_id": debate_id,
+        "utterances": utterances,
+        "next_after": utterances[-1]["seq"] if has_more else None,
+    }
@@ -0,0 +1,202 @@
+"""
+Token-budget batching for embedding requests.
+
+Instead of a fixed number of chunks per request, batches are filled up to a
+token ceiling and an item cap, so long chunks never push a request over the
+API limit and short chunks don't waste round trips.
+"""
+import math
+import os
+from dataclasses import dataclass
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# OpenAI limits for text-embedding-3-*: 8191 tokens per input, 2048 inputs and
+# 300k tokens per request. Defaults leave headroom below the request limit.
+MAX_INPUT_TOKENS = int(os.getenv("EMBEDDING_MAX_INPUT_TOKENS", "8191"))
+MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "250000"))
+MAX_BATCH_ITEMS = int(os.getenv("EMBEDDING_MAX_BATCH_ITEMS", "2048"))
+
+# Used when tiktoken isn't installed; deliberately overestimates (~4 chars/token in English)
+CHARS_PER_TOKEN_ESTIMATE = 3
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    # Tokenizer for text-embedding-3-* models, or None if tiktoken isn't available
+    global _encoding, _encoding_loaded
+    if not _encoding_loaded:
+        try:
+            import tiktoken # type: ignore
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _encoding = None
+        _encoding_loaded = True
+    return _encoding
+
+
+def count_tokens(text):
+    """Count tokens the way the embeddings API will (estimated without tiktoken)."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return max(1, math.ceil(len(text) / CHARS_PER_TOKEN_ESTIMATE))
+
+
+def split_to_token_limit(text, max_tokens=MAX_INPUT_TOKENS, source=None):
+    """
+    Split text into pieces that each fit in a single embedding input.
+
+    Args:
+        text: Text to split
+        max_tokens: Maximum tokens per piece
+        source: Id of the text (e.g. its utterance_id) for truncation warnings
+
+    Returns:
+        List of pieces (just [text] when it already fits)
+    """
+    if count_tokens(text) <= max_tokens:
+        return [text]
+
+    encoding = _get_encoding()
+    if encoding is not None:
+        tokens = encoding.encode(text, disallowed_special=())
+        return [
+            encoding.decode(tokens[i:i + max_tokens])
+            for i in range(0, len(tokens), max_tokens)
+        ]
+
+    # No tokenizer: split on words using the character estimate
+    pieces = []
+    current = []
+    current_tokens = 0
+    for word in text.split():
+        word_tokens = count_tokens(word + " ")
+        if current and current_tokens + word_tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+            current_tokens = 0
+        if word_tokens > max_tokens:
+            # A single huge "word" (e.g. a URL blob) gets hard-truncated
+            print(f"⚠️  Warning: truncated a {len(word)}-character word in {source or 'a chunk'} "
+                  f"to {max_tokens * CHARS_PER_TOKEN_ESTIMATE} characters")
+            word = word[:max_tokens * CHARS_PER_TOKEN_ESTIMATE]
+            word_tokens = max_tokens
+        current.append(word)
+        current_tokens += word_tokens
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def fit_chunks(chunks, max_tokens=MAX_INPUT_TOKENS, source=None):
+    """Yield chunks, splitting any that exceed the per-input token limit (source labels warnings)."""
+    for chunk in chunks:
+        yield from split_to_token_limit(chunk, max_tokens, source)
+
+
+@dataclass
+class TokenBatch:
+    start: int
+    end: int
+    tokens: int
+
+    @property
+    def size(self):
+        return self.end - self.start
+
+
+def make_batches(token_counts, max_tokens=MAX_BATCH_TOKENS, max_items=MAX_BATCH_ITEMS):
+    """
+    Greedily group consecutive inputs into batches under both limits.
+
+    Keeping batches contiguous preserves the order embeddings come back in,
+    so they stay aligned with their metadata.
+
+    Args:
+        token_counts: Token count of each input, in order
+        max_tokens: Token ceiling per request
+        max_items: Maximum inputs per request
+
+    Returns:
+        List of TokenBatch
+    """
+    batches = []
+    start = 0
+    tokens = 0
+    for i, count in enumerate(token_counts):
+        if i > start and (tokens + count > max_tokens or i - start >= max_items):
+            batches.append(TokenBatch(start, i, tokens))
+            start = i
+            tokens = 0
+        tokens += count
+    if start < len(token_counts):
+        batches.append(TokenBatch(start, len(token_counts), tokens))
+    return batches
+
+
+def embed_in_batches(texts, embed_fn, max_tokens=MAX_BATCH_TOKENS, max_items=MAX_BATCH_ITEMS,
+                     max_input_tokens=MAX_INPUT_TOKENS, label="chunks", checkpoint=None, ids=None):
+    """
+    Embed texts with as few requests as the token budget allows.
+
+    Inputs over the per-input limit are truncated as a last resort, with a
+    warning naming the chunk (callers should split them with fit_chunks()
+    first so no text is lost).
+
+    Args:
+        texts: List of texts to embed
+        embed_fn: Callable taking a list of texts and returning a list of vectors
+        max_tokens: Token ceiling per request
+        max_items: Maximum inputs per request
+        max_input_tokens: Token limit for a single input
+        label: Noun used in progress messages
+        checkpoint: Optional BuildCheckpoint; completed batches are loaded from
+            it instead of re-embedded, and new batches are saved to it
+        ids: Optional id per text (e.g. utterance_id) for truncation warnings
+
+    Returns:
+        List of embeddings in the same order as texts
+    """
+    texts = list(texts)
+    token_counts = [count_tokens(text) for text in texts]
+    for i, count in enumerate(token_counts):
+        if count > max_input_tokens:
+            chunk_id = ids[i] if ids is not None else f"input {i}"
+            print(f"⚠️  Warning: {chunk_id} has {count} tokens, over the {max_input_tokens}-token input limit; "
+                  f"only its first {max_input_tokens} tokens are embedded")
+            texts[i] = split_to_token_limit(texts[i], max_input_tokens, chunk_id)[0]
+            token_counts[i] = count_tokens(texts[i])
+    batches = make_batches(token_counts, max_tokens, max_items)
+
+    completed = 0
+    if checkpoint is not None:
+        checkpoint.set_total_batches(len(batches))
+        completed = min(checkpoint.completed_batches(), len(batches))
+        if completed:
+            print(f"Resuming build {checkpoint.build_id}: "
+                  f"{completed}/{len(batches)} batches already embedded")
+
+    embeddings = []
+    for number, batch in enumerate(batches, 1):
+        if number <= completed:
+            embeddings.extend(checkpoint.load_batch(number))
+            continue
+        vectors = embed_fn(texts[batch.start:batch.end])
+        if checkpoint is not None:
+            checkpoint.save_batch(number, vectors)
+        embeddings.extend(vectors)
+        fill = batch.tokens / max_tokens
+        print(f"Embedded {batch.end}/{len(texts)} {label} "
+              f"(batch {number}/{len(batches)}: {batch.size} items, "
+              f"{batch.tokens} tokens, {fill:.0%} of token budget)")
+
+    if batches:
+        total_tokens = sum(token_counts)
+        average_fill = total_tokens / (len(batches) * max_tokens)
+        print(f"Embedding requests: {len(batches) - completed} for {len(texts)} {label}, "
+              f"{total_tokens} tokens, average fill {average_fill:.0%}")
+    return embeddings
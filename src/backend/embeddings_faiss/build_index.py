@@ -1,34 +1,31 @@
 import os
-import json
-from pymongo import MongoClient
 import numpy as np
 import faiss
-from openai import OpenAI
 from dotenv import load_dotenv
-import certifi
 import re
+import argparse
+from backend.database.client import get_database
+from backend.database.async_repository import join_utterance
+from backend.embeddings_faiss.batching import (
+    embed_in_batches, fit_chunks, MAX_BATCH_TOKENS, MAX_BATCH_ITEMS
+)
+from backend.embeddings_faiss.checkpoint import BuildCheckpoint, print_status
+from backend.embeddings_faiss.embedding_space import EmbeddingSpace, publish_index
 
 # -----------------------------
 # CONFIG
 # -----------------------------
 load_dotenv()  # Load .env file
-MONGO_URI = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("DB_NAME")
-CHUNK_SIZE = int(os.getenv("EMBEDDING_CHUNK_SIZE"))
+CHUNK_SIZE = int(os.getenv("EMBEDDING_CHUNK_SIZE", "500"))
 OUTPUT_INDEX = os.getenv("EMBEDDING_OUTPUT_INDEX")
 OUTPUT_METADATA = os.getenv("EMBEDDING_OUTPUT_METADATA")
 
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("Missing OPENAI_API_KEY in .env file")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
-
 # -----------------------------
-# MongoDB Connection
+# Database (shared pooled client, connects on first use)
 # -----------------------------
-mongo_client = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
-db = mongo_client[DB_NAME]
+def get_db():
+    return get_database(DB_NAME)
 
 # -----------------------------
 # Helper Functions
@@ -68,44 +65,46 @@ def chunk_text(text, chunk_size=CHUNK_SIZE):
 
 def fetch_utterances():
     """Fetch utterances with speaker and debate info (join-like)."""
-    print("Databases:", mongo_client.list_database_names())
+    db = get_db()
+    print("Databases:", db.client.list_database_names())
     print("Collections in DB:", db.list_collection_names())
-    utterances = list(db.utterances.find({}))
+    # _id order (insertion order) is stable between runs, so the chunk list and
+    # its checkpoint build id are too; natural order isn't guaranteed
+    utterances = list(db.utterances.find({}).sort("_id", 1))
     speakers = {s["speaker_id"]: s for s in db.speakers.find({})}
     debates = {d["debate_id"]: d for d in db.debates.find({})}
 
-    joined = []
-    for u in utterances:
-        speaker = speakers.get(u["speaker_id"], {})
-        debate = debates.get(u["debate_id"], {})
-        joined.append({
-            "utterance_id": u["utterance_id"],
-            "debate_id": u["debate_id"],
-            "speaker_id": u["speaker_id"],
-            "text": u["text"],
-            "speaker_name": speaker.get("name", "Unknown"),
-            "speaker_role": speaker.get("role", "Unknown"),
-            "debate_name": debate.get("name", "Unknown"),
-            "debate_date": debate.get("date"), 
-            "timestamp": u.get("timestamp", None),
-            "topics": u.get("topics")
-        })
+    joined = [join_utterance(u, speakers.get(u["speaker_id"], {}), debates.get(u["debate_id"], {}))
+              for u in utterances]
     return joined
 
-def embed_texts(texts):
-    """Generate embeddings from OpenAI embedding model."""
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=texts
-    )
-    return [data.embedding for data in response.data]
+def embed_texts(texts, space=None):
+    """Generate embeddings with the configured provider in the configured embedding space."""
+    space = space or EmbeddingSpace.from_env()
+    return space.embed(texts)
 
 # -----------------------------
 # Build FAISS Index
 # -----------------------------
-def build_index():
-    print("Fetching utterances from MongoDB...")
-    utterances = fetch_utterances()
+def build_index(resume=True, utterances=None, space=None, embed_fn=None,
+                index_path=OUTPUT_INDEX, metadata_path=OUTPUT_METADATA):
+    """
+    Rebuild the FAISS index from every utterance in MongoDB.
+
+    Embedded batches are checkpointed as they complete. If a previous run
+    with the same chunks died part way, it is resumed unless resume=False.
+
+    Args:
+        resume: Reuse a checkpoint for the same chunks if one exists
+        utterances: Joined utterances (as from fetch_utterances()); fetched from MongoDB if None
+        space: EmbeddingSpace of the vectors; from EMBEDDING_* settings if None
+        embed_fn: Callable embedding a list of texts; the configured provider in `space` if None
+        index_path: Where to write the FAISS index
+        metadata_path: Where to write the chunk metadata
+    """
+    if utterances is None:
+        print("Fetching utterances from MongoDB...")
+        utterances = fetch_utterances()
     print(f"Fetched {len(utterances)} utterances")
 
     all_chunks = []
@@ -113,9 +112,10 @@ def build_index():
 
     print("Chunking utterances...")
     for u in utterances:
-        for chunk in chunk_text(u["text"]):
+        for chunk in fit_chunks(chunk_text(u["text"]), source=u["utterance_id"]):
             all_chunks.append(chunk)
             metadata.append({
+                "utterance_id": u["utterance_id"],
                 "debate_id": u["debate_id"],
                 "debate_name": u["debate_name"],
                 "debate_date": u["debate_date"].strftime("%Y-%m-%d") if u.get("debate_date") else None,
@@ -128,15 +128,17 @@ def build_index():
 
     print(f"Total chunks to embed: {len(all_chunks)}")
 
-    print("Generating embeddings...")
-    embeddings = []
-    batch_size = 100  # adjust based on token limits
+    space = space or EmbeddingSpace.from_env()
+    if embed_fn is None:
+        embed_fn = lambda batch: embed_texts(batch, space)
+    checkpoint = BuildCheckpoint.for_build(all_chunks, space, MAX_BATCH_TOKENS, MAX_BATCH_ITEMS)
+    if not resume:
+        checkpoint.remove()
+    checkpoint.start(len(all_chunks), space)
 
-    for i in range(0, len(all_chunks), batch_size):
-        batch = all_chunks[i:i + batch_size]
-        emb = embed_texts(batch)
-        embeddings.extend(emb)
-        print(f"Embedded {i + len(batch)}/{len(all_chunks)}")
+    print(f"Generating embeddings ({space.model}, {space.output_dimensions}-d, {space.method})...")
+    embeddings = embed_in_batches(all_chunks, embed_fn, checkpoint=checkpoint,
+                                  ids=[m["utterance_id"] for m in metadata])
 
     embeddings_np = np.array(embeddings, dtype="float32")
 
@@ -145,11 +147,25 @@ def build_index():
     index = faiss.IndexFlatL2(dimension)
     index.add(embeddings_np)
 
-    print(f"Saving FAISS index to {OUTPUT_INDEX}...")
-    faiss.write_index(index, OUTPUT_INDEX)
+    print(f"Saving FAISS index to {index_path} and metadata to {metadata_path}...")
+    publish_index(index, index_path, metadata, metadata_path, space)
+
+    # Index is published; the checkpoint is no longer needed
+    checkpoint.remove()
+
+    print("FAISS index build complete!")
+
 
-    print(f"Saving metadata to {OUTPUT_METADATA}...")
-    with open(OUTPUT_METADATA, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, ensure_ascii=False, indent=2)
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the FAISS index from MongoDB")
+    parser.add_argument("--status", action="store_true",
+                        help="Show progress of checkpointed builds and exit")
+    # Resuming a checkpoint for the same data is the default; --fresh opts out
+    parser.add_argument("--fresh", action="store_true",
+                        help="Discard any checkpoint for this build and start over")
+    args = parser.parse_args()
 
-    print("FAISS index build complete!")
\ No newline at end of file
+    if args.status:
+        print_status()
+    else:
+        build_index(resume=not args.fresh)
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+Checkpoints for long index builds.
+
+Every embedding batch is written to disk as soon as it comes back, keyed by a
+build id derived from the chunk texts and embedding settings. If the build
+dies part way (API error, network drop), re-running it with the same data
+picks up after the last completed batch instead of paying for every batch
+again.
+"""
+import os
+import json
+import shutil
+import hashlib
+from datetime import datetime
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHECKPOINT_DIR = os.getenv("EMBEDDING_CHECKPOINT_DIR", ".build_checkpoints")
+
+
+def _write_json_atomic(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+class BuildCheckpoint:
+    """Embedded batches and progress for one index build, stored under CHECKPOINT_DIR/<build_id>."""
+
+    def __init__(self, build_id, root=CHECKPOINT_DIR):
+        self.build_id = build_id
+        self.path = os.path.join(root, build_id)
+        self.progress_path = os.path.join(self.path, "progress.json")
+
+    @staticmethod
+    def compute_build_id(chunks, space, max_tokens, max_items):
+        """
+        Stable id for a build: same chunks and embedding settings -> same id.
+
+        Batch limits are included because they decide where batches start
+        and end, and completed batches are reused by number.
+        """
+        digest = hashlib.sha256()
+        settings = [space.model, space.method, space.dimensions, space.pca_path, max_tokens, max_items]
+        digest.update(json.dumps(settings).encode("utf-8"))
+        for chunk in chunks:
+            digest.update(chunk.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()[:16]
+
+    @classmethod
+    def for_build(cls, chunks, space, max_tokens, max_items, root=CHECKPOINT_DIR):
+        return cls(cls.compute_build_id(chunks, space, max_tokens, max_items), root)
+
+    def exists(self):
+        return os.path.exists(self.progress_path)
+
+    def start(self, total_chunks, space):
+        """
+        Create the checkpoint, or keep the existing one so the build resumes.
+
+        Chunk metadata isn't stored: the build id is computed from the chunks,
+        so a resumed build has already re-chunked the utterances.
+        """
+        if self.exists():
+            return
+        os.makedirs(self.path, exist_ok=True)
+        now = datetime.now().isoformat(timespec="seconds")
+        _write_json_atomic(self.progress_path, {
+            "build_id": self.build_id,
+            "model": space.model,
+            "method": space.method,
+            "dimensions": space.output_dimensions,
+            "total_chunks": total_chunks,
+            "total_batches": None,
+            "completed_batches": 0,
+            "completed_chunks": 0,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+    def progress(self):
+        with open(self.progress_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def set_total_batches(self, total_batches):
+        progress = self.progress()
+        progress["total_batches"] = total_batches
+        _write_json_atomic(self.progress_path, progress)
+
+    def completed_batches(self):
+        return self.progress()["completed_batches"] if self.exists() else 0
+
+    def _slab_path(self, number):
+        return os.path.join(self.path, f"slab_{number:05d}.npy")
+
+    def save_batch(self, number, vectors):
+        """
+        Persist one embedded batch (numbered from 1, in order) and advance progress.
+        """
+        slab_path = self._slab_path(number)
+        tmp_path = f"{slab_path}.tmp.npy"
+        np.save(tmp_path, np.asarray(vectors, dtype="float32"))
+        os.replace(tmp_path, slab_path)
+
+        progress = self.progress()
+        progress["completed_batches"] = number
+        progress["completed_chunks"] += len(vectors)
+        progress["updated_at"] = datetime.now().isoformat(timespec="seconds")
+        _write_json_atomic(self.progress_path, progress)
+
+    def load_batch(self, number):
+        return np.load(self._slab_path(number))
+
+    def remove(self):
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def list_checkpoints(root=CHECKPOINT_DIR):
+    """Progress of every checkpointed build, most recently updated first."""
+    if not os.path.isdir(root):
+        return []
+    builds = []
+    for build_id in os.listdir(root):
+        checkpoint = BuildCheckpoint(build_id, root)
+        if checkpoint.exists():
+            builds.append(checkpoint.progress())
+    return sorted(builds, key=lambda p: p["updated_at"], reverse=True)
+
+
+def print_status(root=CHECKPOINT_DIR):
+    builds = list_checkpoints(root)
+    if not builds:
+        print(f"No index builds in progress ({root})")
+        return
+    print(f"Index builds in progress ({root}):")
+    for p in builds:
+        total_batches = p["total_batches"] or "?"
+        percent = p["completed_chunks"] / p["total_chunks"] if p["total_chunks"] else 0
+        print(f"  - {p['build_id']}: {p['completed_batches']}/{total_batches} batches "
+              f"({p['completed_chunks']}/{p['total_chunks']} chunks, {percent:.0%}), "
+              f"{p['model']} {p['dimensions']}-d, last update {p['updated_at']}")
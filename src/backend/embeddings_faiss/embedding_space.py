@@ -0,0 +1,215 @@
+"""
+Embedding space configuration and index manifest.
+
+Vectors can be stored at a reduced dimension to cut index memory and search
+cost, either with the embeddings API's `dimensions` parameter or with a PCA
+matrix trained offline. Whatever space an index was built in is recorded in a
+manifest next to it, so incremental updates and query embedding use exactly
+the same settings.
+"""
+import os
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+import numpy as np
+from dotenv import load_dotenv
+
+from backend.providers import get_provider
+
+load_dotenv()
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+NATIVE_DIMENSIONS = {
+    "text-embedding-3-small": 1536,
+    "text-embedding-3-large": 3072,
+    "text-embedding-ada-002": 1536,
+}
+# Target dimension for stored vectors (e.g. 256 or 512); unset keeps the model's native size
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or None
+# Optional .npz with "mean" and "components" arrays; when set, PCA replaces the API `dimensions` parameter
+EMBEDDING_PCA_MATRIX = os.getenv("EMBEDDING_PCA_MATRIX") or None
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+@dataclass
+class EmbeddingSpace:
+    model: str = EMBEDDING_MODEL
+    dimensions: Optional[int] = None  # None = native model size
+    method: str = "native"            # "native", "api" or "pca"
+    pca_path: Optional[str] = None
+
+    @classmethod
+    def from_env(cls):
+        """Embedding space configured by EMBEDDING_* environment variables."""
+        if EMBEDDING_PCA_MATRIX:
+            components = load_pca_matrix(EMBEDDING_PCA_MATRIX)[1]
+            return cls(EMBEDDING_MODEL, components.shape[0], "pca", EMBEDDING_PCA_MATRIX)
+        if EMBEDDING_DIMENSIONS:
+            return cls(EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, "api")
+        return cls(EMBEDDING_MODEL, None, "native")
+
+    @classmethod
+    def from_manifest(cls, manifest):
+        """Embedding space recorded in an index manifest."""
+        return cls(
+            model=manifest.get("model", EMBEDDING_MODEL),
+            dimensions=manifest.get("target_dimensions"),
+            method=manifest.get("method", "native"),
+            pca_path=manifest.get("pca_path"),
+        )
+
+    @property
+    def output_dimensions(self):
+        return self.dimensions or NATIVE_DIMENSIONS.get(self.model)
+
+    def request_kwargs(self):
+        """Keyword arguments for Provider.embed() (model, and dimensions for the "api" method)."""
+        kwargs = {"model": self.model}
+        if self.method == "api" and self.dimensions:
+            kwargs["dimensions"] = self.dimensions
+        return kwargs
+
+    def project(self, vectors):
+        """
+        Map raw API vectors into this space.
+
+        Args:
+            vectors: Array-like of shape (n, d) as returned by the API
+
+        Returns:
+            float32 array of shape (n, output_dimensions)
+        """
+        vectors = np.asarray(vectors, dtype="float32")
+        if self.method != "pca":
+            return vectors
+        mean, components = load_pca_matrix(self.pca_path)
+        reduced = (vectors - mean) @ components.T
+        # Re-normalize so L2 distance still ranks like cosine similarity
+        norms = np.linalg.norm(reduced, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (reduced / norms).astype("float32")
+
+    def embed(self, texts, provider=None):
+        """Embed texts with a provider (the configured one if None) and project them into this space."""
+        provider = provider or get_provider()
+        return self.project(provider.embed(texts, **self.request_kwargs()).vectors)
+
+
+_pca_cache = {}
+
+
+def load_pca_matrix(path):
+    """Load (mean, components) from a .npz file, cached per path."""
+    if path not in _pca_cache:
+        with np.load(path) as data:
+            _pca_cache[path] = (
+                data["mean"].astype("float32"),
+                data["components"].astype("float32"),
+            )
+    return _pca_cache[path]
+
+
+def save_pca_matrix(path, mean, components):
+    """Save a PCA projection trained offline (components has shape (k, d))."""
+    np.savez(path, mean=np.asarray(mean, dtype="float32"),
+             components=np.asarray(components, dtype="float32"))
+
+
+# -----------------------------
+# Index manifest
+# -----------------------------
+def manifest_path(index_path):
+    return f"{index_path}{MANIFEST_SUFFIX}"
+
+
+def read_manifest(index_path):
+    """Return the manifest stored next to an index, or None for legacy indexes."""
+    path = manifest_path(index_path)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_manifest(index_path, space, index_dimensions, count, **extra):
+    """
+    Record how an index was built.
+
+    Args:
+        index_path: Path of the FAISS index file
+        space: EmbeddingSpace the vectors live in
+        index_dimensions: Dimension of the stored vectors
+        count: Number of vectors in the index
+        extra: Additional fields to record
+
+    `generation` goes up by one on every write, so readers can tell which
+    version of the index they have loaded.
+    """
+    previous = read_manifest(index_path) or {}
+    manifest = {
+        "model": space.model,
+        "method": space.method,
+        "target_dimensions": space.dimensions,
+        "pca_path": space.pca_path,
+        "index_dimensions": int(index_dimensions),
+        "count": int(count),
+        "generation": int(previous.get("generation", 0)) + 1,
+        "updated_at": datetime.now().isoformat(timespec="seconds"),
+        **extra,
+    }
+    _write_json_atomic(manifest_path(index_path), manifest, indent=2)
+    return manifest
+
+
+def _tmp_path(path):
+    return f"{path}.{os.getpid()}.tmp"
+
+
+def _write_json_atomic(path, data, **dump_args):
+    tmp_path = _tmp_path(path)
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, **dump_args)
+    os.replace(tmp_path, path)
+
+
+def publish_index(index, index_path, metadata, metadata_path, space, **extra):
+    """
+    Write an index with its metadata and manifest so readers never load a
+    half-written file.
+
+    Each file goes to a temp path and is renamed into place: metadata and
+    manifest first, the index last. A reader that catches the files between
+    renames sees len(metadata) != index.ntotal and retries (see
+    DebateRetriever), and server workers reload once the index file changes.
+
+    Returns:
+        The new manifest
+    """
+    import faiss
+
+    _write_json_atomic(metadata_path, metadata, ensure_ascii=False, indent=2)
+    manifest = write_manifest(index_path, space, index.d, index.ntotal, **extra)
+    tmp_path = _tmp_path(index_path)
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, index_path)
+    return manifest
+
+
+def space_for_index(index_path, index_dimensions=None):
+    """
+    Embedding space to use when reading or extending an existing index.
+
+    Falls back to the native model space for indexes built before manifests
+    existed, and raises if the stored vectors don't match the manifest.
+    """
+    manifest = read_manifest(index_path)
+    space = EmbeddingSpace.from_manifest(manifest) if manifest else EmbeddingSpace(EMBEDDING_MODEL)
+    expected = space.output_dimensions
+    if index_dimensions is not None and expected and index_dimensions != expected:
+        raise ValueError(
+            f"Index {index_path} has {index_dimensions}-d vectors but its embedding "
+            f"space produces {expected}-d vectors; rebuild the index"
+        )
+    return space
@@ -1,47 +1,56 @@
 import os
 import json
+import asyncio
 import numpy as np
 import faiss
 from datetime import datetime
-from pymongo import MongoClient
-import certifi
 from dotenv import load_dotenv
-from openai import OpenAI
+from backend.database.client import get_database
+from backend.database.async_repository import AsyncDebateRepository, join_utterance, MONGO_CURSOR_BATCH_SIZE
+from backend.embeddings_faiss.batching import embed_in_batches, fit_chunks
+from backend.embeddings_faiss.embedding_space import EmbeddingSpace, space_for_index, publish_index
 
 load_dotenv()
 
-MONGO_URI = os.getenv("MONGODB_URI")
 DB_NAME = os.getenv("DB_NAME")
-CHUNK_SIZE = int(os.getenv("EMBEDDING_CHUNK_SIZE"))
+CHUNK_SIZE = int(os.getenv("EMBEDDING_CHUNK_SIZE", "500"))
 OUTPUT_INDEX = os.getenv("EMBEDDING_OUTPUT_INDEX")
 OUTPUT_METADATA = os.getenv("EMBEDDING_OUTPUT_METADATA")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
 
 class IncrementalFAISS:
-    def __init__(self):
-        self.mongo_client = MongoClient(MONGO_URI, tlsCAFile=certifi.where())
-        self.db = self.mongo_client[DB_NAME]
+    def __init__(self, index_path=OUTPUT_INDEX, metadata_path=OUTPUT_METADATA, space=None, embed_fn=None):
+        """
+        Args:
+            index_path: FAISS index to extend
+            metadata_path: Chunk metadata stored alongside the index
+            space: EmbeddingSpace of new vectors; read from the index manifest if None
+            embed_fn: Callable embedding a list of texts; the configured provider in `space` if None
+        """
+        self.index_path = index_path
+        self.metadata_path = metadata_path
+        self.space = space
+        self.embed_fn = embed_fn
+
+    @property
+    def db(self):
+        # Borrowed from the shared client, which connects on first use
+        return get_database(DB_NAME)
         
     def chunk_text(self, text, chunk_size=CHUNK_SIZE):
         words = text.split()
         for i in range(0, len(words), chunk_size):
             yield " ".join(words[i:i + chunk_size])
     
-    def embed_texts(self, texts):
-        response = client.embeddings.create(
-            model="text-embedding-3-small",
-            input=texts
-        )
-        return [data.embedding for data in response.data]
+    def embed_texts(self, texts, space=None):
+        space = space or EmbeddingSpace.from_env()
+        return space.embed(texts)
     
     def get_last_update_timestamp(self):
-        if not os.path.exists(OUTPUT_METADATA):
+        if not os.path.exists(self.metadata_path):
             return None
             
         try:
-            with open(OUTPUT_METADATA, 'r', encoding='utf-8') as f:
+            with open(self.metadata_path, 'r', encoding='utf-8') as f:
                 metadata = json.load(f)
             
             if metadata:
@@ -53,20 +62,25 @@ class IncrementalFAISS:
         except:
             return None
     
-    def get_new_utterances(self):
-        """Get utterances that are not in the current index"""
-        print("Fetching utterances from MongoDB...")
-        
-        # Get all debate IDs from the existing index
+    def indexed_debate_ids(self):
+        """Debate ids already in the index's metadata file."""
         existing_debate_ids = set()
-        if os.path.exists(OUTPUT_METADATA):
+        if os.path.exists(self.metadata_path):
             try:
-                with open(OUTPUT_METADATA, 'r', encoding='utf-8') as f:
+                with open(self.metadata_path, 'r', encoding='utf-8') as f:
                     metadata = json.load(f)
                 existing_debate_ids = {m.get('debate_id') for m in metadata if m.get('debate_id')}
                 print(f"Found {len(existing_debate_ids)} debates in existing index")
             except:
                 existing_debate_ids = set()
+        return existing_debate_ids
+
+    def get_new_utterances(self):
+        """Get utterances that are not in the current index"""
+        print("Fetching utterances from MongoDB...")
+        
+        # Get all debate IDs from the existing index
+        existing_debate_ids = self.indexed_debate_ids()
         
         # Get all debates from database
         all_debates = list(self.db.debates.find({}))
@@ -88,31 +102,17 @@ class IncrementalFAISS:
         speakers = {s["speaker_id"]: s for s in self.db.speakers.find({})}
         debates_dict = {d["debate_id"]: d for d in all_debates}
         
-        joined = []
-        for u in utterances:
-            speaker = speakers.get(u["speaker_id"], {})
-            debate = debates_dict.get(u["debate_id"], {})
-            joined.append({
-                "utterance_id": u["utterance_id"],
-                "debate_id": u["debate_id"],
-                "speaker_id": u["speaker_id"],
-                "text": u["text"],
-                "speaker_name": speaker.get("name", "Unknown"),
-                "speaker_role": speaker.get("role", "Unknown"),
-                "debate_name": debate.get("name", "Unknown"),
-                "debate_date": debate.get("date"),
-                "timestamp": u.get("timestamp", None),
-                "topics": u.get("topics")
-            })
+        joined = [join_utterance(u, speakers.get(u["speaker_id"], {}), debates_dict.get(u["debate_id"], {}))
+                  for u in utterances]
         
         print(f"Found {len(joined)} new utterances from {len(new_debates)} new debates")
         return joined
     
     def load_existing_index(self):
-        if os.path.exists(OUTPUT_INDEX) and os.path.exists(OUTPUT_METADATA):
+        if os.path.exists(self.index_path) and os.path.exists(self.metadata_path):
             try:
-                index = faiss.read_index(OUTPUT_INDEX)
-                with open(OUTPUT_METADATA, 'r', encoding='utf-8') as f:
+                index = faiss.read_index(self.index_path)
+                with open(self.metadata_path, 'r', encoding='utf-8') as f:
                     metadata = json.load(f)
                 print(f"Loaded existing index with {len(metadata)} chunks")
                 return index, metadata
@@ -120,26 +120,27 @@ class IncrementalFAISS:
                 print(f"Error loading existing index: {e}")
         return None, []
     
-    def update_index_incrementally(self):
-        # Load existing index
-        index, existing_metadata = self.load_existing_index()
-        
-        # Get new utterances
-        new_utterances = self.get_new_utterances()
-        
-        if not new_utterances:
-            print("Index is already up to date!")
-            return 0
-        
-        # Process new utterances
-        new_chunks = []
-        new_metadata = []
-        
-        print("Chunking new utterances...")
-        for u in new_utterances:
-            for chunk in self.chunk_text(u["text"]):
-                new_chunks.append(chunk)
-                new_metadata.append({
+    def resolve_space(self, index):
+        # New vectors must live in the same embedding space as the existing index
+        if self.space is not None:
+            return self.space
+        if index is None:
+            return EmbeddingSpace.from_env()
+        space = space_for_index(self.index_path, index.d)
+        if space != EmbeddingSpace.from_env():
+            print(f"Note: keeping the index's embedding space ({space.output_dimensions}-d, {space.method}); "
+                  "run a full rebuild to apply new EMBEDDING_* settings")
+        return space
+
+    def chunk_utterances(self, utterances):
+        """Chunks to embed and their metadata entries for joined utterances."""
+        chunks = []
+        metadata = []
+        for u in utterances:
+            for chunk in fit_chunks(self.chunk_text(u["text"]), source=u["utterance_id"]):
+                chunks.append(chunk)
+                metadata.append({
+                    "utterance_id": u["utterance_id"],
                     "debate_id": u["debate_id"],
                     "debate_name": u["debate_name"],
                     "debate_date": u["debate_date"].strftime("%Y-%m-%d") if u.get("debate_date") else None,
@@ -150,20 +151,10 @@ class IncrementalFAISS:
                     "topics": u.get("topics"),
                     "added_in_incremental": True  # Mark as incrementally added
                 })
-        
-        print(f"Generated {len(new_chunks)} new chunks from {len(new_utterances)} utterances")
-        
-        # Generate embeddings for new chunks
-        print("Generating embeddings for new chunks...")
-        new_embeddings = []
-        batch_size = 100
-        
-        for i in range(0, len(new_chunks), batch_size):
-            batch = new_chunks[i:i + batch_size]
-            emb = self.embed_texts(batch)
-            new_embeddings.extend(emb)
-            print(f"Embedded {i + len(batch)}/{len(new_chunks)} new chunks")
-        
+        return chunks, metadata
+
+    def save_index(self, index, space, existing_metadata, new_metadata, new_embeddings):
+        """Append embeddings to the index (creating it if None) and write index, metadata and manifest."""
         # Convert to numpy
         new_embeddings_np = np.array(new_embeddings, dtype="float32")
         
@@ -182,20 +173,97 @@ class IncrementalFAISS:
         combined_metadata = existing_metadata + new_metadata
         
         # Save updated index and metadata
-        print(f"Saving updated FAISS index to {OUTPUT_INDEX}...")
-        faiss.write_index(index, OUTPUT_INDEX)
-        
-        print(f"Saving updated metadata to {OUTPUT_METADATA}...")
-        with open(OUTPUT_METADATA, "w", encoding="utf-8") as f:
-            json.dump(combined_metadata, f, ensure_ascii=False, indent=2)
+        print(f"Saving updated FAISS index to {self.index_path} and metadata to {self.metadata_path}...")
+        publish_index(index, self.index_path, combined_metadata, self.metadata_path, space)
         
-        print(f"Incremental update complete! Added {len(new_chunks)} new chunks")
+        print(f"Incremental update complete! Added {len(new_metadata)} new chunks")
         print(f"Total chunks in index: {len(combined_metadata)}")
+    
+    def update_index_incrementally(self, new_utterances=None):
+        """
+        Embed utterances from debates not yet in the index and append them.
+
+        Args:
+            new_utterances: Joined utterances to add; fetched from MongoDB if None
+
+        Returns:
+            Number of chunks added
+        """
+        # Load existing index
+        index, existing_metadata = self.load_existing_index()
+        space = self.resolve_space(index)
+        
+        # Get new utterances
+        if new_utterances is None:
+            new_utterances = self.get_new_utterances()
+        
+        if not new_utterances:
+            print("Index is already up to date!")
+            return 0
+        
+        # Process new utterances
+        print("Chunking new utterances...")
+        new_chunks, new_metadata = self.chunk_utterances(new_utterances)
+        print(f"Generated {len(new_chunks)} new chunks from {len(new_utterances)} utterances")
         
+        # Generate embeddings for new chunks
+        print("Generating embeddings for new chunks...")
+        embed_fn = self.embed_fn or (lambda batch: self.embed_texts(batch, space))
+        new_embeddings = embed_in_batches(new_chunks, embed_fn, label="new chunks",
+                                          ids=[m["utterance_id"] for m in new_metadata])
+        
+        self.save_index(index, space, existing_metadata, new_metadata, new_embeddings)
         return len(new_chunks)
+
+    async def update_index_incrementally_async(self, repository=None, batch_size=MONGO_CURSOR_BATCH_SIZE):
+        """
+        update_index_incrementally() on the async database layer.
+
+        Utterances of new debates are read in cursor batches; each batch is
+        embedded in a worker thread while the next one is being read, instead
+        of reading everything first and embedding afterwards.
+
+        Args:
+            repository: AsyncDebateRepository; one on this loop's shared client if None
+            batch_size: Utterances per cursor batch (and per embedding job)
+
+        Returns:
+            Number of chunks added
+        """
+        repository = repository or AsyncDebateRepository(db_name=DB_NAME)
+        index, existing_metadata = self.load_existing_index()
+        space = self.resolve_space(index)
+
+        new_debate_ids = await repository.new_debate_ids(self.indexed_debate_ids())
+        if not new_debate_ids:
+            print("Index is already up to date!")
+            return 0
+        print(f"Found {len(new_debate_ids)} new debates")
+
+        embed_fn = self.embed_fn or (lambda batch: self.embed_texts(batch, space))
+        new_metadata = []
+        jobs = []
+        async for utterances in repository.iter_utterances(new_debate_ids, batch_size):
+            chunks, metadata = self.chunk_utterances(utterances)
+            new_metadata.extend(metadata)
+            if chunks:
+                jobs.append(asyncio.create_task(asyncio.to_thread(
+                    embed_in_batches, chunks, embed_fn, label="new chunks",
+                    ids=[m["utterance_id"] for m in metadata])))
+
+        # Jobs were started in order, so results line up with new_metadata
+        new_embeddings = [vector for vectors in await asyncio.gather(*jobs) for vector in vectors]
+        if not new_metadata:
+            print("Index is already up to date!")
+            return 0
+        print(f"Generated {len(new_metadata)} new chunks from {len(new_debate_ids)} new debates")
+
+        self.save_index(index, space, existing_metadata, new_metadata, new_embeddings)
+        return len(new_metadata)
     
     def close(self):
-        self.mongo_client.close()
+        # Nothing to close: the MongoDB client is shared (backend.database.client)
+        pass
 
 def update_faiss_incrementally():
     incremental_faiss = IncrementalFAISS()
@@ -1,12 +1,18 @@
 import os
 import re
 import json
+import importlib.util
+import threading
 import requests
 from typing import Dict, List, Optional, Tuple, Any
 from enum import Enum
 from dataclasses import dataclass
 from difflib import SequenceMatcher
 from dotenv import load_dotenv
+from backend.utils import LazyResource
+from backend.utils.tracing import span
+from backend.utils.metrics import upstream_call
+from backend.providers import get_provider
 
 # Load environment variables
 load_dotenv()
@@ -17,28 +23,15 @@ load_dotenv()
 # ============================================================================
 
 class Config:
-    WIKI_API_URL = "https://en.wikipedia.org/w/api.php"
+    WIKI_API_URL = os.getenv("WIKI_API_URL", "https://en.wikipedia.org/w/api.php")
     ZERO_SHOT_MODEL = "facebook/bart-large-mnli"
     NEWSAPI_ENV_VAR = "NEWSAPI_KEY"
-    OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+    NEWSAPI_URL = os.getenv("NEWSAPI_URL", "https://newsapi.org/v2").rstrip("/")
     NEWSAPI_KEY = os.getenv("NEWSAPI_KEY")
     HEADERS = {"User-Agent": "DebateMatch/1.0 (fact-checker)"}
     
-    # Check for optional dependencies
-    ZERO_SHOT_AVAILABLE = False
-    NEWSAPI_AVAILABLE = False
-    
-    try:
-        from transformers import pipeline
-        ZERO_SHOT_AVAILABLE = True
-    except:
-        pass
-    
-    try:
-        from newsapi import NewsApiClient
-        NEWSAPI_AVAILABLE = True
-    except:
-        pass
+    # Check for optional dependencies without importing them (transformers pulls in torch)
+    ZERO_SHOT_AVAILABLE = importlib.util.find_spec("transformers") is not None
 
 
 # ============================================================================
@@ -171,12 +164,14 @@ class WikipediaAPI:
         }
         
         try:
-            response = requests.get(
-                Config.WIKI_API_URL,
-                params=parameters,
-                headers=Config.HEADERS,
-                timeout=10
-            )
+            with upstream_call("wikipedia") as call:
+                response = requests.get(
+                    Config.WIKI_API_URL,
+                    params=parameters,
+                    headers=Config.HEADERS,
+                    timeout=10
+                )
+                call.check_status(response.status_code)
             response.raise_for_status()
             data = response.json()
             results = []
@@ -212,12 +207,14 @@ class WikipediaAPI:
         }
         
         try:
-            response = requests.get(
-                Config.WIKI_API_URL,
-                params=parameters,
-                headers=Config.HEADERS,
-                timeout=10
-            )
+            with upstream_call("wikipedia") as call:
+                response = requests.get(
+                    Config.WIKI_API_URL,
+                    params=parameters,
+                    headers=Config.HEADERS,
+                    timeout=10
+                )
+                call.check_status(response.status_code)
             response.raise_for_status()
             pages = response.json().get("query", {}).get("pages", {})
             
@@ -247,19 +244,26 @@ class NewsAPI:
     # Returns top articles with title + description + url.
     @staticmethod
     def search(claim: str, limit: int = 3, api_key: Optional[str] = None) -> List[Dict[str, Any]]:
-        if not Config.NEWSAPI_AVAILABLE or not api_key:
+        if not api_key:
             return []
         
         try:
-            from newsapi import NewsApiClient
-            
-            client = NewsApiClient(api_key=api_key)
-            result = client.get_everything(
-                q=claim,
-                language="en",
-                sort_by="relevancy",
-                page_size=limit * 6
-            )
+            # Same request NewsApiClient.get_everything sends
+            with upstream_call("newsapi") as call:
+                response = requests.get(
+                    f"{Config.NEWSAPI_URL}/everything",
+                    params={
+                        "q": claim,
+                        "language": "en",
+                        "sortBy": "relevancy",
+                        "pageSize": limit * 6
+                    },
+                    headers={"X-Api-Key": api_key, **Config.HEADERS},
+                    timeout=10
+                )
+                call.check_status(response.status_code)
+            response.raise_for_status()
+            result = response.json()
             
             articles = result.get("articles", [])
             if not articles:
@@ -316,26 +320,12 @@ class OpenAIIntegration:
     def get_embedding(text: str) -> Optional[List[float]]:
         
         # Get embedding vector for text.
-        if not Config.OPENAI_API_KEY:
+        provider = get_provider()
+        if not provider.available:
             return None
         
         try:
-            response = requests.post(
-                "https://api.openai.com/v1/embeddings",
-                headers={
-                    "Authorization": f"Bearer {Config.OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "text-embedding-3-small",
-                    "input": text
-                },
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result["data"][0]["embedding"]
+            return provider.embed([text], "text-embedding-3-small", timeout=10).vectors[0]
         except Exception as e:
             print(f"⚠️  OpenAI embedding error: {e}")
         
@@ -361,7 +351,8 @@ class OpenAIIntegration:
     def verify_with_llm(claim: str, evidence: List[Dict]) -> Tuple[str, float, str, List[str], List[str]]:
         
         # Use LLM to verify claim against evidence.
-        if not Config.OPENAI_API_KEY or not evidence:
+        provider = get_provider()
+        if not provider.available or not evidence:
             return "NOT ENOUGH EVIDENCE", 0.0, "No LLM verification available", [], []
         
         try:
@@ -371,18 +362,12 @@ class OpenAIIntegration:
                 for src in evidence[:5]
             ])
             
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {Config.OPENAI_API_KEY}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": """You are an expert fact-checker. Analyze the claim against the provided evidence and determine:
+            response = provider.chat(
+                model="gpt-4o-mini",
+                messages=[
+                    {
+                        "role": "system",
+                        "content": """You are an expert fact-checker. Analyze the claim against the provided evidence and determine:
 1. Verdict: SUPPORTED, REFUTED, PARTIALLY SUPPORTED, or NOT ENOUGH EVIDENCE
 2. Confidence: 0-100 (how certain you are)
 3. Explanation: Brief reasoning for your verdict
@@ -392,22 +377,19 @@ class OpenAIIntegration:
 IMPORTANT: When referring to sources in your evidence lists, always use the source title shown in brackets [Title]
 
 Return as JSON with keys: verdict, confidence, explanation, supporting_evidence, contradicting_evidence"""
-                        },
-                        {
-                            "role": "user",
-                            "content": f"Claim: {claim}\n\nEvidence:\n{evidence_text}\n\nAnalyze and return JSON:"
-                        }
-                    ],
-                    "response_format": {"type": "json_object"},
-                    "temperature": 0.1
-                },
+                    },
+                    {
+                        "role": "user",
+                        "content": f"Claim: {claim}\n\nEvidence:\n{evidence_text}\n\nAnalyze and return JSON:"
+                    }
+                ],
+                json_mode=True,
+                temperature=0.1,
                 timeout=20
             )
             
-            if response.status_code == 200:
-                result = response.json()
-                content = result["choices"][0]["message"]["content"]
-                analysis = json.loads(content)
+            if response.content:
+                analysis = json.loads(response.content)
                 
                 verdict = analysis.get("verdict", "NOT ENOUGH EVIDENCE").upper()
                 confidence = float(analysis.get("confidence", 0))
@@ -427,19 +409,30 @@ Return as JSON with keys: verdict, confidence, explanation, supporting_evidence,
 # CLASSIFIER
 # ============================================================================
 
+def _load_zero_shot_classifier():
+    # Loads once per process; False records a failed load so it isn't retried per request
+    try:
+        from transformers import pipeline
+        print(f"Loading zero-shot model {Config.ZERO_SHOT_MODEL}...")
+        return pipeline("zero-shot-classification", model=Config.ZERO_SHOT_MODEL)
+    except Exception as e:
+        print(f"⚠️  Zero-shot model unavailable: {e}")
+        return False
+
+_zero_shot_classifier = LazyResource(_load_zero_shot_classifier, "zero_shot_classifier")
+
+# HF pipelines (tokenizer included) aren't safe to call from several threads at once
+_zero_shot_lock = threading.Lock()
+
+
 class Classifier:
 
     @staticmethod
     def get_zero_shot_classifier():
-        # Return zero-shot classifier if available.
+        # Return the shared zero-shot classifier if available.
         if not Config.ZERO_SHOT_AVAILABLE:
             return None
-        
-        try:
-            from transformers import pipeline
-            return pipeline("zero-shot-classification", model=Config.ZERO_SHOT_MODEL)
-        except:
-            return None
+        return _zero_shot_classifier.get() or None
     
     @staticmethod
     def classify_snippet(snippet: str, claim: str, zero_shot_classifier=None) -> Dict[str, Any]:
@@ -456,11 +449,12 @@ class Classifier:
         if zero_shot_classifier:
             try:
                 text = snippet[:500]
-                result = zero_shot_classifier(
-                    text,
-                    ["supports the claim", "refutes the claim", "no evidence"],
-                    multi_label=False
-                )
+                with span("zero_shot"), _zero_shot_lock:
+                    result = zero_shot_classifier(
+                        text,
+                        ["supports the claim", "refutes the claim", "no evidence"],
+                        multi_label=False
+                    )
                 
                 label_map = {
                     "supports the claim": "supports",
@@ -579,7 +573,7 @@ class EnhancedFactChecker:
             print("⚠️  NEWSAPI_KEY not found. News verification disabled.")
             self.use_news_api = False
         
-        if use_llm_verification and not Config.OPENAI_API_KEY:
+        if use_llm_verification and not get_provider().available:
             print("⚠️  OPENAI_API_KEY not found. LLM verification disabled.")
             self.use_llm_verification = False
         
@@ -601,7 +595,8 @@ class EnhancedFactChecker:
         # Wikipedia
         if self.use_wikipedia:
             print("Searching Wikipedia...")
-            wiki_results = WikipediaAPI.search(claim, limit=top_k)
+            with span("wikipedia"):
+                wiki_results = WikipediaAPI.search(claim, limit=top_k)
             all_sources.extend(wiki_results)
             print(f"   ✓ Found {len(wiki_results)} Wikipedia sources")
             
@@ -628,7 +623,8 @@ class EnhancedFactChecker:
         # NewsAPI
         if self.use_news_api:
             print("Searching news sources...")
-            news_results = NewsAPI.search(claim, limit=top_k, api_key=Config.NEWSAPI_KEY)
+            with span("newsapi"):
+                news_results = NewsAPI.search(claim, limit=top_k, api_key=Config.NEWSAPI_KEY)
             all_sources.extend(news_results)
             print(f"   ✓ Found {len(news_results)} news sources")
             
@@ -682,20 +678,23 @@ class EnhancedFactChecker:
         
         if self.use_llm_verification:
             print("LLM verification...")
-            llm_verdict, llm_confidence, explanation, evidence_for, evidence_against = \
-                OpenAIIntegration.verify_with_llm(claim, all_sources)
+            with span("llm"):
+                llm_verdict, llm_confidence, explanation, evidence_for, evidence_against = \
+                    OpenAIIntegration.verify_with_llm(claim, all_sources)
             print(f"   ✓ LLM: {llm_verdict} ({llm_confidence:.0f}% confidence)")
         
         # Step 4: Semantic similarity verification (if enabled)
         semantic_score = 0.0
-        if self.use_semantic_similarity and Config.OPENAI_API_KEY:
+        if self.use_semantic_similarity and get_provider().available:
             print("Semantic analysis...")
-            claim_embedding = OpenAIIntegration.get_embedding(claim)
+            with span("semantic_embed"):
+                claim_embedding = OpenAIIntegration.get_embedding(claim)
             if claim_embedding:
                 similarities = []
                 for source in all_sources:
                     text = source.get("extract", source.get("snippet", ""))[:500]
-                    source_embedding = OpenAIIntegration.get_embedding(text)
+                    with span("semantic_embed"):
+                        source_embedding = OpenAIIntegration.get_embedding(text)
                     if source_embedding:
                         sim = OpenAIIntegration.cosine_similarity(claim_embedding, source_embedding)
                         credibility = source.get("credibility", 0.7)
@@ -766,4 +765,42 @@ class EnhancedFactChecker:
         # Simple extraction - take text before first parenthesis
         claim = llm_answer.split("(")[0].strip()
         
-        return self.check_claim(claim)
\ No newline at end of file
+        return self.check_claim(claim)
+
+# ============================================================================
+# SHARED INSTANCE
+# ============================================================================
+
+# check_claim keeps no per-request state, so one checker serves every thread
+_fact_checker = LazyResource(
+    lambda: EnhancedFactChecker(
+        use_wikipedia=True,
+        use_news_api=True,
+        use_llm_verification=True,
+        use_semantic_similarity=True
+    ),
+    "fact_checker"
+)
+
+
+def get_fact_checker() -> EnhancedFactChecker:
+    # Process-wide fact checker (and zero-shot model), created on first use.
+    return _fact_checker.get()
+
+
+def fact_checker_loaded() -> bool:
+    return _fact_checker.loaded
+
+
+def warmup_fact_checker(run_inference: bool = True) -> EnhancedFactChecker:
+    # Load the checker and run one classification so the first request
+    # doesn't pay for model load or first-inference allocation.
+    # Skip inference before fork: torch's OpenMP pool doesn't survive fork().
+    checker = get_fact_checker()
+    if run_inference and checker.zero_shot_classifier:
+        Classifier.classify_snippet(
+            "The Senate passed the bill in 2021.",
+            "Congress passed a bill.",
+            checker.zero_shot_classifier
+        )
+    return checker
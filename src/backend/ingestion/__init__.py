@@ -0,0 +1 @@
+from .bulk import ingest_transcripts, update_faiss_index, faiss_lock, INGEST_STAGES
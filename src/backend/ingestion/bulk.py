@@ -0,0 +1,251 @@
+"""
+Bulk transcript ingestion.
+
+Uploading a backlog one transcript at a time runs the whole pipeline per
+file: a fresh MongoDB connection, collection counts, and an incremental
+FAISS update that rewrites the index and metadata files every time. Bulk
+ingestion instead:
+
+1. preprocesses all transcripts in parallel (topic classification is mostly
+   waiting on the LLM),
+2. loads every transcript's speaker turns into MongoDB over one
+   connection, straight from memory (no CSV round trip),
+3. embeds all new debates in one pass and publishes the index once.
+
+Run from the `src` directory:
+
+    python -m backend.ingestion.bulk --manifest backlog.csv
+    python -m backend.ingestion.bulk transcripts/*_2024-06-27.txt --workers 8
+
+A manifest is a CSV (or JSON list) with `file`, `debate_name` and
+`debate_date` for each transcript; relative paths are resolved against the
+manifest's directory. Files given directly are named after their file name,
+with the date taken from a YYYY-MM-DD in the name or from --date.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+from backend.jobs import Job
+from backend.preprocessing.preprocess_script import preprocess
+from backend.utils import InterProcessLock
+from backend.utils.tracing import run_in_context
+from backend.retriever.retriever import INDEX_PATH
+
+load_dotenv()
+
+BULK_PREPROCESS_WORKERS = int(os.getenv("BULK_PREPROCESS_WORKERS", "4"))
+
+# Ingestion pipeline stages, in order (names match the upload progress UI)
+INGEST_STAGES = ["preprocessing", "database", "faiss"]
+
+# Only one job (in any server worker process, or a CLI run) updates the FAISS
+# index at a time; readers don't need the lock (see publish_index)
+faiss_lock = InterProcessLock(f"{INDEX_PATH}.lock")
+
+DATE_IN_NAME = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def update_faiss_index():
+    """
+    Add debates that are in MongoDB but not in the FAISS index, falling back
+    to a full rebuild if the incremental update fails.
+
+    Returns:
+        Stage detail: {"new_chunks": n} or {"full_rebuild": True}
+    """
+    from backend.embeddings_faiss.build_index import build_index
+    with faiss_lock:
+        try:
+            from backend.embeddings_faiss.incremental_index import update_faiss_incrementally
+            new_count = update_faiss_incrementally()
+            if new_count > 0:
+                print(f"Incrementally updated FAISS index with {new_count} new chunks")
+            else:
+                print("FAISS index is already up to date")
+            return {"new_chunks": new_count}
+        except ImportError as e:
+            print(f"Incremental update not available: {e}")
+        except Exception as e:
+            print(f"Incremental update failed: {e}")
+        print("Falling back to full rebuild...")
+        build_index()
+        return {"full_rebuild": True}
+
+
+def load_turns(turn_lists):
+    """
+    Load preprocessed speaker turns into MongoDB over a single connection.
+
+    Args:
+        turn_lists: One list of turns (as returned by preprocess()) per transcript
+
+    Returns:
+        Dict with files, rows, inserted and existing utterance counts
+    """
+    from backend.database.insert import DataInserter
+    from backend.database.stats import collection_counts
+    totals = {"files": 0, "rows": 0, "inserted": 0, "existing": 0}
+    inserter = DataInserter()
+    try:
+        for turns in turn_lists:
+            stats = inserter.load_rows(turns)
+            totals["files"] += 1
+            for name in ("rows", "inserted", "existing"):
+                totals[name] += stats[name]
+        print("Collections after load:")
+        for collection, count in collection_counts(inserter.db).items():
+            print(f"  - {collection}: ~{count} documents")
+    finally:
+        inserter.close_connection()
+    return totals
+
+
+def ingest_transcripts(job, transcripts, workers=BULK_PREPROCESS_WORKERS, update_index=True):
+    """
+    Ingest many transcripts with one database load and one index update.
+
+    A transcript that fails preprocessing is reported and skipped; the job
+    only fails if none of them could be preprocessed.
+
+    Args:
+        job: Job whose stages record progress (see backend.jobs)
+        transcripts: List of {"debate_name", "debate_date", "file_path"} dicts
+        workers: Transcripts preprocessed at the same time
+        update_index: Run the FAISS update at the end
+
+    Returns:
+        Dict stored as the job result
+    """
+    print(f"\n{'='*80}")
+    print(f"BULK INGESTION: {len(transcripts)} transcripts [job {job.id}]")
+    print(f"{'='*80}\n")
+    start = time.perf_counter()
+
+    # Step 1: Preprocess in parallel
+    preprocessed, failed = [], []
+    with job.stage("preprocessing") as stage:
+        print(f"Step 1/3: Preprocessing with {workers} workers...")
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(transcripts))),
+                                thread_name_prefix="preprocess") as pool:
+            futures = {
+                pool.submit(run_in_context(preprocess), t["debate_name"], t["debate_date"], t["file_path"]): t
+                for t in transcripts
+            }
+            for future in as_completed(futures):
+                transcript = futures[future]
+                try:
+                    result = future.result()
+                    preprocessed.append(dict(transcript, turns=result["turns"],
+                                             speaker_turns=result["speaker_count"],
+                                             topic_cache=result["topic_cache"]))
+                except Exception as e:
+                    print(f"Preprocessing failed for {transcript['file_path']}: {e}")
+                    failed.append({"file": os.path.basename(transcript["file_path"]),
+                                   "debate_name": transcript["debate_name"], "error": str(e)})
+                job.set_detail("preprocessing", {
+                    "done": len(preprocessed) + len(failed), "total": len(transcripts), "failed": len(failed)})
+        if not preprocessed:
+            raise RuntimeError(f"All {len(transcripts)} transcripts failed preprocessing")
+        hits = sum(t["topic_cache"]["hits"] for t in preprocessed)
+        lookups = hits + sum(t["topic_cache"]["misses"] for t in preprocessed)
+        stage["detail"] = {
+            "transcripts": len(preprocessed),
+            "speaker_turns": sum(t["speaker_turns"] for t in preprocessed),
+            "failed": len(failed),
+            "topic_cache": {"hits": hits, "misses": lookups - hits,
+                            "hit_rate": round(hits / lookups, 3) if lookups else None},
+        }
+
+    # Step 2: One connection for every transcript
+    with job.stage("database") as stage:
+        print(f"\nStep 2/3: Loading {len(preprocessed)} transcripts into the database...")
+        stage["detail"] = load_turns([t["turns"] for t in preprocessed])
+
+    # Step 3: One embedding pass and one index publish for all new debates
+    with job.stage("faiss") as stage:
+        if update_index:
+            print("\nStep 3/3: Updating FAISS index...")
+            stage["detail"] = update_faiss_index()
+        else:
+            stage["detail"] = {"skipped": True}
+
+    seconds = time.perf_counter() - start
+    print(f"\n{'='*80}")
+    print(f"BULK INGESTION COMPLETE: {len(preprocessed)} transcripts in {seconds:.1f}s")
+    print(f"{'='*80}\n")
+
+    return {
+        "success": True,
+        "message": f"{len(preprocessed)} of {len(transcripts)} debates processed successfully!",
+        "ingested": [{"debate_name": t["debate_name"], "debate_date": t["debate_date"],
+                      "speaker_turns": t["speaker_turns"]} for t in preprocessed],
+        "failed": failed,
+        "seconds": round(seconds, 1),
+    }
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def read_manifest(path):
+    """Transcripts listed in a CSV or JSON manifest."""
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        rows = json.load(f) if path.suffix.lower() == ".json" else list(csv.DictReader(f))
+    transcripts = []
+    for row in rows:
+        file_path = Path(row["file"])
+        if not file_path.is_absolute():
+            file_path = path.parent / file_path
+        transcripts.append({"debate_name": row["debate_name"], "debate_date": row["debate_date"],
+                            "file_path": str(file_path)})
+    return transcripts
+
+
+def transcripts_from_files(files, date=None):
+    """Name each transcript after its file; date from the file name or `date`."""
+    transcripts = []
+    for file in files:
+        stem = Path(file).stem
+        match = DATE_IN_NAME.search(stem)
+        debate_date = match.group(0) if match else date
+        if not debate_date:
+            raise ValueError(f"No date in '{file}'; pass --date or use a manifest")
+        name = DATE_IN_NAME.sub("", stem).replace("_", " ").strip(" -") or stem
+        transcripts.append({"debate_name": name, "debate_date": debate_date, "file_path": str(file)})
+    return transcripts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest many debate transcripts with one index update")
+    parser.add_argument("files", nargs="*", help="Transcript .txt files")
+    parser.add_argument("--manifest", help="CSV/JSON with file, debate_name and debate_date columns")
+    parser.add_argument("--date", help="Debate date (YYYY-MM-DD) for files without one in their name")
+    parser.add_argument("--workers", type=int, default=BULK_PREPROCESS_WORKERS, help="Parallel preprocessing workers")
+    parser.add_argument("--skip-index", action="store_true", help="Load the database only; no FAISS update")
+    args = parser.parse_args()
+
+    transcripts = read_manifest(args.manifest) if args.manifest else []
+    transcripts += transcripts_from_files(args.files, args.date)
+    if not transcripts:
+        parser.error("no transcripts given (pass files or --manifest)")
+
+    job = Job("bulk-ingest", INGEST_STAGES, {"transcripts": len(transcripts)})
+    result = ingest_transcripts(job, transcripts, workers=args.workers, update_index=not args.skip_index)
+    for name, stage in job.stages.items():
+        print(f"  {name}: {stage['seconds']}s {stage['detail']}")
+    for failure in result["failed"]:
+        print(f"  FAILED {failure['file']}: {failure['error']}")
+
+
+if __name__ == "__main__":
+    main()
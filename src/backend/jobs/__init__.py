@@ -0,0 +1 @@
+from .manager import Job, JobManager, JobQueueFull
@@ -0,0 +1,303 @@
+"""
+Background jobs with per-stage progress.
+
+Long pipelines (preprocess -> database -> FAISS) run on a bounded worker pool
+instead of inside the HTTP request. The request gets a job id back straight
+away and polls the job for stage status, timing and errors.
+
+With several server processes a poll can land on a worker that didn't run
+the job, so a JobManager given a state_dir also writes each job's status to
+<state_dir>/<job_id>.json whenever it changes. A job's file is deleted when
+the job drops out of history, and files older than state_max_age (e.g. from
+processes that have since exited) are pruned periodically.
+"""
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from backend.utils.tracing import start_trace, end_trace
+from backend.utils.metrics import REGISTRY, Gauge
+
+# How often each process looks for expired job state files
+PRUNE_INTERVAL_SECONDS = 3600
+
+jobs_active = REGISTRY.register(Gauge(
+    "jobs_active", "Background jobs waiting for or holding a worker", ["status"]))
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+class Job:
+    """One submitted pipeline run and the state of each of its stages."""
+
+    def __init__(self, kind, stages, params=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = "queued"  # queued -> running -> succeeded | failed
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.stages = OrderedDict(
+            (name, {"status": "pending", "started_at": None, "seconds": None, "detail": None, "error": None})
+            for name in stages
+        )
+        self._lock = threading.Lock()
+        self.on_change = None
+
+    def _changed(self):
+        if self.on_change is not None:
+            self.on_change(self)
+
+    @property
+    def current_stage(self):
+        with self._lock:
+            for name, stage in self.stages.items():
+                if stage["status"] in ("running", "failed"):
+                    return name
+        return None
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Run a block as one stage, recording its timing and any error.
+
+        Yields the stage dict so the block can set a `detail` value.
+        """
+        stage = self.stages.setdefault(
+            name, {"status": "pending", "started_at": None, "seconds": None, "detail": None, "error": None}
+        )
+        with self._lock:
+            stage["status"] = "running"
+            stage["started_at"] = _now()
+        self._changed()
+        start = time.perf_counter()
+        try:
+            yield stage
+        except Exception as e:
+            with self._lock:
+                stage["status"] = "failed"
+                stage["error"] = str(e)
+                stage["seconds"] = round(time.perf_counter() - start, 3)
+            self._changed()
+            raise
+        with self._lock:
+            stage["status"] = "succeeded"
+            stage["seconds"] = round(time.perf_counter() - start, 3)
+        self._changed()
+
+    def set_detail(self, name, detail):
+        """Update a stage's `detail` while it runs (e.g. per-file progress of a bulk job)."""
+        with self._lock:
+            self.stages[name]["detail"] = detail
+        self._changed()
+
+    def to_dict(self):
+        with self._lock:
+            stages = [{"name": name, **stage} for name, stage in self.stages.items()]
+        done = sum(1 for s in stages if s["status"] == "succeeded")
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "current_stage": self.current_stage,
+            "progress": round(done / len(stages), 2) if stages else None,
+            "stages": stages,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobQueueFull(Exception):
+    """Raised by JobManager.submit when max_pending jobs are already waiting."""
+
+
+class JobManager:
+    """Runs jobs on a fixed-size thread pool and keeps recent jobs for polling."""
+
+    def __init__(self, max_workers=2, max_history=500, state_dir=None, max_pending=None, state_max_age=None):
+        """
+        Args:
+            max_workers: Jobs that can run at the same time
+            max_history: Finished jobs kept for status polling (oldest dropped first)
+            state_dir: Optional directory shared by all server processes where
+                job status is written, so any process can answer a poll
+            max_pending: Queued (not yet running) jobs allowed before submit
+                raises JobQueueFull; None means unbounded
+            state_max_age: Seconds after its last update that a job's state file
+                is deleted, whichever process wrote it; None keeps them
+        """
+        self.max_workers = max_workers
+        self.max_history = max_history
+        self.max_pending = max_pending
+        self.state_dir = state_dir
+        self.state_max_age = state_max_age
+        self._last_prune = 0.0
+        if state_dir:
+            os.makedirs(state_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, stages, **params):
+        """
+        Queue fn(job, **params) and return the Job immediately.
+
+        fn should wrap each step in `with job.stage(name):`; its return value
+        becomes job.result.
+
+        Raises:
+            JobQueueFull: max_pending jobs are already waiting for a worker
+        """
+        job = Job(kind, stages, params)
+        if self.state_dir:
+            job.on_change = self._save
+        with self._lock:
+            if self.max_pending is not None:
+                queued = sum(1 for j in self._jobs.values() if j.status == "queued")
+                if queued >= self.max_pending:
+                    raise JobQueueFull(f"{queued} jobs already queued")
+            self._jobs[job.id] = job
+            dropped = self._trim()
+        self._remove_state(dropped)
+        self.prune_state()
+        job._changed()
+        self._publish_counts()
+        self._executor.submit(self._run, job, fn, params)
+        return job
+
+    def _run(self, job, fn, params):
+        job.status = "running"
+        job.started_at = _now()
+        job._changed()
+        self._publish_counts()
+        # Spans inside the job (Mongo inserts, LLM calls, ...) go to a per-job trace
+        trace, token = start_trace(f"job {job.kind}", job.id[:16])
+        try:
+            job.result = fn(job, **params)
+            job.status = "succeeded"
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = _now()
+            job._changed()
+            trace.fields["status"] = job.status
+            end_trace(token)
+            self._publish_counts()
+
+    def _publish_counts(self):
+        counts = self.counts()
+        jobs_active.set(counts["queued"], status="queued")
+        jobs_active.set(counts["running"], status="running")
+
+    def _trim(self):
+        # Drop the oldest finished jobs once history is full; returns their ids
+        finished = [jid for jid, j in self._jobs.items() if j.status in ("succeeded", "failed")]
+        dropped = finished[:max(0, len(self._jobs) - self.max_history)]
+        for job_id in dropped:
+            del self._jobs[job_id]
+        return dropped
+
+    def _remove_state(self, job_ids):
+        if not self.state_dir:
+            return
+        for job_id in job_ids:
+            try:
+                os.remove(self._state_path(job_id))
+            except OSError:
+                pass
+
+    def prune_state(self, force=False):
+        """
+        Delete state files (and leftover temp files) not updated for
+        state_max_age seconds. Runs at most once per PRUNE_INTERVAL_SECONDS
+        per process unless force is set.
+
+        Returns:
+            Number of files deleted
+        """
+        if not self.state_dir or self.state_max_age is None:
+            return 0
+        now = time.time()
+        if not force and now - self._last_prune < PRUNE_INTERVAL_SECONDS:
+            return 0
+        self._last_prune = now
+        with self._lock:
+            # Jobs this process still tracks keep their files while they are in history
+            live = {f"{job_id}.json" for job_id in self._jobs}
+        removed = 0
+        try:
+            names = os.listdir(self.state_dir)
+        except OSError:
+            return 0
+        for name in names:
+            if name in live or not (name.endswith(".json") or name.endswith(".tmp")):
+                continue
+            path = os.path.join(self.state_dir, name)
+            try:
+                if now - os.path.getmtime(path) > self.state_max_age:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def _state_path(self, job_id):
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        path = self._state_path(job.id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job.to_dict(), f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id):
+        """
+        Job dict for job_id, from this process or the shared state_dir.
+
+        Returns:
+            Dict as returned by Job.to_dict(), or None if the job is unknown
+        """
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if not self.state_dir or not all(c in "0123456789abcdef" for c in job_id):
+            return None
+        try:
+            with open(self._state_path(job_id), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def counts(self):
+        """Number of jobs in each status."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        counts = {"queued": 0, "running": 0, "succeeded": 0, "failed": 0}
+        for job in jobs:
+            counts[job.status] += 1
+        return counts
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -2,8 +2,12 @@
 Debate Transcript Preprocessing Script
 Person A - Transcript Preprocessing Task
 
-This script cleans raw debate transcripts and converts them to structured CSV/JSON format.
+This script cleans raw debate transcripts and converts them to structured speaker turns.
 Handles multiple transcript formats automatically.
+
+preprocess() returns the turns themselves, ready for the database loader.
+The CSV/JSON copies are an optional side output (PREPROCESS_EXPORT) written
+on a background thread, so they never hold up ingestion.
 """
 
 import re
@@ -12,14 +16,15 @@ import json
 import sys
 from pathlib import Path
 from datetime import datetime
-from transformers import pipeline # type: ignore
 import warnings
-import torch # type: ignore
 import hashlib
-import pickle
-import openai # type: ignore
 import os
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv # type: ignore
+from backend.utils import DiskCache, IdleResource, cache_key
+from backend.utils.tracing import span, traced
+from backend.providers import get_provider
+from backend.preprocessing.zero_shot import TOPIC_FALLBACK_MAX_TOKENS, ZeroShotClassifier
 
 load_dotenv()
 
@@ -71,47 +76,80 @@ def clean_transcript(raw_text):
 
 warnings.filterwarnings("ignore")
 
-# Initialize AI classifier once at module level
-device = 0 if torch.cuda.is_available() or torch.backends.mps.is_available() else -1
-topic_classifier = pipeline(
-    "zero-shot-classification", 
-    model="facebook/bart-large-mnli", # model="typeform/distilbert-base-uncased-mnli", faster but less accurate, 0.3s per utterance
-    device=device
-)
+# Zero-shot model for the fallback classifier. "typeform/distilbert-base-uncased-mnli"
+# is much smaller and faster (about 0.3s per utterance) but less accurate
+TOPIC_FALLBACK_MODEL = os.getenv("TOPIC_FALLBACK_MODEL", "facebook/bart-large-mnli")
+# Release the model after this many seconds unused (0 = keep it for the process lifetime)
+TOPIC_FALLBACK_IDLE_SECONDS = float(os.getenv("TOPIC_FALLBACK_IDLE_SECONDS", "300"))
+
+def _load_topic_classifier():
+    # torch/transformers are only imported when the fallback actually runs
+    from transformers import pipeline # type: ignore
+    import torch # type: ignore
+
+    device = 0 if torch.cuda.is_available() or torch.backends.mps.is_available() else -1
+    print(f"Loading zero-shot topic classifier ({TOPIC_FALLBACK_MODEL})...")
+    return ZeroShotClassifier(pipeline(
+        "zero-shot-classification", 
+        model=TOPIC_FALLBACK_MODEL,
+        device=device
+    ))
+
+def _release_topic_classifier():
+    # Runs after the classifier was dropped: collect it, then hand cached GPU memory back
+    import gc
+    import torch # type: ignore
+
+    gc.collect()
+    if torch.cuda.is_available():
+        torch.cuda.empty_cache()
+
+# AI classifier is created on first fallback use and released again when idle
+_topic_classifier = IdleResource(_load_topic_classifier, "topic_classifier",
+                                 idle_seconds=TOPIC_FALLBACK_IDLE_SECONDS,
+                                 on_release=_release_topic_classifier)
 
-# Cache directory
-CACHE_DIR = Path(".topic_cache")
-CACHE_DIR.mkdir(exist_ok=True)
+# One topic cache for both classifiers, keyed by (classifier, model, prompt version, text hash)
+TOPIC_CACHE_PATH = os.getenv("TOPIC_CACHE_PATH", ".topic_cache/topics.sqlite3")
+TOPIC_CACHE_MAX_MB = float(os.getenv("TOPIC_CACHE_MAX_MB", "64"))
+topic_cache = DiskCache(TOPIC_CACHE_PATH, max_bytes=int(TOPIC_CACHE_MAX_MB * 1024 * 1024), name="topics")
+
+# Bump these when the prompt, labels or post-processing change, so old
+# cached labels are no longer used
+TOPIC_LLM_MODEL = "gpt-4o-mini"
+TOPIC_LLM_PROMPT_VERSION = 1
+TOPIC_FALLBACK_PROMPT_VERSION = 1
 
 def get_text_hash(text):
     # Generate a hash for text to use as cache key.
     return hashlib.md5(text.encode('utf-8')).hexdigest()
 
-def load_cached_topics(text):
-    # Load topics from cache if available.
-    text_hash = get_text_hash(text)
-    cache_file = CACHE_DIR / f"{text_hash}.pkl"
-    
-    if cache_file.exists():
-        try:
-            with open(cache_file, 'rb') as f:
-                return pickle.load(f)
-        except:
-            return None
-    return None
+def topic_cache_key(classifier, model, prompt_version, text):
+    return cache_key(classifier, model, prompt_version, get_text_hash(text))
 
-def save_cached_topics(text, topics):
-    # Save topics to cache.
-    text_hash = get_text_hash(text)
-    cache_file = CACHE_DIR / f"{text_hash}.pkl"
-    
-    try:
-        with open(cache_file, 'wb') as f:
-            pickle.dump(topics, f)
-    except:
-        pass  # Silently fail if caching doesn't work
+def load_cached_topics(keys, cache_stats=None):
+    """
+    Cached topic lists for many cache keys at once.
 
-def classify_topics_batch(texts, speakers, threshold=0.3):
+    Args:
+        keys: Keys from topic_cache_key()
+        cache_stats: Optional dict whose hits/misses counts are increased
+
+    Returns:
+        List with the topics of each key, None where not cached
+    """
+    found = topic_cache.get_many(keys)
+    if cache_stats is not None:
+        cache_stats["hits"] = cache_stats.get("hits", 0) + len(found)
+        cache_stats["misses"] = cache_stats.get("misses", 0) + len(keys) - len(found)
+    return [found.get(key) for key in keys]
+
+def save_cached_topics(topics_by_key):
+    # One write for a whole batch; errors are reported, never raised
+    topic_cache.set_many(topics_by_key)
+
+@traced("topic_llm")
+def classify_topics_batch(texts, speakers, threshold=0.3, cache_stats=None):
     """
     High-quality classification optimized for 2 cents per transcript.
     Allows 2-4 tags per turn for better topic coverage.
@@ -120,14 +158,15 @@ def classify_topics_batch(texts, speakers, threshold=0.3):
         texts: List of texts to classify
         speakers: List of speaker names
         threshold: Minimum confidence score (for fallback only)
+        cache_stats: Optional dict whose topic cache hits/misses counts are increased
         
     Returns:
         List of topic lists
     """
-    client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-    if not os.getenv("OPENAI_API_KEY"):
+    provider = get_provider()
+    if not provider.available:
         print("OPENAI_API_KEY not found in environment. Using fallback classifier.")
-        return classify_topics_batch_fallback(texts, threshold)
+        return classify_topics_batch_fallback(texts, threshold, cache_stats)
     
     all_topics = [None] * len(texts)
     texts_to_process = []
@@ -208,6 +247,21 @@ def classify_topics_batch(texts, speakers, threshold=0.3):
             speakers_to_process.append(speaker)
             indices_to_process.append(i)
         
+    # Long turns this model and prompt have already labelled come from the
+    # cache; only the rest go to the LLM
+    cache_model = f"{provider.name}:{TOPIC_LLM_MODEL}"
+    cache_keys = {
+        index: topic_cache_key("llm", cache_model, TOPIC_LLM_PROMPT_VERSION, f"{speaker}\n{text}")
+        for index, text, speaker in zip(indices_to_process, texts_to_process, speakers_to_process)
+    }
+    for index, topics in zip(indices_to_process, load_cached_topics(list(cache_keys.values()), cache_stats)):
+        all_topics[index] = topics
+    uncached = [k for k, index in enumerate(indices_to_process) if all_topics[index] is None]
+    texts_to_process = [texts_to_process[k] for k in uncached]
+    speakers_to_process = [speakers_to_process[k] for k in uncached]
+    indices_to_process = [indices_to_process[k] for k in uncached]
+    fresh_topics = {}
+    
     batch_size = 25
     
     for i in range(0, len(texts_to_process), batch_size):
@@ -225,11 +279,12 @@ def classify_topics_batch(texts, speakers, threshold=0.3):
         
         while retry_count < max_retries:
             try:
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[{
-                        "role": "system", 
-                        "content": """You are a debate analyst. Return 2-4 topics per speaker turn for comprehensive coverage.
+                with span("llm"):
+                    response = provider.chat(
+                        model=TOPIC_LLM_MODEL,
+                        messages=[{
+                            "role": "system", 
+                            "content": """You are a debate analyst. Return 2-4 topics per speaker turn for comprehensive coverage.
                             CRITICAL: Return EXACTLY the same number of results as turns provided.
 
                             TOPIC RULES:
@@ -259,17 +314,19 @@ def classify_topics_batch(texts, speakers, threshold=0.3):
                             - DO NOT create variations - use exact topic names only
 
                             Format your response as JSON: {\"results\": [[\"topic1\", \"topic2\"], [\"topic1\", \"topic2\", \"topic3\"], ...]}"""
-                    }, {
-                        "role": "user",
-                        "content": f"Analyze these {len(batch_texts)} turns. Return EXACTLY {len(batch_texts)} results with 2-4 topics each in JSON format:\n\n{batch_prompt}"
-                    }],
-                    temperature=0.0,
-                    max_tokens=1000,
-                    response_format={"type": "json_object"}
-                )
+                        }, {
+                            "role": "user",
+                            "content": f"Analyze these {len(batch_texts)} turns. Return EXACTLY {len(batch_texts)} results with 2-4 topics each in JSON format:\n\n{batch_prompt}"
+                        }],
+                        temperature=0.0,
+                        max_tokens=1000,
+                        json_mode=True
+                    )
                 
-                result = json.loads(response.choices[0].message.content)
+                result = json.loads(response.content)
                 batch_topics = result.get("results", [])
+                # Turns the model answered itself (the rest get keyword padding)
+                answered = min(len(batch_topics), len(batch_texts))
                 
                 # Validate count
                 if len(batch_topics) != len(batch_texts):
@@ -318,6 +375,8 @@ def classify_topics_batch(texts, speakers, threshold=0.3):
                             topics = ["general_politics"]
                         
                         all_topics[original_idx] = topics
+                        if j < answered:
+                            fresh_topics[cache_keys[original_idx]] = topics
                 
                 break
                 
@@ -365,6 +424,9 @@ def classify_topics_batch(texts, speakers, threshold=0.3):
                     import time
                     time.sleep(0.5)
     
+    # Keyword fallbacks are not cached, so failed turns are retried next time
+    save_cached_topics(fresh_topics)
+    
     # Final safety check
     for i in range(len(all_topics)):
         if all_topics[i] is None or not isinstance(all_topics[i], list):
@@ -377,60 +439,55 @@ def classify_topics_batch(texts, speakers, threshold=0.3):
     
     return all_topics
 
-def classify_topics_batch_fallback(texts, threshold=0.3):
+# Candidate labels for the zero-shot fallback
+TOPIC_FALLBACK_LABELS = [
+    "economy and jobs",
+    "healthcare",
+    "immigration",
+    "foreign policy",
+    "climate change",
+    "education",
+    "crime and justice",
+    "taxes",
+    "abortion",
+    "gun rights",
+    "civil rights",
+    "election integrity",
+    "social security",
+    "military and defense",
+    "general politics"
+]
+
+def classify_topics_batch_fallback(texts, threshold=0.3, cache_stats=None):
     """
-    Fallback classifier using the original BART model
+    Fallback classifier using a local zero-shot model (TOPIC_FALLBACK_MODEL)
     """
-    candidate_labels = [
-        "economy and jobs",
-        "healthcare",
-        "immigration",
-        "foreign policy",
-        "climate change",
-        "education",
-        "crime and justice",
-        "taxes",
-        "abortion",
-        "gun rights",
-        "civil rights",
-        "election integrity",
-        "social security",
-        "military and defense",
-        "general politics"
-    ]
-    
-    all_topics = []
-    cache_hits = 0
-    cache_misses = 0
-    
+    # Threshold and token budget change the labels, so they are part of the key
+    prompt_version = [TOPIC_FALLBACK_PROMPT_VERSION, threshold, TOPIC_FALLBACK_MAX_TOKENS]
     try:
-        for i, text in enumerate(texts):
-            # Try to load from cache first
-            cached_topics = load_cached_topics(text)
+        # Cached texts first; the model is only loaded if something is left
+        keys = [topic_cache_key("zero_shot", TOPIC_FALLBACK_MODEL, prompt_version, text) for text in texts]
+        all_topics = load_cached_topics(keys, cache_stats)
+        misses = [i for i, topics in enumerate(all_topics) if topics is None]
+
+        if misses:
+            # All uncached texts in one call: the classifier batches their
+            # premise/hypothesis pairs across texts
+            with _topic_classifier.use() as topic_classifier:
+                with span("topic_zero_shot"):
+                    results = topic_classifier([texts[i] for i in misses], TOPIC_FALLBACK_LABELS)
             
-            if cached_topics is not None:
-                all_topics.append(cached_topics)
-                cache_hits += 1
-            else:
-                # Classify if not in cache
-                result = topic_classifier(
-                    text[:512],
-                    candidate_labels,
-                    multi_label=True
-                )
-                
+            fresh_topics = {}
+            for i, scores in zip(misses, results):
                 topics = [
                     label.replace(" and ", "_").replace(" ", "_")
-                    for label, score in zip(result['labels'], result['scores']) 
+                    for label, score in sorted(scores.items(), key=lambda item: item[1], reverse=True)
                     if score > threshold
                 ]
                 
-                final_topics = topics[:3] if topics else ["general_political_commentary"]
-                all_topics.append(final_topics)
-                
-                # Save to cache
-                save_cached_topics(text, final_topics)
-                cache_misses += 1                
+                all_topics[i] = topics[:3] if topics else ["general_political_commentary"]
+                fresh_topics[keys[i]] = all_topics[i]
+            save_cached_topics(fresh_topics)
     except Exception as e:
         print(f"Fallback classification failed: {e}")
         all_topics = [["general_political_commentary"] for _ in texts]
@@ -583,7 +640,40 @@ def save_as_json(data, output_path):
         json.dump(data, f, indent=2, ensure_ascii=False)
 
 
-def preprocess(debate_name, debate_date, input_file_path=None):
+# Write <name>_clean.csv / <name>_clean.json next to each transcript (the loader doesn't need them)
+PREPROCESS_EXPORT = os.getenv("PREPROCESS_EXPORT", "0") == "1"
+
+# One writer thread: exports run in the background, in order
+_export_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="export")
+_pending_exports = []
+
+
+def _export(speaker_turns, output_csv, output_json):
+    try:
+        save_as_csv(speaker_turns, output_csv)
+        save_as_json(speaker_turns, output_json)
+        print(f"Exported {output_csv} and {output_json}")
+    except Exception as e:
+        print(f"Export failed for {output_csv}: {e}")
+
+
+def export_turns(speaker_turns, output_csv, output_json):
+    """Write the CSV and JSON copies of speaker turns on the export thread."""
+    # Copies, so later changes to the turns can't race the writer
+    turns = [dict(turn, topics=list(turn.get('topics') or [])) for turn in speaker_turns]
+    future = _export_pool.submit(_export, turns, output_csv, output_json)
+    _pending_exports.append(future)
+    _pending_exports[:] = [f for f in _pending_exports if not f.done()]
+    return future
+
+
+def wait_for_exports(timeout=None):
+    """Block until every queued export has been written."""
+    for future in list(_pending_exports):
+        future.result(timeout=timeout)
+
+
+def preprocess(debate_name, debate_date, input_file_path=None, export=None):
     """
     Main preprocessing function.
     
@@ -591,6 +681,13 @@ def preprocess(debate_name, debate_date, input_file_path=None):
         debate_name: Name of the debate (e.g., "2024 CNN Presidential Debate")
         debate_date: Date in YYYY-MM-DD format
         input_file_path: Path to input transcript file (optional, falls back to CLI arg)
+        export: Also write <name>_clean.csv/.json in the background (PREPROCESS_EXPORT if None)
+
+    Returns:
+        Dict with turns (speaker, timestamp, text, source, date and a topics
+        list per turn, in speaking order), speaker_count, source, date,
+        topic_cache (hits, misses and hit_rate of the topic cache lookups)
+        and csv_path/json_path (None unless exported)
     """
 
     # Get input file from parameter or CLI argument
@@ -673,7 +770,10 @@ def preprocess(debate_name, debate_date, input_file_path=None):
     print("Classifying topics...")
     texts = [turn['text'] for turn in speaker_turns]
     speakers = [turn['speaker'] for turn in speaker_turns]
-    all_topics = classify_topics_batch(texts, speakers)
+    cache_stats = {"hits": 0, "misses": 0}
+    all_topics = classify_topics_batch(texts, speakers, cache_stats=cache_stats)
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    cache_stats["hit_rate"] = round(cache_stats["hits"] / lookups, 3) if lookups else None
     
     # Add topics to turns
     none_count = 0
@@ -686,29 +786,32 @@ def preprocess(debate_name, debate_date, input_file_path=None):
     if none_count > 0:
         print(f"Warning: {none_count} turns had None topics, replaced with 'unknown'")
     
-    print(f"Topic classification complete!")
-    
-    # Generate output filenames
-    base_name = input_file.stem  # filename without extension
-    output_csv = input_file.parent / f"{base_name}_clean.csv"
-    output_json = input_file.parent / f"{base_name}_clean.json"
-    
-    # Save both formats
-    save_as_csv(speaker_turns, output_csv)
-    save_as_json(speaker_turns, output_json)
+    print(f"Topic classification complete! (topic cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses)")
     
     print("\nDone! Preprocessing complete.")
-    print(f"\nOutput files:")
-    print(f"  - {output_csv}")
-    print(f"  - {output_json}\n")
+
+    # Optional CSV/JSON copies, written in the background
+    output_csv = output_json = None
+    if PREPROCESS_EXPORT if export is None else export:
+        base_name = input_file.stem  # filename without extension
+        output_csv = input_file.parent / f"{base_name}_clean.csv"
+        output_json = input_file.parent / f"{base_name}_clean.json"
+        export_turns(speaker_turns, output_csv, output_json)
+        print(f"\nExporting (in background):")
+        print(f"  - {output_csv}")
+        print(f"  - {output_json}\n")
     
     return {
-        'csv_path': str(output_csv),
-        'json_path': str(output_json),
+        'turns': speaker_turns,
+        'csv_path': str(output_csv) if output_csv else None,
+        'json_path': str(output_json) if output_json else None,
         'speaker_count': len(speaker_turns),
         'source': source,
-        'date': date
+        'date': date,
+        'topic_cache': cache_stats
     }
 
 if __name__ == "__main__":
-    preprocess(None, None)
\ No newline at end of file
+    # Standalone runs exist to produce the files
+    preprocess(None, None, export=True)
+    wait_for_exports()
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+Batched zero-shot (NLI) topic classification.
+
+The transformers zero-shot pipeline scores one text at a time: for every
+text it re-tokenizes each candidate label's hypothesis and runs one NLI pass
+per label. ZeroShotClassifier uses the pipeline's own model and tokenizer
+but works on many texts at once:
+
+- premises are truncated by tokens (TOPIC_FALLBACK_MAX_TOKENS), not characters
+- hypothesis token ids are computed once per label and reused
+- premise/hypothesis pairs from all texts are sorted by length and run
+  through the model TOPIC_FALLBACK_BATCH_SIZE pairs at a time, so little
+  of each forward pass is padding
+
+Scores match the pipeline's multi_label=True output: for each pair, softmax
+over the contradiction and entailment logits.
+"""
+import os
+
+from dotenv import load_dotenv # type: ignore
+
+load_dotenv()
+
+# Premise tokens kept per text (about 500 characters of English at 128)
+TOPIC_FALLBACK_MAX_TOKENS = int(os.getenv("TOPIC_FALLBACK_MAX_TOKENS", "128"))
+# Premise/hypothesis pairs per forward pass
+TOPIC_FALLBACK_BATCH_SIZE = int(os.getenv("TOPIC_FALLBACK_BATCH_SIZE", "32"))
+
+HYPOTHESIS_TEMPLATE = "This example is {}."
+
+
+class ZeroShotClassifier:
+    def __init__(self, pipeline, max_tokens=TOPIC_FALLBACK_MAX_TOKENS, batch_size=TOPIC_FALLBACK_BATCH_SIZE,
+                 hypothesis_template=HYPOTHESIS_TEMPLATE):
+        """
+        Args:
+            pipeline: transformers "zero-shot-classification" pipeline
+            max_tokens: Premise tokens kept per text
+            batch_size: Premise/hypothesis pairs per forward pass
+            hypothesis_template: Template turning a label into a hypothesis
+        """
+        self.pipeline = pipeline
+        self.model = pipeline.model
+        self.tokenizer = pipeline.tokenizer
+        self.device = pipeline.device
+        self.max_tokens = max_tokens
+        self.batch_size = max(1, batch_size)
+        self.hypothesis_template = hypothesis_template
+
+        # Same label lookup as the pipeline
+        self.entailment_id = next((i for label, i in self.model.config.label2id.items()
+                                   if label.lower().startswith("entail")), -1)
+        self.contradiction_id = -1 if self.entailment_id == 0 else 0
+        self._hypotheses = {}
+
+    def hypothesis_ids(self, label):
+        """Token ids of a label's hypothesis (no special tokens), computed once."""
+        ids = self._hypotheses.get(label)
+        if ids is None:
+            ids = self._hypotheses[label] = self.tokenizer(
+                self.hypothesis_template.format(label), add_special_tokens=False)["input_ids"]
+        return ids
+
+    def premise_budget(self, labels):
+        """Premise tokens that fit next to the longest hypothesis in the model's input."""
+        longest = max(len(self.hypothesis_ids(label)) for label in labels)
+        room = (self.tokenizer.model_max_length - longest
+                - self.tokenizer.num_special_tokens_to_add(pair=True))
+        return max(1, min(self.max_tokens, room))
+
+    def __call__(self, texts, labels):
+        """
+        Score every text against every label.
+
+        Args:
+            texts: Texts to classify
+            labels: Candidate labels
+
+        Returns:
+            One dict of label -> entailment probability per text
+        """
+        import torch # type: ignore
+
+        if not texts:
+            return []
+        premises = self.tokenizer(list(texts), add_special_tokens=False, truncation=True,
+                                  max_length=self.premise_budget(labels))["input_ids"]
+        hypotheses = [self.hypothesis_ids(label) for label in labels]
+        with_types = "token_type_ids" in self.tokenizer.model_input_names
+
+        pairs = []
+        for t, premise in enumerate(premises):
+            for h, hypothesis in enumerate(hypotheses):
+                pair = {"input_ids": self.tokenizer.build_inputs_with_special_tokens(premise, hypothesis)}
+                if with_types:
+                    pair["token_type_ids"] = self.tokenizer.create_token_type_ids_from_sequences(premise, hypothesis)
+                pairs.append((t, h, pair))
+        # Similar lengths share a batch, so batches carry little padding
+        pairs.sort(key=lambda item: len(item[2]["input_ids"]))
+
+        scores = [{} for _ in texts]
+        with torch.inference_mode():
+            for start in range(0, len(pairs), self.batch_size):
+                chunk = pairs[start:start + self.batch_size]
+                batch = self.tokenizer.pad([pair for _, _, pair in chunk], return_tensors="pt")
+                batch = {name: tensor.to(self.device) for name, tensor in batch.items()}
+                logits = self.model(**batch).logits
+                entail_contr = logits[:, [self.contradiction_id, self.entailment_id]]
+                probabilities = entail_contr.softmax(dim=-1)[:, 1].tolist()
+                for (t, h, _), probability in zip(chunk, probabilities):
+                    scores[t][labels[h]] = probability
+        return scores
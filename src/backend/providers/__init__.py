@@ -0,0 +1,2 @@
+from .base import Provider, ChatResult, EmbeddingResult
+from .registry import get_provider, set_provider
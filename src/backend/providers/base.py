@@ -0,0 +1,66 @@
+"""
+Provider interface for embeddings and chat completions.
+
+Every module that needs a model goes through a Provider instead of calling
+an SDK directly, so the backend can be pointed at OpenAI or at a local,
+deterministic implementation (see registry.py) without touching call sites.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+
+@dataclass
+class EmbeddingResult:
+    vectors: List[List[float]]
+    model: str
+    usage: Dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class ChatResult:
+    content: str
+    model: str
+    usage: Dict[str, int] = field(default_factory=dict)
+    finish_reason: Optional[str] = None
+
+
+class Provider:
+    """Base class; subclasses implement embed() and chat()."""
+
+    name = "base"
+
+    @property
+    def available(self) -> bool:
+        """False when the provider can't be used (e.g. no API key)."""
+        return True
+
+    def embed(self, texts: List[str], model: str, dimensions: Optional[int] = None, **options) -> EmbeddingResult:
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts: Texts to embed
+            model: Embedding model name
+            dimensions: Requested vector size (None = the model's native size)
+            options: Provider-specific request options (e.g. timeout)
+        """
+        raise NotImplementedError
+
+    def chat(self, messages: List[Dict[str, str]], model: str, temperature: Optional[float] = None,
+             max_tokens: Optional[int] = None, json_mode: bool = False, **options) -> ChatResult:
+        """
+        One chat completion.
+
+        Args:
+            messages: [{"role": ..., "content": ...}, ...]
+            model: Chat model name
+            temperature: Sampling temperature (None = model default)
+            max_tokens: Completion token limit
+            json_mode: Ask for a JSON object response
+            options: Provider-specific request options (e.g. timeout, max_completion_tokens)
+        """
+        raise NotImplementedError
+
+    def stream_chat(self, messages: List[Dict[str, str]], model: str, **options) -> Iterator[str]:
+        """Yield the completion in chunks (default: one chunk from chat())."""
+        yield self.chat(messages, model, **options).content
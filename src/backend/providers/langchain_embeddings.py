@@ -0,0 +1,49 @@
+"""
+LangChain adapters, so Chroma and prompt templates use the same provider
+as the rest of the backend.
+"""
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from backend.providers.base import Provider
+from backend.providers.registry import get_provider
+
+# LangChain message types -> chat roles
+ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+
+class ProviderEmbeddings(Embeddings):
+    """LangChain Embeddings backed by a Provider (the configured one if None)."""
+
+    def __init__(self, model: str, dimensions: Optional[int] = None, provider: Optional[Provider] = None,
+                 batch_size: int = 256):
+        """
+        Args:
+            model: Embedding model name
+            dimensions: Requested vector size (None = the model's native size)
+            provider: Provider to embed with (defaults to LLM_PROVIDER)
+            batch_size: Texts per embed() call when embedding documents
+        """
+        self.model = model
+        self.dimensions = dimensions
+        self.provider = provider
+        self.batch_size = batch_size
+
+    def _embed(self, texts):
+        provider = self.provider or get_provider()
+        return provider.embed(texts, self.model, dimensions=self.dimensions).vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            vectors.extend(self._embed(texts[start:start + self.batch_size]))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+
+def to_chat_messages(messages) -> List[Dict[str, str]]:
+    """Convert LangChain messages (e.g. from ChatPromptTemplate.format_messages) to role dicts."""
+    return [{"role": ROLES.get(message.type, "user"), "content": message.content} for message in messages]
@@ -0,0 +1,88 @@
+"""
+Offline, deterministic provider.
+
+Embeddings hash word unigrams and bigrams into signed buckets (feature
+hashing) and L2-normalize the result: texts that share words get similar
+vectors, and the same text always gets the same vector. Chat completions
+are templated: plain requests get an extract of the prompt's context, and
+JSON requests get an object whose fields callers fall back from. No network,
+no keys, no model files, so the whole backend runs and can be benchmarked
+on an air-gapped host.
+"""
+import json
+import re
+import zlib
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from backend.providers.base import Provider, ChatResult, EmbeddingResult
+from backend.embeddings_faiss.embedding_space import NATIVE_DIMENSIONS
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+# Where the material to answer from starts in the repo's prompts
+CONTEXT_MARKER = re.compile(r"(?:Context|Transcript excerpt|Evidence):")
+
+# Known models get their native vector size, so indexes and manifests line up
+DEFAULT_DIMENSIONS = 256
+
+OFFLINE_NOTE = "Offline provider: no language model was consulted."
+
+
+def hash_embed(texts, dimensions=DEFAULT_DIMENSIONS):
+    """(len(texts), dimensions) float32 feature-hashing vectors, L2-normalized."""
+    vectors = np.zeros((len(texts), dimensions), dtype="float32")
+    for row, text in enumerate(texts):
+        words = WORD_PATTERN.findall(text.lower())
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            h = zlib.crc32(feature.encode("utf-8"))
+            vectors[row, h % dimensions] += 1.0 if h & 0x80000000 else -1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _count_tokens(text):
+    # Rough token count for the usage block (~4 chars per token)
+    return max(1, len(text) // 4)
+
+
+class LocalProvider(Provider):
+    name = "local"
+
+    def __init__(self, dimensions: Optional[int] = None):
+        """
+        Args:
+            dimensions: Vector size when neither the request nor the model name
+                implies one
+        """
+        self.dimensions = dimensions or DEFAULT_DIMENSIONS
+
+    def embed(self, texts: List[str], model: str, dimensions: Optional[int] = None, **options) -> EmbeddingResult:
+        size = dimensions or NATIVE_DIMENSIONS.get(model, self.dimensions)
+        vectors = hash_embed(texts, size)
+        tokens = sum(_count_tokens(text) for text in texts)
+        return EmbeddingResult(vectors.tolist(), model, {"prompt_tokens": tokens, "total_tokens": tokens})
+
+    def _answer(self, messages):
+        """First sentences of the longest user message's context/excerpt, or of the message itself."""
+        user_messages = [m.get("content") or "" for m in messages if m.get("role") == "user"] or [""]
+        text = max(user_messages, key=len)
+        marker = CONTEXT_MARKER.search(text)
+        if marker:
+            text = text[marker.end():]
+        text = re.split(r"\n\s*(?:Question|Answer the question)", text, maxsplit=1)[0]
+        sentences = [s.strip() for s in SENTENCE_PATTERN.split(" ".join(text.split()).strip('" ')) if s.strip()]
+        extract = " ".join(sentences[:2])[:400]
+        return f"{extract} ({OFFLINE_NOTE})" if extract else OFFLINE_NOTE
+
+    def chat(self, messages: List[Dict[str, str]], model: str, temperature: Optional[float] = None,
+             max_tokens: Optional[int] = None, json_mode: bool = False, **options) -> ChatResult:
+        # JSON callers read the keys they need with defaults, so a near-empty object is valid
+        content = json.dumps({"explanation": OFFLINE_NOTE}) if json_mode else self._answer(messages)
+        prompt_tokens = sum(_count_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = _count_tokens(content)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                 "total_tokens": prompt_tokens + completion_tokens}
+        return ChatResult(content, model, usage, "stop")
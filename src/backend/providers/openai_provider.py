@@ -0,0 +1,83 @@
+"""
+OpenAI implementation of the provider interface.
+
+One SDK client per process (connection pool shared by every caller), with
+the SDK's retries on 429/5xx. Calls are counted and timed as the
+`openai_embeddings` / `openai_chat` upstreams, and token usage is recorded
+per model and endpoint.
+"""
+import os
+from typing import Dict, Iterator, List, Optional
+
+from openai import OpenAI
+
+from backend.providers.base import Provider, ChatResult, EmbeddingResult
+from backend.utils import LazyResource
+from backend.utils.metrics import upstream_call, record_usage
+
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+
+
+def _usage_dict(usage):
+    if usage is None:
+        return {}
+    return {name: value for name, value in usage.model_dump().items() if isinstance(value, int)}
+
+
+class OpenAIProvider(Provider):
+    name = "openai"
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_retries: int = OPENAI_MAX_RETRIES):
+        """
+        Args:
+            api_key: OpenAI API key (defaults to OPENAI_API_KEY)
+            base_url: API base URL (defaults to OPENAI_BASE_URL, else api.openai.com)
+            max_retries: SDK retries for rate limits, timeouts and 5xx errors
+        """
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY")
+        self.base_url = base_url or os.getenv("OPENAI_BASE_URL") or None
+        self.max_retries = max_retries
+        self._client = LazyResource(self._create_client, "openai")
+
+    def _create_client(self):
+        if not self.api_key:
+            raise ValueError("Missing OPENAI_API_KEY in .env file")
+        return OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=self.max_retries)
+
+    @property
+    def client(self):
+        return self._client.get()
+
+    @property
+    def available(self) -> bool:
+        return bool(self.api_key)
+
+    def embed(self, texts: List[str], model: str, dimensions: Optional[int] = None, **options) -> EmbeddingResult:
+        if dimensions:
+            options["dimensions"] = dimensions
+        with upstream_call("openai_embeddings"):
+            response = self.client.embeddings.create(input=texts, model=model, **options)
+        record_usage(model, response.usage)
+        return EmbeddingResult([data.embedding for data in response.data], response.model, _usage_dict(response.usage))
+
+    def chat(self, messages: List[Dict[str, str]], model: str, temperature: Optional[float] = None,
+             max_tokens: Optional[int] = None, json_mode: bool = False, **options) -> ChatResult:
+        if temperature is not None:
+            options["temperature"] = temperature
+        if max_tokens is not None:
+            options["max_tokens"] = max_tokens
+        if json_mode:
+            options["response_format"] = {"type": "json_object"}
+        with upstream_call("openai_chat"):
+            response = self.client.chat.completions.create(model=model, messages=messages, **options)
+        record_usage(model, response.usage)
+        choice = response.choices[0]
+        return ChatResult(choice.message.content or "", response.model, _usage_dict(response.usage), choice.finish_reason)
+
+    def stream_chat(self, messages: List[Dict[str, str]], model: str, **options) -> Iterator[str]:
+        with upstream_call("openai_chat"):
+            stream = self.client.chat.completions.create(model=model, messages=messages, stream=True, **options)
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                yield chunk.choices[0].delta.content
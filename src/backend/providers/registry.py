@@ -0,0 +1,39 @@
+"""
+Process-wide provider selection.
+
+LLM_PROVIDER picks the implementation: `openai` (default) or `local`.
+"""
+import os
+
+from dotenv import load_dotenv
+
+from backend.utils import LazyResource
+
+load_dotenv()
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai").lower()
+
+
+def _create_provider():
+    if LLM_PROVIDER == "local":
+        from backend.providers.local import LocalProvider
+        return LocalProvider()
+    if LLM_PROVIDER == "openai":
+        from backend.providers.openai_provider import OpenAIProvider
+        return OpenAIProvider()
+    raise ValueError(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}' (use 'openai' or 'local')")
+
+
+_provider = LazyResource(_create_provider, "provider")
+_override = None
+
+
+def get_provider():
+    """The provider every module should use for embeddings and chat."""
+    return _override or _provider.get()
+
+
+def set_provider(provider):
+    """Use `provider` for this process instead of LLM_PROVIDER (None to reset)."""
+    global _override
+    _override = provider
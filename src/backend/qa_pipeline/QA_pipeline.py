@@ -1,14 +1,27 @@
-# Import OpenAI embeddings and chat model
+# Import provider-backed embeddings and chat model
 from dotenv import load_dotenv
 import os
 
 # Load environment variables from .env file
 load_dotenv()
 
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from backend.utils import LazyResource
+from backend.utils.tracing import span, traced
+from backend.embeddings_faiss.embedding_space import EmbeddingSpace
+from backend.providers import get_provider
+from backend.providers.langchain_embeddings import ProviderEmbeddings, to_chat_messages
+
+QA_MODEL = "gpt-3.5-turbo"
+
+def _create_embedding_function():
+    # Same model and `dimensions` setting as the FAISS index (PCA spaces use native vectors here)
+    return ProviderEmbeddings(**EmbeddingSpace.from_env().request_kwargs())
+
+# Built on first use so importing this module doesn't construct API clients
+_embedding_function = LazyResource(_create_embedding_function, "embeddings")
 
 def get_embedding_function():
-    return OpenAIEmbeddings(model="text-embedding-3-small")
+    return _embedding_function.get()
 
 
 import json
@@ -18,8 +31,8 @@ from langchain_chroma import Chroma
 from datetime import datetime
 
 CHROMA_PATH = "chroma"
-embedding_function = get_embedding_function()
 
+@traced("chroma_build")
 def build_chroma_db(force_rebuild=True):
     # Step 1: Load passages from JSON 
     print("="*80)
@@ -78,13 +91,13 @@ def build_chroma_db(force_rebuild=True):
 
     # Step 3: Create fresh Chroma database with unique collection name
     if force_rebuild or not os.path.exists(CHROMA_PATH):
-        print("Creating fresh ChromaDB with OpenAI embeddings...")
+        print(f"Creating fresh ChromaDB with {get_provider().name} embeddings...")
         # Use a timestamped collection name to ensure it's completely fresh
         collection_name = f"debate_passages_{int(datetime.now().timestamp())}"
         # Create completely fresh database with unique collection
         db = Chroma.from_documents(
             new_documents, 
-            embedding_function, 
+            get_embedding_function(), 
             persist_directory=CHROMA_PATH,
             collection_name=collection_name
         )
@@ -92,7 +105,7 @@ def build_chroma_db(force_rebuild=True):
         print(f"Collection name: {collection_name}")
     else:
         # Load existing and add only new documents
-        db = Chroma(persist_directory=CHROMA_PATH, embedding_function=embedding_function)
+        db = Chroma(persist_directory=CHROMA_PATH, embedding_function=get_embedding_function())
         existing = db.get()
         existing_texts = set(existing["documents"]) if existing["documents"] else set()
         
@@ -128,9 +141,83 @@ For example: "Person Y stated X (Debate: "cite debate here", Timestamp: "cite ti
 Answer the question based on the above context only: {question}
 """
 
-def query_rag(query_text):
+def answer_from_context(query_text, passages):
+    """
+    Ask the chat model to answer from the given passages.
+
+    Args:
+        query_text: User question
+        passages: List of (text, debate name, timestamp), most relevant first
+
+    Returns:
+        Answer text
+    """
+    # Build context text
+    context_text = "\n\n---\n\n".join([
+        f"{text} (Debate: {debate_name}, Timestamp: {timestamp})"
+        for text, debate_name, timestamp in passages
+    ])
+
+    # Format the prompt using the context and user question
+    prompt_str = ChatPromptTemplate.from_template(PROMPT_TEMPLATE).format_messages(
+        context=context_text, question=query_text
+    )
+
+    # Generate the response with the configured provider (GPT-3.5-turbo on OpenAI)
+    print(f"Generating response from {get_provider().name} ({QA_MODEL})...")
+    with span("llm"):
+        response = get_provider().chat(to_chat_messages(prompt_str), QA_MODEL, temperature=0)
+
+    return response.content
+
+def rank_passages(query_text, passages, k=40):
+    """
+    Order passages by embedding distance to the query, like a Chroma
+    similarity search over just these passages, but without a database.
+
+    Args:
+        query_text: User question
+        passages: Passages from the retriever (dicts with text and metadata)
+        k: Passages to keep
+
+    Returns:
+        List of (passage, distance), closest first
+    """
+    import numpy as np
+
+    if not passages:
+        return []
+    embeddings = get_embedding_function()
+    vectors = np.asarray(embeddings.embed_documents([p["text"] for p in passages]), dtype="float32")
+    query_vector = np.asarray(embeddings.embed_query(query_text), dtype="float32")
+    # Squared L2, Chroma's default distance
+    distances = ((vectors - query_vector) ** 2).sum(axis=1)
+    order = np.argsort(distances, kind="stable")[:k]
+    return [(passages[i], float(distances[i])) for i in order]
+
+def query_rag(query_text, passages=None):
+    """
+    Answer a question from debate passages.
+
+    Args:
+        query_text: User question
+        passages: Passages from the retriever, ranked in memory. If None, the
+            newest collection in the Chroma database from build_chroma_db() is searched
+
+    Returns:
+        Answer text
+    """
     print(f"\n🔎 Querying RAG system with: '{query_text}'...")
     
+    if passages is not None:
+        # Each request's passages stay in memory: no shared passages.json or
+        # Chroma directory for concurrent requests to overwrite
+        with span("chroma_search"):
+            ranked = rank_passages(query_text, passages)
+        return answer_from_context(query_text, [
+            (p["text"], p.get("debate_name", "Unknown"), p.get("timestamp")) for p, _ in ranked
+        ])
+    
     client = None
     try:
         # Reload the Chroma vector database from disk
@@ -148,31 +235,18 @@ def query_rag(query_text):
         
         db = Chroma(
             client=client,
-            embedding_function=embedding_function,
+            embedding_function=get_embedding_function(),
             collection_name=latest_collection.name
         )
 
         # Retrieves similar passages to the query
-        results = db.similarity_search_with_score(query_text, k=40)
+        with span("chroma_search"):
+            results = db.similarity_search_with_score(query_text, k=40)
 
-        # Build context text
-        context_text = "\n\n---\n\n".join([
-            f"{doc.page_content} (Debate: {doc.metadata.get('debate_name')}, Timestamp: {doc.metadata.get('timestamp')})"
+        return answer_from_context(query_text, [
+            (doc.page_content, doc.metadata.get('debate_name'), doc.metadata.get('timestamp'))
             for doc, _ in results
         ])
-
-        # Format the prompt using the context and user question
-        prompt_str = ChatPromptTemplate.from_template(PROMPT_TEMPLATE).format_messages(
-            context=context_text, question=query_text
-        )
-
-        # Initialize the OpenAI model (using GPT-3.5-turbo)
-        print("Generating response from OpenAI (gpt-3.5-turbo)...")
-        model = ChatOpenAI(model="gpt-3.5-turbo", temperature=0)
-        # Generate the response from the model
-        response = model.invoke(prompt_str)
-
-        return response.content
     
     finally:
         # Always close the client connection
@@ -181,4 +255,4 @@ def query_rag(query_text):
                 # ChromaDB doesn't have an explicit close, but we can delete the reference
                 del client
             except:
-                pass
\ No newline at end of file
+                pass
@@ -2,36 +2,57 @@
 import json
 import numpy as np
 import faiss
-from openai import OpenAI
 import os
+import threading
+import time
 from dotenv import load_dotenv
+from backend.utils.tracing import span
+from backend.utils.metrics import REGISTRY, Gauge
+from backend.embeddings_faiss.embedding_space import space_for_index, read_manifest
 
 load_dotenv()
 
 # Paths from .env
 INDEX_PATH = os.getenv("EMBEDDING_OUTPUT_INDEX", "debates.index")
 METADATA_PATH = os.getenv("EMBEDDING_OUTPUT_METADATA", "debate_metadata.json")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-if not OPENAI_API_KEY:
-    raise ValueError("Missing OPENAI_API_KEY in .env file")
+class IndexMismatch(ValueError):
+    """The index, metadata and manifest on disk are from different writes."""
+
 
 class DebateRetriever:
-    def __init__(self):
-        # Initialize retriever by loading FAISS index and metadata.
-        print(f"- Loading FAISS index from {INDEX_PATH}...")
-        self.index = faiss.read_index(INDEX_PATH)
+    def __init__(self, index_path=INDEX_PATH, metadata_path=METADATA_PATH, embed_fn=None):
+        """
+        Initialize retriever by loading FAISS index and metadata.
+
+        Args:
+            index_path: FAISS index file
+            metadata_path: Chunk metadata JSON stored alongside the index
+            embed_fn: Optional callable embedding a list of texts in the index's
+                space; defaults to the configured provider with the settings in the index manifest
+        """
+        print(f"- Loading FAISS index from {index_path}...")
+        self.index = faiss.read_index(index_path)
         print(f"FAISS index loaded with {self.index.ntotal} passages")
+        manifest = read_manifest(index_path) or {}
+        self.generation = int(manifest.get("generation", 0))
+        
+        # Queries must be embedded in the same space the index was built in
+        self.space = space_for_index(index_path, self.index.d)
+        print(f"Embedding space: {self.space.model}, {self.index.d}-d ({self.space.method})")
         
-        print(f"- Loading metadata from {METADATA_PATH}...")
-        with open(METADATA_PATH, 'r', encoding='utf-8') as f:
+        print(f"- Loading metadata from {metadata_path}...")
+        with open(metadata_path, 'r', encoding='utf-8') as f:
             self.metadata = json.load(f)
         print(f"Metadata loaded with {len(self.metadata)} entries")
+
+        # Files caught in the middle of publish_index() don't describe the same vectors
+        if len(self.metadata) != self.index.ntotal or manifest.get("count", self.index.ntotal) != self.index.ntotal:
+            raise IndexMismatch(f"index has {self.index.ntotal} vectors, metadata {len(self.metadata)} entries, "
+                                f"manifest {manifest.get('count')}")
         
-        # Load OpenAI client (same embedding model used to build index)
-        print("- Loading OpenAI client...")
-        self.client = OpenAI(api_key=OPENAI_API_KEY)
-        print("OpenAI client loaded")
+        # Queries go through the shared provider unless a custom embedder is given
+        self.embed_fn = embed_fn
     
     def retrieve(self, query, top_k):
         """
@@ -44,21 +65,23 @@ class DebateRetriever:
         Returns:
             List of dicts with debate_name, debate_date, speaker, timestamp, text, and topics
         """
-        # Generate query embedding using OpenAI
-        response = self.client.embeddings.create(
-            model="text-embedding-3-small",
-            input=[query]
-        )
-        query_emb = np.array([response.data[0].embedding], dtype='float32')
+        # Generate query embedding (same model and space used to build index)
+        with span("query_embed"):
+            if self.embed_fn:
+                query_emb = np.asarray(self.embed_fn([query]), dtype='float32')
+            else:
+                query_emb = self.space.embed([query])
 
         # Search FAISS index - get top_k results from all debates
-        distances, indices = self.index.search(query_emb, top_k)
+        with span("faiss_search"):
+            distances, indices = self.index.search(query_emb, top_k)
 
         # Filter results by debate_name and format
         results = []
         for idx in indices[0]:
             meta = self.metadata[idx]
             results.append({
+                'utterance_id': meta.get('utterance_id'),
                 'debate_name': meta.get('debate_name', 'Unknown'),
                 'debate_date': meta.get('debate_date'),
                 'speaker': meta['speaker'],
@@ -71,33 +94,128 @@ class DebateRetriever:
 
     
     def save_results(self, results, filename="passages.json"):
-        """Save retrieval results to a JSON file."""
-        with open(filename, 'w', encoding='utf-8') as f:
+        """Save retrieval results to a JSON file (written to a temp file, then renamed)."""
+        tmp = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
             json.dump(results, f, indent=4, ensure_ascii=False)
+        # Readers see the old file or the new one, never a half-written one
+        os.replace(tmp, filename)
         print(f"\n✅ Results saved to '{filename}' ({len(results)} passages)\n")
 
 
-def run_retriever(query, top_k):
+_shared_retriever = None
+_shared_retriever_version = None
+_shared_retriever_lock = threading.Lock()
+
+# Attempts at loading a consistent index before giving up (or keeping the old one)
+LOAD_ATTEMPTS = 5
+LOAD_RETRY_SECONDS = 0.2
+
+def _index_version():
+    # The manifest generation changes on every write; the mtime covers indexes without one
+    return (int((read_manifest(INDEX_PATH) or {}).get("generation", 0)), os.path.getmtime(INDEX_PATH))
+
+def _load_retriever():
+    for attempt in range(LOAD_ATTEMPTS):
+        version = _index_version()
+        try:
+            with span("retriever_load"):
+                retriever = DebateRetriever()
+            return retriever, version
+        except IndexMismatch as e:
+            # An index write is in progress; its last rename is moments away
+            print(f"Index files out of step ({e}), retrying...")
+            if attempt == LOAD_ATTEMPTS - 1:
+                raise
+            time.sleep(LOAD_RETRY_SECONDS)
+
+def get_shared_retriever():
+    """
+    Process-wide DebateRetriever, loaded once and reused by every request.
+    Reloaded when the index changes (e.g. after an ingestion job). If the new
+    files can't be loaded consistently, the previous retriever keeps serving
+    and the load is tried again on the next request.
+    """
+    global _shared_retriever, _shared_retriever_version
+    version = _index_version()
+    if _shared_retriever is not None and version == _shared_retriever_version:
+        return _shared_retriever
+    with _shared_retriever_lock:
+        if _shared_retriever is None or _index_version() != _shared_retriever_version:
+            try:
+                _shared_retriever, _shared_retriever_version = _load_retriever()
+            except IndexMismatch:
+                if _shared_retriever is None:
+                    raise
+                print("Keeping the previously loaded index for now")
+                return _shared_retriever
+            _set_loaded_gauges(_shared_retriever)
+    return _shared_retriever
+
+
+# Index metrics: what is on disk (read at scrape time) vs. what each worker has loaded
+index_file_bytes = REGISTRY.register(Gauge(
+    "faiss_index_file_bytes", "Size of the FAISS index file on disk", local=True))
+index_vectors = REGISTRY.register(Gauge(
+    "faiss_index_vectors", "Vectors in the index on disk (from the manifest)", local=True))
+index_generation = REGISTRY.register(Gauge(
+    "faiss_index_generation", "Generation of the index on disk (from the manifest)", local=True))
+index_loaded_vectors = REGISTRY.register(Gauge(
+    "faiss_index_loaded_vectors", "Vectors in the index each worker has loaded", ["pid"]))
+index_loaded_generation = REGISTRY.register(Gauge(
+    "faiss_index_loaded_generation", "Generation of the index each worker has loaded", ["pid"]))
+
+def _set_loaded_gauges(retriever):
+    # Only this process's own pid: worker snapshots are summed by /metrics
+    for gauge in (index_loaded_vectors, index_loaded_generation):
+        gauge.clear()
+    pid = str(os.getpid())
+    index_loaded_vectors.set(retriever.index.ntotal, pid=pid)
+    index_loaded_generation.set(retriever.generation, pid=pid)
+
+def _relabel_after_fork():
+    # A worker forked after preload_for_fork() inherits the master's retriever
+    # and the gauges labelled with the master's pid; report them as its own
+    if _shared_retriever is not None:
+        _set_loaded_gauges(_shared_retriever)
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_relabel_after_fork)
+
+@REGISTRY.add_collector
+def _collect_index_metrics():
+    if not os.path.exists(INDEX_PATH):
+        return
+    index_file_bytes.set(os.path.getsize(INDEX_PATH))
+    manifest = read_manifest(INDEX_PATH) or {}
+    index_vectors.set(int(manifest.get("count", 0)))
+    index_generation.set(int(manifest.get("generation", 0)))
+
+
+def run_retriever(query, top_k, save=False):
     """
     Run retriever with query parameter.
     
     Args:
         query: Query string to search for
         top_k: Number of results to return
+        save: Also write the results to passages.json (for build_chroma_db);
+            the server passes them to query_rag() in memory instead
     
     Returns:
-        Tuple of (query, results)
+        List of retrieved passages
     """
     print("\n" + "="*80)
     print("DEBATE RETRIEVER")
     print("="*80)
     
-    # Initialize retriever
-    retriever = DebateRetriever()
+    # Shared retriever (index and metadata stay loaded between requests)
+    retriever = get_shared_retriever()
     
     # Retrieve results from ALL debates
     print(f"\n🔎 Searching across all debates for: '{query}'")
     results = retriever.retrieve(query, top_k=top_k)
         
-    # Save results to passages.json
-    retriever.save_results(results)
\ No newline at end of file
+    if save:
+        retriever.save_results(results)
+    return results
@@ -0,0 +1,4 @@
+from .lazy import LazyResource, IdleResource
+from .cache import CoalescingCache, cache_key
+from .disk_cache import DiskCache
+from .locks import InterProcessLock
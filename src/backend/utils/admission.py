@@ -0,0 +1,131 @@
+"""
+Admission control for expensive endpoints.
+
+Each limited endpoint runs at most `max_concurrent` requests at a time per
+worker process. Up to `max_queue` more wait in line (first come, first
+served) for at most `queue_timeout` seconds. Anything beyond that is
+turned away at once with a 429, and a request that waits too long gets a
+503, both with a `Retry-After` hint. The alternative is piling every
+request onto the upstream APIs until they all slow down together.
+"""
+import functools
+import math
+import threading
+import time
+from collections import deque
+
+from backend.utils.metrics import REGISTRY, Counter, Gauge, Histogram
+
+admission_in_flight = REGISTRY.register(Gauge(
+    "admission_in_flight", "Admitted requests running now", ["endpoint"]))
+admission_queue_depth = REGISTRY.register(Gauge(
+    "admission_queue_depth", "Requests waiting for a slot", ["endpoint"]))
+admission_rejected = REGISTRY.register(Counter(
+    "admission_rejected_total", "Requests turned away by admission control", ["endpoint", "reason"]))
+admission_wait = REGISTRY.register(Histogram(
+    "admission_wait_seconds", "Time admitted requests spent waiting for a slot", ["endpoint"],
+    (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)))
+
+
+class Overloaded(Exception):
+    """Raised when a request is not admitted."""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(f"{reason}, retry after {retry_after}s")
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionLimiter:
+    """Concurrency limit with a bounded FIFO wait queue."""
+
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout=10.0):
+        """
+        Args:
+            name: Endpoint label for metrics
+            max_concurrent: Requests allowed to run at once
+            max_queue: Requests allowed to wait for a slot (0 = reject when busy)
+            queue_timeout: Seconds a request may wait before getting a 503
+        """
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        # Moving average of how long an admitted request runs, for Retry-After
+        self._avg_seconds = 1.0
+
+    def retry_after(self):
+        """Seconds until the current queue would likely have drained."""
+        queued = len(self._waiters)
+        return max(1, math.ceil(self._avg_seconds * (queued + 1) / self.max_concurrent))
+
+    def _reject(self, status, reason):
+        admission_rejected.inc(endpoint=self.name, reason=reason)
+        return Overloaded(status, reason, self.retry_after())
+
+    def acquire(self):
+        """Take a slot, waiting in line if needed. Raises Overloaded if not admitted."""
+        start = time.perf_counter()
+        with self._lock:
+            if self.running < self.max_concurrent and not self._waiters:
+                self.running += 1
+                admission_in_flight.set(self.running, endpoint=self.name)
+                admission_wait.observe(0.0, endpoint=self.name)
+                return
+            if len(self._waiters) >= self.max_queue:
+                raise self._reject(429, "queue_full")
+            waiter = threading.Event()
+            self._waiters.append(waiter)
+            admission_queue_depth.set(len(self._waiters), endpoint=self.name)
+
+        admitted = waiter.wait(self.queue_timeout)
+        with self._lock:
+            # release() may have handed us the slot just as the wait timed out
+            if not admitted and not waiter.is_set():
+                self._waiters.remove(waiter)
+                admission_queue_depth.set(len(self._waiters), endpoint=self.name)
+                raise self._reject(503, "queue_timeout")
+        admission_wait.observe(time.perf_counter() - start, endpoint=self.name)
+
+    def release(self, seconds=None):
+        """Free a slot; the oldest waiter (if any) takes it over."""
+        with self._lock:
+            if seconds is not None:
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * seconds
+            if self._waiters:
+                # Hand the slot straight to the next in line; `running` stays the same
+                self._waiters.popleft().set()
+                admission_queue_depth.set(len(self._waiters), endpoint=self.name)
+            else:
+                self.running -= 1
+                admission_in_flight.set(self.running, endpoint=self.name)
+
+    def limit(self, view):
+        """Decorator for a Flask view: run it only when admitted, else 429/503 + Retry-After."""
+        from flask import jsonify, request
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method == "OPTIONS":
+                return view(*args, **kwargs)
+            try:
+                self.acquire()
+            except Overloaded as e:
+                response = jsonify({
+                    "error": "Server is busy, please retry shortly",
+                    "reason": e.reason,
+                    "retry_after": e.retry_after,
+                })
+                response.status_code = e.status
+                response.headers["Retry-After"] = str(e.retry_after)
+                return response
+            start = time.perf_counter()
+            try:
+                return view(*args, **kwargs)
+            finally:
+                self.release(time.perf_counter() - start)
+        return wrapper
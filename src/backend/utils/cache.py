@@ -0,0 +1,102 @@
+"""
+In-memory result cache with in-flight request coalescing.
+
+Used for expensive, deterministic calls (LLM summaries): a finished result is
+served from memory, and concurrent callers asking for the same key while it
+is still being computed wait for the first caller instead of repeating the
+call.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+from backend.utils.metrics import cache_requests
+
+
+def cache_key(*parts):
+    """sha256 hex digest of the JSON-encoded parts."""
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class CoalescingCache:
+    """Thread-safe LRU cache where concurrent misses for one key compute it once."""
+
+    def __init__(self, max_entries=1024, name=None):
+        """
+        Args:
+            max_entries: Results kept before the least recently used is dropped
+            name: Label used in log messages
+        """
+        self.max_entries = max_entries
+        self.name = name or "cache"
+        self._entries = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, or compute() it once.
+
+        Errors are not cached: they propagate to the caller that computed and
+        to everyone waiting on it, and the next call tries again.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                cache_requests.inc(cache=self.name, result="hit")
+                return self._entries[key]
+            flight = self._in_flight.get(key)
+            owner = flight is None
+            if owner:
+                flight = self._in_flight[key] = _InFlight()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+        cache_requests.inc(cache=self.name, result="miss" if owner else "coalesced")
+
+        if not owner:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = compute()
+        except Exception as e:
+            flight.error = e
+            raise
+        else:
+            with self._lock:
+                self._entries[key] = flight.value
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+            flight.done.set()
+        return flight.value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+            }
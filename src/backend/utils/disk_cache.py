@@ -0,0 +1,140 @@
+"""
+Persistent key-value cache in a single SQLite file.
+
+For results that are worth keeping across runs and processes (topic labels
+from the LLM and the zero-shot model). Reads and writes go in bulk, one
+statement per few hundred keys. Server workers and bulk preprocessing
+threads share the file through SQLite's WAL journal. When the stored
+values outgrow `max_bytes`, the least recently read entries are dropped.
+Values are stored as JSON.
+
+Cache errors never fail the caller: a broken or locked file reads as
+all misses and skips writes.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from backend.utils.metrics import cache_requests
+
+# Keys per SQL statement (well under SQLite's host parameter limit)
+_CHUNK = 500
+
+
+class DiskCache:
+    """Size-bounded LRU cache in one SQLite file, shared across threads and processes."""
+
+    def __init__(self, path, max_bytes=64 * 1024 * 1024, name=None):
+        """
+        Args:
+            path: SQLite file; its directory is created on first use
+            max_bytes: Stored keys and values kept before the least recently used are dropped
+            name: Label for log messages and cache_requests metrics
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.name = name or self.path.stem
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread, and a new one in a forked child
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("""CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, value TEXT NOT NULL,
+                size INTEGER NOT NULL, accessed_at REAL NOT NULL)""")
+            # Eviction walks entries oldest first; size makes the index covering
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at, size)")
+            local.conn, local.pid = conn, os.getpid()
+        return local.conn
+
+    def get_many(self, keys):
+        """
+        Look up many keys at once.
+
+        Returns:
+            Dict of key -> value for the keys that were found
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        try:
+            conn = self._connection()
+            now = time.time()
+            for i in range(0, len(keys), _CHUNK):
+                chunk = keys[i:i + _CHUNK]
+                marks = ",".join("?" * len(chunk))
+                rows = conn.execute(f"SELECT key, value FROM entries WHERE key IN ({marks})", chunk).fetchall()
+                found.update((key, json.loads(value)) for key, value in rows)
+                if rows:
+                    hit_keys = [key for key, _ in rows]
+                    conn.execute(f"UPDATE entries SET accessed_at = ? WHERE key IN ({','.join('?' * len(hit_keys))})",
+                                 [now, *hit_keys])
+        except (sqlite3.Error, ValueError) as e:
+            print(f"{self.name} cache read failed: {e}")
+        if found:
+            cache_requests.inc(len(found), cache=self.name, result="hit")
+        if len(keys) > len(found):
+            cache_requests.inc(len(keys) - len(found), cache=self.name, result="miss")
+        return found
+
+    def set_many(self, items):
+        """
+        Store many values at once (one transaction), then evict if over max_bytes.
+
+        Args:
+            items: Dict of key -> JSON-serializable value
+        """
+        if not items:
+            return
+        now = time.time()
+        rows = []
+        for key, value in items.items():
+            encoded = json.dumps(value, ensure_ascii=False)
+            rows.append((key, encoded, len(key) + len(encoded.encode("utf-8")), now))
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany("INSERT OR REPLACE INTO entries (key, value, size, accessed_at) VALUES (?, ?, ?, ?)", rows)
+            self.evict()
+        except sqlite3.Error as e:
+            print(f"{self.name} cache write failed: {e}")
+
+    def evict(self):
+        """
+        Drop least recently used entries until the cache is at 90% of max_bytes.
+
+        Evicting below the limit leaves room, so the next few writes don't evict again.
+
+        Returns:
+            Number of entries dropped
+        """
+        conn = self._connection()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        excess = total - int(self.max_bytes * 0.9)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            # Oldest entries whose cumulative size is still needed to cover the excess
+            dropped = conn.execute("""DELETE FROM entries WHERE key IN (
+                SELECT key FROM (SELECT key, size, SUM(size) OVER (ORDER BY accessed_at, key) AS running FROM entries)
+                WHERE running - size < ?)""", (excess,)).rowcount
+        print(f"{self.name} cache over {self.max_bytes / 1e6:.1f} MB: dropped {dropped} least recently used entries")
+        return dropped
+
+    def stats(self):
+        """Dict with entries, bytes (stored keys and values) and max_bytes."""
+        entries, size = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes}
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM entries")
@@ -0,0 +1,125 @@
+"""
+Lazy, thread-safe holders for expensive backend resources.
+
+Clients, database connections and models are created on first use instead of
+at import time, so importing the backend (and starting the server) stays cheap.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class LazyResource:
+    """Create a resource on first access and share it across threads."""
+
+    def __init__(self, factory, name=None):
+        """
+        Args:
+            factory: Zero-argument callable that builds the resource
+            name: Optional label used in log messages
+        """
+        self._factory = factory
+        self._name = name or getattr(factory, "__name__", "resource")
+        self._value = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        # Double-checked locking: the fast path never takes the lock
+        value = self._value
+        if value is None:
+            with self._lock:
+                value = self._value
+                if value is None:
+                    value = self._factory()
+                    self._value = value
+        return value
+
+    @property
+    def loaded(self):
+        return self._value is not None
+
+    def reset(self, close=None):
+        """
+        Drop the cached resource so the next get() rebuilds it.
+
+        Args:
+            close: Optional callable invoked with the old value (e.g. to close a client)
+        """
+        with self._lock:
+            value, self._value = self._value, None
+        if value is not None and close is not None:
+            close(value)
+        return value
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<{type(self).__name__} {self._name} ({state})>"
+
+
+class IdleResource(LazyResource):
+    """
+    LazyResource that is dropped again after `idle_seconds` without use.
+
+    For large models on rarely taken paths: the first use loads the model,
+    and once nobody has used it for a while it is released so the process
+    gives the memory back. Use it through `with resource.use() as value:`
+    so it is never released while a caller holds it.
+    """
+
+    def __init__(self, factory, name=None, idle_seconds=0, on_release=None):
+        """
+        Args:
+            factory: Zero-argument callable that builds the resource
+            name: Optional label used in log messages
+            idle_seconds: Release after this long unused (0 = never)
+            on_release: Optional zero-argument callable run after the value has
+                been dropped (e.g. gc.collect() to actually free a model)
+        """
+        super().__init__(factory, name)
+        self.idle_seconds = idle_seconds
+        self._on_release = on_release
+        self._users = 0
+        self._last_used = 0.0
+        self._timer = None
+        self._idle_lock = threading.Lock()
+
+    @contextmanager
+    def use(self):
+        with self._idle_lock:
+            self._users += 1
+        try:
+            yield self.get()
+        finally:
+            with self._idle_lock:
+                self._users -= 1
+                self._last_used = time.monotonic()
+                self._schedule(self.idle_seconds)
+
+    def _schedule(self, delay):
+        # Called with _idle_lock held; one pending timer at a time
+        if self.idle_seconds <= 0 or self._timer is not None:
+            return
+        self._timer = threading.Timer(delay, self._release_if_idle)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _release_if_idle(self):
+        with self._idle_lock:
+            self._timer = None
+            if not self.loaded:
+                return
+            idle = time.monotonic() - self._last_used
+            if self._users:
+                # Whoever holds it reschedules when they let go
+                return
+            if idle < self.idle_seconds:
+                # Used since the timer was set: check again when it could be idle
+                self._schedule(self.idle_seconds - idle)
+                return
+            # Drop our reference without keeping one around, so on_release
+            # runs once nothing refers to the value any more
+            with self._lock:
+                self._value = None
+        if self._on_release is not None:
+            self._on_release()
+        print(f"Released {self._name} after {self.idle_seconds:g}s idle")
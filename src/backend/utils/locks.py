@@ -0,0 +1,45 @@
+"""
+Lock shared by threads and processes.
+
+Pre-fork server workers are separate processes, so a threading.Lock alone
+doesn't stop two workers rewriting the same files. InterProcessLock adds an
+flock() on a lock file next to the protected data.
+"""
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: threads-only locking
+    fcntl = None
+
+
+class InterProcessLock:
+    """Exclusive lock across threads of this process and across processes on this host."""
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Lock file to create (e.g. "debates.index.lock")
+        """
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "a")
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+        return False
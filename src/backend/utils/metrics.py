@@ -0,0 +1,436 @@
+"""
+Prometheus metrics without extra dependencies.
+
+Counters, gauges and histograms live in one process-wide registry and are
+rendered in the Prometheus text format by `render_metrics()`. Under the
+pre-fork server every worker has its own registry, so when METRICS_DIR is
+set each process also writes a snapshot there, and a scrape of any worker
+merges all of them: counters and histograms are summed over every process
+that ever ran, gauges over the processes still alive.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+HTTP_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+UPSTREAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), local=False):
+        """
+        Args:
+            local: Value is computed by the scraping process (e.g. from files on
+                disk) instead of being summed over live worker processes
+        """
+        super().__init__(name, documentation, labelnames)
+        self.local = local
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=HTTP_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [count per bucket (non-cumulative) ..., overflow, sum]
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+                    break
+            else:
+                entry[len(self.buckets)] += 1
+            entry[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.collectors = []
+        self._flusher = None
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, fn):
+        """fn() runs before every render; use it to set local gauges."""
+        self.collectors.append(fn)
+        return fn
+
+    # Multi-process --------------------------------------------------------
+
+    def _snapshot_path(self, pid):
+        return os.path.join(METRICS_DIR, f"metrics_{pid}.json")
+
+    def write_snapshot(self):
+        if not METRICS_DIR:
+            return
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        data = {name: metric.snapshot() for name, metric in self.metrics.items()
+                if not getattr(metric, "local", False)}
+        path = self._snapshot_path(os.getpid())
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def start_flusher(self):
+        """Write this process's snapshot every METRICS_FLUSH_SECONDS (idempotent, per process)."""
+        if not METRICS_DIR:
+            return
+        with self._lock:
+            if self._flusher is not None and self._flusher[0] == os.getpid():
+                return
+
+            def flush_forever():
+                while True:
+                    time.sleep(METRICS_FLUSH_SECONDS)
+                    try:
+                        self.write_snapshot()
+                    except OSError as e:
+                        print(f"Metrics snapshot failed: {e}")
+
+            thread = threading.Thread(target=flush_forever, name="metrics-flush", daemon=True)
+            thread.start()
+            self._flusher = (os.getpid(), thread)
+
+    def _merged_values(self):
+        """name -> {label key: value} over all process snapshots (or just this process)."""
+        merged = {name: {} for name in self.metrics}
+        if not METRICS_DIR:
+            for name, metric in self.metrics.items():
+                merged[name] = {tuple(k): v for k, v in metric.snapshot()}
+            return merged
+
+        self.write_snapshot()
+        for filename in os.listdir(METRICS_DIR):
+            if not (filename.startswith("metrics_") and filename.endswith(".json")):
+                continue
+            try:
+                pid = int(filename[len("metrics_"):-len(".json")])
+                with open(os.path.join(METRICS_DIR, filename), "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (ValueError, OSError):
+                continue
+            alive = _pid_alive(pid)
+            for name, samples in data.items():
+                metric = self.metrics.get(name)
+                if metric is None or (metric.type == "gauge" and not alive):
+                    continue
+                values = merged[name]
+                for key, value in samples:
+                    key = tuple(key)
+                    if metric.type == "histogram":
+                        old = values.get(key)
+                        values[key] = value if old is None else [a + b for a, b in zip(old, value)]
+                    else:
+                        values[key] = values.get(key, 0) + value
+        for name, metric in self.metrics.items():
+            if getattr(metric, "local", False):
+                merged[name] = {tuple(k): v for k, v in metric.snapshot()}
+        return merged
+
+    def render(self):
+        for collector in self.collectors:
+            try:
+                collector()
+            except Exception as e:
+                print(f"Metrics collector {getattr(collector, '__name__', collector)} failed: {e}")
+        merged = self._merged_values()
+        lines = []
+        for name, metric in self.metrics.items():
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.type}")
+            for key, value in sorted(merged[name].items()):
+                if metric.type == "histogram":
+                    cumulative = 0
+                    for bound, count in zip(metric.buckets, value):
+                        cumulative += count
+                        labels = _format_labels(metric.labelnames, key, [("le", _format_value(float(bound)))])
+                        lines.append(f"{name}_bucket{labels} {cumulative}")
+                    cumulative += value[len(metric.buckets)]
+                    lines.append(f"{name}_bucket{_format_labels(metric.labelnames, key, [('le', '+Inf')])} {cumulative}")
+                    lines.append(f"{name}_sum{_format_labels(metric.labelnames, key)} {_format_value(value[-1])}")
+                    lines.append(f"{name}_count{_format_labels(metric.labelnames, key)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_format_labels(metric.labelnames, key)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+REGISTRY = Registry()
+
+
+def render_metrics():
+    return REGISTRY.render()
+
+
+# ============================================================================
+# METRICS
+# ============================================================================
+
+http_request_duration = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by endpoint",
+    ["endpoint", "method", "status"], HTTP_BUCKETS))
+http_requests_in_flight = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "Requests currently being handled", ["endpoint"]))
+
+upstream_calls = REGISTRY.register(Counter(
+    "upstream_calls_total", "Calls to external services", ["upstream"]))
+upstream_errors = REGISTRY.register(Counter(
+    "upstream_errors_total", "Failed calls to external services", ["upstream"]))
+upstream_duration = REGISTRY.register(Histogram(
+    "upstream_call_duration_seconds", "Latency of calls to external services", ["upstream"], UPSTREAM_BUCKETS))
+
+llm_tokens = REGISTRY.register(Counter(
+    "llm_tokens_total", "Tokens reported in API usage, by model and calling endpoint", ["model", "endpoint", "kind"]))
+
+cache_requests = REGISTRY.register(Counter(
+    "cache_requests_total", "Cache lookups by result (hit, miss, coalesced)", ["cache", "result"]))
+cache_hit_ratio = REGISTRY.register(Gauge(
+    "cache_hit_ratio", "Share of lookups served without recomputing (hit or coalesced)", ["cache"], local=True))
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+class _UpstreamCall:
+    def __init__(self):
+        self.failed = False
+
+    def fail(self):
+        self.failed = True
+
+    def check_status(self, status_code):
+        """Count HTTP error statuses as failures."""
+        if status_code >= 400:
+            self.failed = True
+
+
+@contextmanager
+def upstream_call(upstream):
+    """
+    Count and time one call to an external service. Exceptions count as
+    errors; so does call.fail() / call.check_status(>= 400).
+    """
+    call = _UpstreamCall()
+    start = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call.failed = True
+        raise
+    finally:
+        upstream_calls.inc(upstream=upstream)
+        upstream_duration.observe(time.perf_counter() - start, upstream=upstream)
+        if call.failed:
+            upstream_errors.inc(upstream=upstream)
+
+
+def _usage_value(usage, *names):
+    for name in names:
+        value = usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+        if value:
+            return int(value)
+    return 0
+
+
+def record_usage(model, usage, endpoint=None):
+    """
+    Add token counts from an API `usage` block (OpenAI object or dict, or
+    LangChain usage_metadata) to llm_tokens_total.
+
+    Args:
+        model: Model name
+        usage: Object/dict with prompt_tokens/completion_tokens (or input_tokens/output_tokens)
+        endpoint: Label for the caller; defaults to the current request or job
+    """
+    if not usage:
+        return
+    if endpoint is None:
+        from backend.utils.tracing import current_trace
+        trace = current_trace()
+        endpoint = trace.name if trace is not None else "none"
+    prompt = _usage_value(usage, "prompt_tokens", "input_tokens")
+    completion = _usage_value(usage, "completion_tokens", "output_tokens")
+    if prompt:
+        llm_tokens.inc(prompt, model=model, endpoint=endpoint, kind="prompt")
+    if completion:
+        llm_tokens.inc(completion, model=model, endpoint=endpoint, kind="completion")
+
+
+@REGISTRY.add_collector
+def _collect_cache_ratios():
+    caches = {}
+    for (cache, result), value in _merged_counter(cache_requests).items():
+        caches.setdefault(cache, {})[result] = value
+    for cache, results in caches.items():
+        total = sum(results.values())
+        served = results.get("hit", 0) + results.get("coalesced", 0)
+        cache_hit_ratio.set(round(served / total, 4) if total else 0, cache=cache)
+
+
+def _merged_counter(counter):
+    if not METRICS_DIR:
+        return {tuple(k): v for k, v in counter.snapshot()}
+    return REGISTRY._merged_values()[counter.name]
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo listener: every MongoDB command counts as one `mongodb` upstream call."""
+
+    def __init__(self):
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        with self._lock:
+            self._started[event.request_id] = time.perf_counter()
+
+    def _finish(self, event, failed):
+        with self._lock:
+            start = self._started.pop(event.request_id, None)
+        upstream_calls.inc(upstream="mongodb")
+        if start is not None:
+            upstream_duration.observe(time.perf_counter() - start, upstream="mongodb")
+        if failed:
+            upstream_errors.inc(upstream="mongodb")
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+
+# Pass to MongoClient(event_listeners=[MONGO_LISTENER])
+MONGO_LISTENER = MongoCommandMetrics()
+
+
+def init_metrics(app):
+    """Per-endpoint latency histogram and in-flight gauge for a Flask app."""
+    from flask import g, request
+
+    @app.before_request
+    def _begin_request_metrics():
+        REGISTRY.start_flusher()
+        g._metrics_endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+        g._metrics_start = time.perf_counter()
+        http_requests_in_flight.inc(endpoint=g._metrics_endpoint)
+
+    @app.after_request
+    def _record_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_request_metrics(exc):
+        endpoint = g.pop("_metrics_endpoint", None)
+        if endpoint is None:
+            return
+        http_requests_in_flight.dec(endpoint=endpoint)
+        status = g.pop("_metrics_status", 500)
+        http_request_duration.observe(time.perf_counter() - g.pop("_metrics_start"),
+                                      endpoint=endpoint, method=request.method, status=status)
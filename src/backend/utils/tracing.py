@@ -0,0 +1,237 @@
+"""
+Per-request stage timing and on-demand profiling.
+
+Code marks its expensive stages with `span("faiss_search")`. While a request
+(or background job) is being traced, each span's wall time is added to that
+trace; outside a trace a span only costs a context-variable lookup. At the
+end of the request the trace becomes a `Server-Timing` header and one JSON
+log line.
+
+A request sent with `X-Debug-Profile: <DEBUG_PROFILE_TOKEN>` is also sampled
+by a stack profiler, and the folded stacks (flamegraph.pl / speedscope
+format) are saved under PROFILE_DIR.
+"""
+import contextvars
+import functools
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+TRACE_LOG = os.getenv("TRACE_LOG", "1") == "1"
+DEBUG_PROFILE_TOKEN = os.getenv("DEBUG_PROFILE_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+
+PROFILE_HEADER = "X-Debug-Profile"
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """Wall time per stage for one request or job."""
+
+    def __init__(self, name, trace_id=None):
+        self.name = name
+        self.id = trace_id or uuid.uuid4().hex[:16]
+        self.start = time.perf_counter()
+        self.seconds = None
+        self.stages = {}  # name -> [total_seconds, count]
+        self.fields = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            entry = self.stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.start
+        return self
+
+    def server_timing(self):
+        """Value for the Server-Timing response header."""
+        with self._lock:
+            stages = list(self.stages.items())
+        parts = []
+        for stage, (seconds, count) in stages:
+            part = f"{stage};dur={seconds * 1000:.1f}"
+            if count > 1:
+                part += f';desc="x{count}"'
+            parts.append(part)
+        if self.seconds is not None:
+            parts.append(f"total;dur={self.seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self):
+        with self._lock:
+            stages = {stage: {"ms": round(seconds * 1000, 1), "count": count}
+                      for stage, (seconds, count) in self.stages.items()}
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "ms": round(self.seconds * 1000, 1) if self.seconds is not None else None,
+            "stages": stages,
+            **self.fields,
+        }
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(stage):
+    """Time a block as `stage` in the current trace (no-op when not tracing)."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(stage, time.perf_counter() - start)
+
+
+def traced(stage):
+    """Decorator form of span()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_trace(name, trace_id=None):
+    """Begin tracing in this context. Returns (trace, token for end_trace)."""
+    trace = Trace(name, trace_id)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token, log=True):
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    if trace is None:
+        return None
+    trace.finish()
+    if log and TRACE_LOG:
+        print(json.dumps({"event": "trace", "time": datetime.now().isoformat(timespec="milliseconds"),
+                          **trace.to_dict()}, default=str), flush=True)
+    return trace
+
+
+def run_in_context(fn):
+    """Wrap fn so it runs in the caller's context (and trace) on a pool thread."""
+    context = contextvars.copy_context()
+    def wrapper(*args, **kwargs):
+        return context.run(fn, *args, **kwargs)
+    return wrapper
+
+
+class SamplingProfiler:
+    """Samples one thread's stack every `interval` seconds from a helper thread."""
+
+    def __init__(self, thread_id=None, interval=PROFILE_INTERVAL_MS / 1000):
+        self.thread_id = thread_id or threading.get_ident()
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stack(self, frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.samples[self._stack(frame)] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self
+
+    def save(self, path):
+        """Write folded stacks ("frame;frame;frame count" per line)."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def init_tracing(app):
+    """
+    Trace every request of a Flask app: Server-Timing header, one JSON log
+    line per request, and the X-Debug-Profile sampling profiler.
+    """
+    from flask import g, request
+
+    @app.before_request
+    def _begin_request_trace():
+        # Reuse the caller's request id (it also names profile files, so keep it tame)
+        trace_id = request.headers.get("X-Request-ID", "")
+        trace_id = trace_id if REQUEST_ID_PATTERN.match(trace_id) else None
+        # Name by route pattern, not path, so per-endpoint aggregation stays bounded
+        route = request.url_rule.rule if request.url_rule else request.path
+        g._trace, g._trace_token = start_trace(f"{request.method} {route}", trace_id)
+        g._profiler = None
+        if DEBUG_PROFILE_TOKEN and request.headers.get(PROFILE_HEADER) == DEBUG_PROFILE_TOKEN:
+            g._profiler = SamplingProfiler().start()
+
+    @app.after_request
+    def _finish_request_trace(response):
+        trace = g.pop("_trace", None)
+        token = g.pop("_trace_token", None)
+        if trace is None:
+            return response
+        profiler = g.pop("_profiler", None)
+        if profiler is not None:
+            profiler.stop()
+            stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = profiler.save(os.path.join(PROFILE_DIR, f"{stamp}_{trace.id}.folded"))
+            trace.fields["profile"] = path
+            response.headers["X-Profile-Path"] = path
+        trace.fields["status"] = response.status_code
+        end_trace(token)
+        response.headers["Server-Timing"] = trace.server_timing()
+        response.headers["X-Request-ID"] = trace.id
+        return response
+
+    @app.teardown_request
+    def _drop_unfinished_trace(exc):
+        # after_request is skipped on unhandled errors; don't leak the context
+        token = g.pop("_trace_token", None)
+        if token is not None:
+            profiler = g.pop("_profiler", None)
+            if profiler is not None:
+                profiler.stop()
+            trace = _current_trace.get()
+            if trace is not None:
+                trace.fields["error"] = str(exc) if exc else "unfinished"
+            end_trace(token)
@@ -164,39 +164,54 @@ function Analyzer({ onBackToHome }) {
 
         console.log("Uploading debate to backend...");
         
-        // Clear any existing timeouts
+        // Clear any existing polling timeouts
         progressTimeoutsRef.current.forEach(clearTimeout);
         progressTimeoutsRef.current = [];
         
-        // Store timeout IDs so we can clear them later
-        const timeout1 = setTimeout(() => {
-          setCurrentStep("database");
-          const timeout2 = setTimeout(() => {
-            setCurrentStep("faiss");
-          }, 25000);
-          progressTimeoutsRef.current.push(timeout2);
-        }, 10000);
-        progressTimeoutsRef.current.push(timeout1);
-        
+        // The backend queues the pipeline and returns a job id straight away
         const response = await axios.post(
           "http://localhost:3000/api/upload-debate",
           formData,
           {
             headers: { "Content-Type": "multipart/form-data" },
-            timeout: 120000,
+            timeout: 30000,
           }
         );
 
         console.log("Upload response:", response.data);
+        const jobId = response.data.job_id;
+
+        // Poll the job until every stage has finished
+        const pollJob = async () => {
+          try {
+            const { data: job } = await axios.get(`http://localhost:3000/api/jobs/${jobId}`);
+
+            if (job.status === "succeeded") {
+              progressTimeoutsRef.current = [];
+              setCurrentStep("completed");
+              setSuccessMessage(job.result?.message || "Debate processed successfully!");
+              return;
+            }
+
+            if (job.status === "failed") {
+              progressTimeoutsRef.current = [];
+              const failedStage = job.stages.find((stage) => stage.status === "failed");
+              alert(`Pipeline processing failed${failedStage ? ` during ${failedStage.name}` : ""}: ${job.error}`);
+              setIsProcessingUpload(false);
+              setCurrentStep("");
+              return;
+            }
+
+            if (job.current_stage) {
+              setCurrentStep(job.current_stage);
+            }
+          } catch (pollErr) {
+            console.error("Job status error:", pollErr);
+          }
+          progressTimeoutsRef.current = [setTimeout(pollJob, 2000)];
+        };
 
-        // Clear all progress timeouts since we got the real response
-        progressTimeoutsRef.current.forEach(clearTimeout);
-        progressTimeoutsRef.current = [];
-        
-        setTimeout(() => {
-          setCurrentStep("completed");
-          setSuccessMessage(response.data.message);
-        }, 1000);
+        pollJob();
 
       } catch (err) {
         console.error("Upload error:", err);
@@ -0,0 +1,72 @@
+"""
+Pre-fork production server for main.py.
+
+Run from the `src` directory:
+
+    gunicorn -c gunicorn.conf.py main:app
+
+The app (FAISS index, metadata, fact-check models) is loaded once in the
+master process and then forked, so workers share those pages copy-on-write.
+
+Graceful reload: `kill -HUP <master pid>` re-reads this config, refreshes
+the preloaded index if it changed on disk, and replaces workers one
+generation at a time while old workers finish their requests. New *code*
+needs a new master: `kill -USR2 <master pid>`, then `kill -QUIT <old pid>`.
+"""
+import multiprocessing
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Tokenizers warn (and can deadlock) if their thread pool is used before fork
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+# Each worker writes its metrics here so /metrics on any worker reports the whole server
+METRICS_DIR = os.environ.setdefault("METRICS_DIR", os.path.abspath(".metrics"))
+
+bind = os.getenv("WEB_BIND", f"0.0.0.0:{os.getenv('PORT', '3000')}")
+workers = int(os.getenv("WEB_WORKERS", str(multiprocessing.cpu_count())))
+threads = int(os.getenv("WEB_THREADS", "4"))
+worker_class = "gthread"
+
+# Import main.py in the master before forking
+preload_app = True
+
+# Fact checks and Q&A wait on upstream APIs for tens of seconds
+timeout = int(os.getenv("WEB_TIMEOUT", "120"))
+# On HUP/TERM, workers get this long to finish in-flight requests and ingestion jobs
+graceful_timeout = int(os.getenv("WEB_GRACEFUL_TIMEOUT", "120"))
+keepalive = int(os.getenv("WEB_KEEPALIVE", "5"))
+
+# Recycle workers now and then so slow leaks don't accumulate (0 = never)
+max_requests = int(os.getenv("WEB_MAX_REQUESTS", "0"))
+max_requests_jitter = max(1, max_requests // 10) if max_requests else 0
+
+accesslog = os.getenv("WEB_ACCESS_LOG", "-")
+
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "1") == "1"
+
+
+def on_starting(server):
+    # Counters restart with the server: drop snapshots left by a previous run
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    for filename in os.listdir(METRICS_DIR):
+        if filename.startswith("metrics_"):
+            os.remove(os.path.join(METRICS_DIR, filename))
+
+
+def when_ready(server):
+    # Runs in the master after main.py is imported and before workers fork
+    if PRELOAD_MODELS:
+        import main
+        main.preload_for_fork()
+    server.log.info(f"Forking {workers} workers x {threads} threads")
+
+
+def on_reload(server):
+    # HUP: refresh shared state in the master so the new workers inherit it
+    if PRELOAD_MODELS:
+        import main
+        main.preload_for_fork()
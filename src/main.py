@@ -1,30 +1,188 @@
 from backend.preprocessing.preprocess_script import preprocess
-from backend.database.connection import DebateDatabase
 from backend.database.insert import DataInserter
-from backend.embeddings_faiss.build_index import build_index
-from backend.retriever.retriever import run_retriever
-from backend.qa_pipeline.QA_pipeline import query_rag, build_chroma_db
-from backend.fact_checker_prototype.AI_FactChecker import EnhancedFactChecker
+from backend.database.client import get_database
+from backend.database.timeline import get_timeline, TIMELINE_PAGE_SIZE
+from backend.database.stats import get_debate_stats, collection_counts
+from backend.retriever.retriever import run_retriever, get_shared_retriever, INDEX_PATH
+from backend.qa_pipeline.QA_pipeline import query_rag
+from backend.fact_checker_prototype.AI_FactChecker import get_fact_checker, fact_checker_loaded, warmup_fact_checker
 from backend.core_llm.gpt5_nano import LLMClient
-from flask import Flask, jsonify, request # type: ignore
+from backend.utils import CoalescingCache, cache_key
+from backend.jobs import JobManager, JobQueueFull
+from backend.ingestion import ingest_transcripts, update_faiss_index, INGEST_STAGES
+from backend.utils.tracing import init_tracing, span, run_in_context
+from backend.utils.metrics import init_metrics, render_metrics
+from backend.providers import get_provider
+from backend.utils.admission import AdmissionLimiter, admission_rejected
+from flask import Flask, Response, jsonify, request # type: ignore
 from flask_cors import CORS # type: ignore
 from pathlib import Path
 from datetime import datetime
 import time
+import threading
+import gc
+from concurrent.futures import ThreadPoolExecutor
 
-from openai import OpenAI
 import os
 
 # Flask
 app = Flask(__name__)
 
 BASE_DIR = Path(__file__).resolve().parent
-UPLOAD_FOLDER = BASE_DIR / "user_file_uploads"
+UPLOAD_FOLDER = Path(os.getenv("UPLOAD_FOLDER", str(BASE_DIR / "user_file_uploads")))
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 
 # Flask with CORS for React
-cors = CORS(app, origins="*")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+cors = CORS(app, origins="*", expose_headers=["Server-Timing", "X-Request-ID", "X-Profile-Path", "Retry-After"])
+
+# Stage timing: Server-Timing header + one JSON log line per request
+init_tracing(app)
+
+# Prometheus metrics: per-endpoint latency histograms, upstream calls, tokens
+init_metrics(app)
+
+# Background workers for ingestion jobs. Job status is also written to
+# JOBS_DIR so any server worker process can answer /api/jobs/<id>
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+JOBS_DIR = os.getenv("JOBS_DIR", str(BASE_DIR / ".jobs"))
+INGEST_MAX_PENDING = int(os.getenv("INGEST_MAX_PENDING", "16"))
+# Job status files are deleted this long after their last update (default 7 days)
+JOBS_MAX_AGE_SECONDS = int(os.getenv("JOBS_MAX_AGE_SECONDS", str(7 * 24 * 3600)))
+job_manager = JobManager(max_workers=INGEST_WORKERS, state_dir=JOBS_DIR, max_pending=INGEST_MAX_PENDING,
+                         state_max_age=JOBS_MAX_AGE_SECONDS or None)
+
+# Admission control (per worker process): at most N requests run at once,
+# M more wait up to ADMISSION_QUEUE_TIMEOUT seconds, the rest get 429 + Retry-After
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "15"))
+fact_check_limiter = AdmissionLimiter(
+    "/api/fact-check",
+    max_concurrent=int(os.getenv("FACT_CHECK_CONCURRENCY", "4")),
+    max_queue=int(os.getenv("FACT_CHECK_QUEUE", "8")),
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT)
+qa_limiter = AdmissionLimiter(
+    "/api/retrieve-response",
+    max_concurrent=int(os.getenv("QA_CONCURRENCY", "8")),
+    max_queue=int(os.getenv("QA_QUEUE", "16")),
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT)
+upload_limiter = AdmissionLimiter(
+    "/api/upload-debate",
+    max_concurrent=int(os.getenv("UPLOAD_CONCURRENCY", "2")),
+    max_queue=int(os.getenv("UPLOAD_QUEUE", "4")),
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT)
+
+# Model warmup: with MODEL_WARMUP=1 the fact checker and zero-shot model are
+# loaded at boot, and /api/ready reports 503 until they are resident
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "0") == "1"
+_warmup_state = {"status": "pending" if MODEL_WARMUP else "disabled", "seconds": None, "error": None}
+
+def warmup_models(run_inference=True):
+    _warmup_state["status"] = "loading"
+    start = time.perf_counter()
+    try:
+        warmup_fact_checker(run_inference=run_inference)
+        _warmup_state["status"] = "ready"
+        print(f"Models warmed up in {time.perf_counter() - start:.1f}s")
+    except Exception as e:
+        _warmup_state["status"] = "failed"
+        _warmup_state["error"] = str(e)
+        print(f"Model warmup failed: {e}")
+    _warmup_state["seconds"] = round(time.perf_counter() - start, 2)
+
+def start_model_warmup(background=True):
+    """
+    Load models if MODEL_WARMUP is set. In the background the server can
+    bind immediately and /api/ready flips once loading finishes.
+    """
+    if not MODEL_WARMUP:
+        return
+    if background:
+        threading.Thread(target=warmup_models, name="model-warmup", daemon=True).start()
+    else:
+        warmup_models()
+
+def preload_for_fork():
+    """
+    Load the FAISS index, its metadata and the fact-check models in the
+    pre-fork server's master process (see gunicorn.conf.py). Workers forked
+    afterwards share these pages copy-on-write instead of each loading a copy.
+    """
+    start = time.perf_counter()
+    if os.path.exists(INDEX_PATH):
+        get_shared_retriever()
+    else:
+        print(f"No FAISS index at {INDEX_PATH} yet - workers will load it on first query")
+    warmup_models(run_inference=False)
+    # Move everything loaded so far out of the GC's view, so collections in
+    # the workers don't write to (and un-share) these objects' pages
+    gc.collect()
+    gc.freeze()
+    print(f"Preloaded shared state in {time.perf_counter() - start:.1f}s")
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Liveness: the process is up and serving requests"""
+    return jsonify({"status": "ok"}), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus scrape endpoint (all worker processes when METRICS_DIR is set)."""
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """
+    Readiness: 200 once warmed-up models are resident (or warmup is disabled),
+    503 while loading or after a failed warmup
+    """
+    is_ready = _warmup_state["status"] in ("ready", "disabled")
+    return jsonify({
+        "ready": is_ready,
+        "warmup": dict(_warmup_state),
+        "models": {"fact_checker": fact_checker_loaded()}
+    }), 200 if is_ready else 503
+
+# Transcript summaries: bounded pool for concurrent LLM calls, and a cache
+# so repeat dashboard loads (and identical in-flight requests) reuse results
+SUMMARY_MODEL = "gpt-4o-mini"
+SUMMARY_WORKERS = int(os.getenv("SUMMARY_WORKERS", "8"))
+SUMMARY_CACHE_SIZE = int(os.getenv("SUMMARY_CACHE_SIZE", "2048"))
+SUMMARY_FALLBACK = "Candidates exchanged views on key policy differences."
+SUMMARY_UNAVAILABLE = "Summary not available for this transcript."
+SUMMARY_SYSTEM_PROMPT = """You are a expert debate analyst. Create TWO concise sentences summarizing the key clash and main topics."""
+
+_summary_pool = ThreadPoolExecutor(max_workers=SUMMARY_WORKERS, thread_name_prefix="summary")
+_summary_cache = CoalescingCache(max_entries=SUMMARY_CACHE_SIZE, name="summaries")
+
+def summarize_transcript(title, excerpt):
+    """
+    Two-sentence summary of a transcript excerpt, cached by
+    hash of (title, excerpt, prompt, model).
+    
+    Raises on API errors so failures are never cached.
+    """
+    user_prompt = f"""
+                            Debate: {title}
+                            Create TWO concise sentences:
+                            - First sentence: main conflict/outcome
+                            - Second sentence: key topics discussed
+                            Transcript excerpt: "{excerpt}"
+                            """
+    
+    def call_llm():
+        with span("llm"):
+            response = get_provider().chat(
+                model=SUMMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+                    {"role": "user", "content": user_prompt}
+                ],
+                max_tokens=60,
+                temperature=0.7
+            )
+        return response.content.strip()
+    
+    key = cache_key(title, excerpt, SUMMARY_SYSTEM_PROMPT, user_prompt, SUMMARY_MODEL)
+    return _summary_cache.get_or_compute(key, call_llm)
 
 @app.route('/api/summarize-transcripts-batch', methods=['POST', 'OPTIONS'])
 def summarize_transcripts_batch():
@@ -39,6 +197,7 @@ def summarize_transcripts_batch():
             return jsonify({"error": "No transcripts provided"}), 400
         
         summaries = {}
+        pending = {}
         
         for transcript in transcripts_data:
             transcript_id = transcript.get('id')
@@ -46,7 +205,7 @@ def summarize_transcripts_batch():
             sections = transcript.get('sections', [])
             
             if not sections:
-                summaries[transcript_id] = "Summary not available for this transcript."
+                summaries[transcript_id] = SUMMARY_UNAVAILABLE
                 continue
             
             full_text = " ".join(
@@ -54,37 +213,17 @@ def summarize_transcripts_batch():
             )[:6000]
             
             if not full_text.strip():
-                summaries[transcript_id] = "Summary not available for this transcript."
+                summaries[transcript_id] = SUMMARY_UNAVAILABLE
                 continue
             
+            pending[transcript_id] = _summary_pool.submit(run_in_context(summarize_transcript), title, full_text[:4000])
+        
+        for transcript_id, future in pending.items():
             try:
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": """You are a expert debate analyst. Create TWO concise sentences summarizing the key clash and main topics."""
-                        },
-                        {
-                            "role": "user",
-                            "content": f"""
-                            Debate: {title}
-                            Create TWO concise sentences:
-                            - First sentence: main conflict/outcome
-                            - Second sentence: key topics discussed
-                            Transcript excerpt: "{full_text[:4000]}"
-                            """
-                        }
-                    ],
-                    max_tokens=60,
-                    temperature=0.7
-                )
-                
-                summary = response.choices[0].message.content.strip()
-                summaries[transcript_id] = summary
-                                
+                summaries[transcript_id] = future.result()
             except Exception as e:
-                summaries[transcript_id] = "Candidates exchanged views on key policy differences."
+                print(f"Summary failed for transcript {transcript_id}: {e}")
+                summaries[transcript_id] = SUMMARY_FALLBACK
         
         return jsonify({
             "success": True,
@@ -125,34 +264,42 @@ def get_debate_metadata():
     return source, date
 
 # Database
-def setup_database(csv_path=None):
+def setup_database(csv_path=None, turns=None):
+    """
+    Load one transcript into the database.
+
+    Args:
+        csv_path: Clean transcript CSV to load (when no turns are given)
+        turns: Speaker turns straight from preprocess(); skips the CSV entirely
+    """
     print("Setting up Debate AI Database...")
     
-    # Initialize database connection
-    database = DebateDatabase()
+    # Initialize database connection (borrowed from the shared client pool)
+    inserter = DataInserter()
     
-    if database.test_connection():
-        print("\nLoading data from CSV file...")
+    if inserter.test_connection():
+        if turns is not None:
+            print(f"\nLoading {len(turns)} preprocessed speaker turns...")
+            inserter.load_rows(turns)
+        else:
+            print("\nLoading data from CSV file...")
 
-        # Load CSV file
-        if csv_path is None:
-            csv_path = "debate_transcript_clean.csv"
+            # Load CSV file
+            if csv_path is None:
+                csv_path = "debate_transcript_clean.csv"
 
-        # Load CSV file
-        inserter = DataInserter()
-        inserter.process_transcript_file(csv_path)
+            # Load CSV file
+            inserter.process_transcript_file(csv_path)
 
         print("\nDatabase setup complete!")
         print("Available collections:")
-        collections = database.db.list_collection_names()
-        for collection in collections:
-            count = database.db[collection].count_documents({})
-            print(f"  - {collection}: {count} documents")
+        for collection, count in collection_counts(inserter.db).items():
+            print(f"  - {collection}: ~{count} documents")
     
     else:
         print("Database setup failed!")
     
-    database.close_connection()
+    inserter.close_connection()
 
 # User Query for Retriver and QA Pipeline
 def get_user_query():
@@ -174,15 +321,90 @@ def get_user_query():
         
         return query
 
+def run_ingest_pipeline(job, debate_name, debate_date, file_path, filename, file_size):
+    """
+    Process an uploaded debate through preprocessing, database and FAISS.
+    Runs on a job worker thread; each step is recorded as a job stage.
+    
+    Returns:
+        Dict stored as the job result
+    """
+    print(f"\n{'='*80}")
+    print(f"PROCESSING DEBATE: {debate_name} ({debate_date}) [job {job.id}]")
+    print(f"{'='*80}\n")
+    
+    # Step 1: Preprocessing - pass the file path
+    with job.stage("preprocessing") as stage:
+        print("Step 1/3: Running preprocessing...")
+        preprocess_result = preprocess(debate_name, debate_date, file_path)
+        print("Preprocessing complete")
+        print(f"  - Processed {preprocess_result['speaker_count']} speaker turns")
+        if preprocess_result['csv_path']:
+            print(f"  - CSV: {preprocess_result['csv_path']} (written in background)")
+        stage["detail"] = {"speaker_turns": preprocess_result['speaker_count'],
+                           "topic_cache": preprocess_result['topic_cache']}
+    
+    # Step 2: Database setup
+    with job.stage("database"):
+        print("\nStep 2/3: Setting up database...")
+        setup_database(turns=preprocess_result['turns'])
+        print("Database setup complete")
+    
+    # Step 3: Update FAISS index
+    with job.stage("faiss") as stage:
+        print("\nStep 3/3: Building FAISS index...")
+        stage["detail"] = update_faiss_index()
+    
+    print(f"\n{'='*80}")
+    print(f"DEBATE PROCESSING COMPLETE")
+    print(f"{'='*80}\n")
+    
+    return {
+        "success": True,
+        "message": f"Debate '{debate_name}' ({debate_date}) processed successfully!",
+        "debate_name": debate_name,
+        "debate_date": debate_date,
+        "file_size": file_size,
+        "filename": filename
+    }
+
+def job_backlog_response(endpoint, retry_after=60):
+    """503 + Retry-After for uploads refused because the ingestion backlog is full."""
+    admission_rejected.inc(endpoint=endpoint, reason="job_backlog")
+    response = jsonify({
+        "error": "Too many debates are already being processed, please retry later",
+        "reason": "job_backlog",
+        "retry_after": retry_after
+    })
+    response.headers["Retry-After"] = str(retry_after)
+    return response, 503
+
+def validate_upload(filename, debate_name, debate_date):
+    """Error message for an invalid transcript upload, or None if it's fine."""
+    if not debate_name:
+        return "Debate name is required"
+    if not debate_date:
+        return "Debate date is required"
+    # Restrict file types
+    if not filename.lower().endswith(".txt"):
+        return "Only .txt files are allowed"
+    # Validate date format
+    try:
+        datetime.strptime(debate_date, "%Y-%m-%d")
+    except ValueError:
+        return "Invalid date format. Use YYYY-MM-DD"
+    return None
+
 @app.route('/api/upload-debate', methods=['POST'])
+@upload_limiter.limit
 def upload_debate():
     """
     Upload debate transcript with metadata (name and date)
-    Processes the file through the entire pipeline:
-    1. Saves the file
-    2. Runs preprocessing with debate name and date
-    3. Sets up database
-    4. Builds FAISS index
+    Saves the file and queues an ingestion job that runs:
+    1. Preprocessing with debate name and date
+    2. Database setup
+    3. FAISS index update
+    Returns 202 with a job id; poll /api/jobs/<job_id> for progress.
     """
     try:
         # Get form data
@@ -199,23 +421,10 @@ def upload_debate():
         if not uploaded_file:
             return jsonify({"error": "No file uploaded"}), 400
         
-        if not debate_name:
-            return jsonify({"error": "Debate name is required"}), 400
-        
-        if not debate_date:
-            return jsonify({"error": "Debate date is required"}), 400
-        
         filename = uploaded_file.filename
-        
-        # Restrict file types
-        if not filename.lower().endswith(".txt"):
-            return jsonify({"error": "Only .txt files are allowed"}), 400
-        
-        # Validate date format
-        try:
-            datetime.strptime(debate_date, "%Y-%m-%d")
-        except ValueError:
-            return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+        error = validate_upload(filename, debate_name, debate_date)
+        if error:
+            return jsonify({"error": error}), 400
         
         # Save file with timestamp to prevent overwriting
         safe_name = f"{int(time.time())}_{filename}"
@@ -227,68 +436,166 @@ def upload_debate():
         # Get file size
         file_size = file_path.stat().st_size
         
-        # Process the debate through the pipeline
+        # Queue the pipeline and return straight away
         try:
-            print(f"\n{'='*80}")
-            print(f"PROCESSING DEBATE: {debate_name} ({debate_date})")
-            print(f"{'='*80}\n")
-            
-            # Step 1: Preprocessing - pass the file path
-            print("Step 1/3: Running preprocessing...")
-            preprocess_result = preprocess(debate_name, debate_date, str(file_path))
-            print("Preprocessing complete")
-            print(f"  - Processed {preprocess_result['speaker_count']} speaker turns")
-            print(f"  - CSV: {preprocess_result['csv_path']}")
-            print(f"  - JSON: {preprocess_result['json_path']}")
-            
-            # Step 2: Database setup
-            print("\nStep 2/3: Setting up database...")
-            setup_database(preprocess_result['csv_path'])
-            print("Database setup complete")
-            
-            # Step 3: Build FAISS index
-            print("\nStep 3/3: Building FAISS index...")
-            try:
-                from backend.embeddings_faiss.incremental_index import update_faiss_incrementally
-                new_count = update_faiss_incrementally()
-                if new_count > 0:
-                    print(f"Incrementally updated FAISS index with {new_count} new chunks")
-                else:
-                    print("FAISS index is already up to date")
-            except ImportError as e:
-                print(f"Incremental update not available: {e}")
-                print("Falling back to full rebuild...")
-                build_index()
-            except Exception as e:
-                print(f"Incremental update failed: {e}")
-                print("Falling back to full rebuild...")
-                build_index()
-            
-            print(f"\n{'='*80}")
-            print(f"DEBATE PROCESSING COMPLETE")
-            print(f"{'='*80}\n")
-            
-            return jsonify({
-                "success": True,
-                "message": f"Debate '{debate_name}' ({debate_date}) processed successfully!",
-                "debate_name": debate_name,
-                "debate_date": debate_date,
-                "file_size": file_size,
-                "filename": filename
-            }), 200
-            
-        except Exception as processing_error:
-            print(f"Error during pipeline processing: {processing_error}")
-            return jsonify({
-                "error": f"Pipeline processing failed: {str(processing_error)}"
-            }), 500
+            job = job_manager.submit(
+                "upload-debate",
+                run_ingest_pipeline,
+                INGEST_STAGES,
+                debate_name=debate_name,
+                debate_date=debate_date,
+                file_path=str(file_path),
+                filename=filename,
+                file_size=file_size
+            )
+        except JobQueueFull as e:
+            # Ingestion backlog is full: drop the upload rather than queue it for hours
+            print(f"Rejected upload, {e}")
+            file_path.unlink(missing_ok=True)
+            return job_backlog_response("/api/upload-debate")
+        print(f"Queued ingestion job {job.id}")
+        
+        return jsonify({
+            "success": True,
+            "message": f"Debate '{debate_name}' ({debate_date}) queued for processing",
+            "job_id": job.id,
+            "status_url": f"/api/jobs/{job.id}",
+            "debate_name": debate_name,
+            "debate_date": debate_date,
+            "file_size": file_size,
+            "filename": filename
+        }), 202
     
     except Exception as e:
         print(f"Error in upload_debate: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+BULK_UPLOAD_MAX_FILES = int(os.getenv("BULK_UPLOAD_MAX_FILES", "500"))
+
+@app.route('/api/upload-debates', methods=['POST'])
+@upload_limiter.limit
+def upload_debates():
+    """
+    Upload many debate transcripts as one ingestion job.
+    Form fields repeat once per transcript, in the same order:
+    `file`, `debate_name`, `debate_date`.
+    The job preprocesses the transcripts in parallel, loads them into the
+    database together and updates the FAISS index once at the end.
+    Returns 202 with a job id; poll /api/jobs/<job_id> for progress.
+    """
+    try:
+        files = request.files.getlist('file')
+        names = [name.strip() for name in request.form.getlist('debate_name')]
+        dates = [date.strip() for date in request.form.getlist('debate_date')]
+        print(f"Received bulk upload request: {len(files)} files")
+        
+        # Validation
+        if not files:
+            return jsonify({"error": "No files uploaded"}), 400
+        if len(files) > BULK_UPLOAD_MAX_FILES:
+            return jsonify({"error": f"At most {BULK_UPLOAD_MAX_FILES} files per request"}), 400
+        if len(names) != len(files) or len(dates) != len(files):
+            return jsonify({"error": "Send one debate_name and one debate_date per file"}), 400
+        for uploaded_file, debate_name, debate_date in zip(files, names, dates):
+            error = validate_upload(uploaded_file.filename, debate_name, debate_date)
+            if error:
+                return jsonify({"error": f"{uploaded_file.filename}: {error}"}), 400
+        
+        # Save every file before queueing, so the job never sees a partial batch
+        batch = f"{int(time.time())}_{os.urandom(3).hex()}"
+        transcripts = []
+        for i, (uploaded_file, debate_name, debate_date) in enumerate(zip(files, names, dates)):
+            file_path = UPLOAD_FOLDER / f"{batch}_{i}_{uploaded_file.filename}"
+            uploaded_file.save(file_path)
+            transcripts.append({"debate_name": debate_name, "debate_date": debate_date, "file_path": str(file_path)})
+        
+        try:
+            job = job_manager.submit("bulk-upload", ingest_transcripts, INGEST_STAGES, transcripts=transcripts)
+        except JobQueueFull as e:
+            print(f"Rejected bulk upload, {e}")
+            for transcript in transcripts:
+                Path(transcript["file_path"]).unlink(missing_ok=True)
+            return job_backlog_response("/api/upload-debates")
+        print(f"Queued bulk ingestion job {job.id} ({len(transcripts)} transcripts)")
+        
+        return jsonify({
+            "success": True,
+            "message": f"{len(transcripts)} debates queued for processing",
+            "job_id": job.id,
+            "status_url": f"/api/jobs/{job.id}",
+            "count": len(transcripts)
+        }), 202
+    
+    except Exception as e:
+        print(f"Error in upload_debates: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Status of a background job: overall status, per-stage progress,
+    timing and errors, and the result once it has succeeded
+    """
+    status = job_manager.status(job_id)
+    if status is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(status), 200
+
+
+@app.route('/api/debates/<debate_id>/timeline', methods=['GET'])
+def debate_timeline(debate_id):
+    """
+    A debate's utterances in speaking order, one page at a time
+
+    Query parameters: speaker_id, topic, after (next_after from the previous
+    page) and limit
+    """
+    try:
+        after = request.args.get('after', type=int)
+        limit = request.args.get('limit', TIMELINE_PAGE_SIZE, type=int)
+        speaker_id = request.args.get('speaker_id')
+        topic = request.args.get('topic')
+        page = get_timeline(get_database(), debate_id, speaker_id=speaker_id, topic=topic,
+                            after=after, limit=limit)
+        # An empty filtered page just means no matches; an empty debate doesn't exist
+        if not page["utterances"] and after is None and not (speaker_id or topic):
+            return jsonify({"error": "Debate not found"}), 404
+        return jsonify(page), 200
+    except Exception as e:
+        print(f"Error in debate_timeline: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/debates/<debate_id>/stats', methods=['GET'])
+def debate_stats(debate_id):
+    """
+    Materialized statistics for one debate: turns, words, topic histogram,
+    time span, and per-speaker turns, words and speaking time
+    """
+    try:
+        stats = get_debate_stats(get_database(), debate_id)
+        if stats is None:
+            return jsonify({"error": "Debate not found"}), 404
+        return jsonify(stats), 200
+    except Exception as e:
+        print(f"Error in debate_stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/api/stats', methods=['GET'])
+def database_stats():
+    """Approximate document counts per collection (from collection metadata, no scans)"""
+    try:
+        return jsonify(collection_counts(get_database())), 200
+    except Exception as e:
+        print(f"Error in database_stats: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/api/retrieve-response', methods=['POST'])
+@qa_limiter.limit
 def retrieve_response():
     """
     Q&A Mode - Query the processed debate using retriever + QA pipeline
@@ -303,57 +610,15 @@ def retrieve_response():
             return jsonify({"error": "No query provided"}), 400
         
         # Step 1: Run retriever to get relevant passages
-        print("Step 1/3: Running retriever...")
+        print("Step 1/2: Running retriever...")
         top_k = 10  # Number of relevant passages to retrieve
         retriever_results = run_retriever(user_query, top_k)
-        print(f"Retrieved {len(retriever_results) if retriever_results else 0} relevant passages")
+        print(f"Retrieved {len(retriever_results)} relevant passages")
         
-        # Step 2: Check if ChromaDB needs rebuilding
-        print("\nStep 2/3: Checking ChromaDB status...")
-        try:
-            from pathlib import Path
-            
-            chroma_path = Path("backend/chroma")
-            passages_path = Path("passages.json")
-            
-            # Check if we need to rebuild
-            needs_rebuild = False
-            
-            if not chroma_path.exists():
-                print("ChromaDB doesn't exist - will create fresh database")
-                needs_rebuild = True
-            elif not passages_path.exists():
-                print("Error: passages.json not found!")
-                return jsonify({"error": "passages.json not found"}), 500
-            else:
-                # Check if passages.json is newer than ChromaDB
-                passages_mtime = passages_path.stat().st_mtime
-                chroma_mtime = chroma_path.stat().st_mtime
-                
-                if passages_mtime > chroma_mtime:
-                    print("passages.json is newer than ChromaDB - will rebuild")
-                    needs_rebuild = True
-                else:
-                    print("ChromaDB is up to date - skipping rebuild")
-            
-            if needs_rebuild:
-                print("Building ChromaDB with OpenAI embeddings...")
-                build_chroma_db(force_rebuild=True)
-                print("✅ ChromaDB built successfully with OpenAI embeddings")
-            else:
-                print("✅ Using existing ChromaDB")
-                
-        except Exception as db_error:
-            print(f"Error: ChromaDB setup failed: {db_error}")
-            import traceback
-            traceback.print_exc()
-            return jsonify({
-                "error": f"ChromaDB setup failed: {str(db_error)}"
-            }), 500
-        
-        # Step 3: Run QA pipeline
-        print("\nStep 3/3: Running QA pipeline...")
-        qa_response = query_rag(user_query)
+        # Step 2: Run QA pipeline on this request's passages, in memory
+        # (no shared passages.json or Chroma rebuild on the request path)
+        print("\nStep 2/2: Running QA pipeline...")
+        qa_response = query_rag(user_query, passages=retriever_results)
         print(f"Generated answer")
         print(f"\nAnswer: {qa_response[:200]}{'...' if len(qa_response) > 200 else ''}\n")
         
@@ -373,6 +638,7 @@ def retrieve_response():
 
 
 @app.route('/api/fact-check', methods=['POST'])
+@fact_check_limiter.limit
 def fact_check():
     """
     Fact Checker Mode - Verify claims using Wikipedia, NewsAPI, and LLM
@@ -386,14 +652,8 @@ def fact_check():
         if not user_claim:
             return jsonify({"error": "No claim provided"}), 400
         
-        # Initialize EnhancedFactChecker
-        print("Initializing fact checker...")
-        fact_checker = EnhancedFactChecker(
-            use_wikipedia=True,
-            use_news_api=True,
-            use_llm_verification=True,
-            use_semantic_similarity=True
-        )
+        # Shared EnhancedFactChecker (zero-shot model loads once per process)
+        fact_checker = get_fact_checker()
         
         # Run fact check with user's claim directly (no extraction)
         print("Running fact check with multiple sources...")
@@ -520,4 +780,5 @@ def query():
 '''
 
 if __name__ == "__main__":
+    start_model_warmup()
     app.run(debug=False, port=3000)
\ No newline at end of file